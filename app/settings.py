@@ -37,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Server-Timing y /metrics (ver viewer/metrics.py; NOTEBOOK_METRICS=0 lo desactiva)
+    'viewer.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,6 +77,9 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Enable WhiteNoise compressed static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# Cachear para siempre los archivos con hash de collectstatic y las imágenes
+# del almacén por contenido (static/notebooks/objects/<aa>/<sha256>[-wN|-tN].<ext>)
+WHITENOISE_IMMUTABLE_FILE_TEST = r'^.+(\.[0-9a-f]{12}\.\w+|/notebooks/objects/[0-9a-f]{2}/[0-9a-f]{64}(-[wt]\d+)?\.\w+)$'
 
 # Simple sqlite database for local development
 DATABASES = {
@@ -85,3 +90,54 @@ DATABASES = {
 db_from_env = dj_database_url.config(conn_max_age=600)
 if db_from_env:
     DATABASES['default'].update(db_from_env)
+
+# Caché en memoria de notebooks convertidas (ver viewer/cache.py); el tope de
+# bytes es de memoria ocupada (estimada), no del tamaño de los archivos
+NOTEBOOK_CACHE_MAX_ENTRIES = int(os.environ.get('NOTEBOOK_CACHE_MAX_ENTRIES', '32'))
+NOTEBOOK_CACHE_MAX_BYTES = int(os.environ.get('NOTEBOOK_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Apariciones y fragmentos del índice de búsqueda leídos al buscar (ver
+# viewer/search.py); el vocabulario de todas las notebooks va aparte
+NOTEBOOK_SEARCH_CACHE_MAX_BYTES = int(os.environ.get('NOTEBOOK_SEARCH_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Paginación de la página de detalle: items de la primera pantalla y de cada
+# ventana pedida a /api/notebook/<slug>/items/, con tope de bytes por ventana
+NOTEBOOK_PAGE_SIZE = int(os.environ.get('NOTEBOOK_PAGE_SIZE', '10'))
+NOTEBOOK_PAGE_MAX_BYTES = int(os.environ.get('NOTEBOOK_PAGE_MAX_BYTES', str(128 * 1024)))
+
+# Salidas de texto con más caracteres que esto se guardan aparte al convertir
+# y la página muestra solo principio y final (ver viewer/previews.py)
+NOTEBOOK_TEXT_THRESHOLD = int(os.environ.get('NOTEBOOK_TEXT_THRESHOLD', '16384'))
+
+# Tablas de pandas con más bytes de HTML que esto se guardan como datos y la
+# página las pinta por páginas de filas (ver viewer/tables.py)
+NOTEBOOK_TABLE_THRESHOLD = int(os.environ.get('NOTEBOOK_TABLE_THRESHOLD', '32768'))
+
+# Hilos por proceso que convierten las notebooks abiertas desde el cargador
+# (/api/open-notebook/ responde al momento y la conversión sigue en segundo plano)
+NOTEBOOK_JOB_WORKERS = int(os.environ.get('NOTEBOOK_JOB_WORKERS', '2'))
+
+# Suma máxima (bytes de los .ipynb fuente) de conversiones simultáneas entre
+# todos los procesos; por encima open_notebook responde 503 con Retry-After
+NOTEBOOK_CONVERT_MAX_BYTES = int(os.environ.get('NOTEBOOK_CONVERT_MAX_BYTES', str(256 * 1024 * 1024)))
+NOTEBOOK_CONVERT_RETRY_AFTER = int(os.environ.get('NOTEBOOK_CONVERT_RETRY_AFTER', '5'))
+
+# Si falta el artefacto de una notebook de datasets/ (despliegue sin
+# bake_notebooks), la primera visita lanza su conversión en segundo plano y
+# responde 202 con una página que espera a que termine
+NOTEBOOK_LAZY_CONVERT = os.environ.get('NOTEBOOK_LAZY_CONVERT', '1').lower() not in ('0', 'false', 'no')
+
+# Con runserver, reconvertir en segundo plano las notebooks de datasets/ que
+# se crean, modifican o borran (ver viewer/watch.py)
+NOTEBOOK_WATCH = os.environ.get('NOTEBOOK_WATCH', '0').lower() in ('1', 'true', 'yes')
+
+# Mensajes de viewer (p. ej. la vigilancia de datasets/) por la consola del
+# servidor; NOTEBOOK_LOG_LEVEL=WARNING deja solo los errores
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {
+        'viewer': {'handlers': ['console'], 'level': os.environ.get('NOTEBOOK_LOG_LEVEL', 'INFO')},
+    },
+}
@@ -0,0 +1 @@
+# Benchmarks de conversión y renderizado (ver README de cada script)
@@ -0,0 +1,79 @@
+"""Compara convert_notebooks.py en serie y con ``--jobs N`` sobre un corpus sintético.
+
+Uso::
+
+    python -m benchmarks.bench_convert_parallel --notebooks 24 --jobs 4
+
+Verifica además que ambos modos generan exactamente los mismos archivos.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import convert_notebooks  # noqa: E402
+from benchmarks.synthetic import write_corpus  # noqa: E402
+
+
+def tree_digest(root):
+    """Hash de los nombres y contenidos de todos los archivos bajo ``root`` (sin el manifest)."""
+    h = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name == '.manifest.json':
+                continue
+            path = os.path.join(dirpath, name)
+            h.update(os.path.relpath(path, root).encode())
+            with open(path, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def run(source, site, jobs):
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_notebooks.main(['--source', source, '--site', site, '--force', '--jobs', str(jobs)])
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notebooks', type=int, default=24)
+    parser.add_argument('--cells', type=int, default=40)
+    parser.add_argument('--images', type=int, default=6)
+    parser.add_argument('--image-size', type=int, default=400, help='lado de cada PNG en píxeles')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='bench_convert_')
+    try:
+        source = os.path.join(tmp, 'datasets')
+        write_corpus(source, args.notebooks, cells=args.cells, images=args.images,
+                     image_size=(args.image_size, args.image_size))
+        corpus_mb = sum(os.path.getsize(os.path.join(source, f)) for f in os.listdir(source)) / 1e6
+
+        serial_site = os.path.join(tmp, 'serial')
+        parallel_site = os.path.join(tmp, 'parallel')
+        serial = run(source, serial_site, 1)
+        parallel = run(source, parallel_site, args.jobs)
+        same = tree_digest(serial_site) == tree_digest(parallel_site)
+
+        print(f'corpus: {args.notebooks} notebooks, {corpus_mb:.1f} MB')
+        print(f'serie:       {serial:.2f}s')
+        print(f'--jobs {args.jobs:<4} {parallel:.2f}s  (x{serial / parallel:.2f})')
+        print(f'salidas idénticas: {"sí" if same else "NO"}')
+        return 0 if same else 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Micro-benchmark del extractor compartido (viewer/extraction.py).
+
+Genera una notebook sintética con todos los tipos de salida que tienen
+manejador (texto, tablas HTML, PNG, JPEG si hay Pillow, SVG, markdown y
+errores) y mide:
+
+- la lectura sola con ``nbstream.iter_notebook`` (sin manejadores)
+- la extracción completa, en frío (almacén de imágenes vacío) y en caliente
+  (imágenes ya guardadas, como al reconvertir)
+- el tiempo acumulado dentro de cada manejador
+
+Uso::
+
+    python -m benchmarks.bench_extraction --cells 200 --images 20 --repeat 5
+    python -m benchmarks.bench_extraction --json > antes.json
+
+Como CLI, visor y notebook_site usan el mismo extractor, una mejora medida
+aquí se aplica a los tres.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_notebook  # noqa: E402
+from viewer import extraction, nbstream  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SVG = ('<svg xmlns="http://www.w3.org/2000/svg" width="120" height="80">'
+       + ''.join(f'<rect x="{i * 6}" y="{80 - i * 3}" width="5" height="{i * 3}"/>' for i in range(20))
+       + '</svg>')
+TRACEBACK = [
+    '\x1b[0;31m---------------------------------------------------------------------------\x1b[0m',
+    '\x1b[0;31mValueError\x1b[0m                                Traceback (most recent call last)',
+    '\x1b[0;32m<ipython-input-1>\x1b[0m in \x1b[0;36m<module>\x1b[0;34m\x1b[0m\n----> 1 raise ValueError("x")',
+    '\x1b[0;31mValueError\x1b[0m: x',
+]
+
+
+def make_jpeg(width, height, seed=0):
+    img = Image.effect_noise((width, height), 64 + seed % 32).convert('RGB')
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=85)
+    return buf.getvalue()
+
+
+def build_notebook(path, cells, images, image_size, text_size, table_rows):
+    """Notebook sintética con una salida de cada tipo repartida entre las celdas."""
+    nb = make_notebook(cells=cells, text_size=text_size, images=images, image_size=image_size,
+                       table_rows=table_rows)
+    code = [c for c in nb['cells'] if c['cell_type'] == 'code']
+    for i, cell in enumerate(code):
+        if i % 10 == 3:
+            cell['outputs'].append({'ename': 'ValueError', 'evalue': 'x', 'output_type': 'error',
+                                    'traceback': TRACEBACK})
+        if i % 10 == 5:
+            cell['outputs'].append({'data': {'image/svg+xml': SVG.splitlines(True), 'text/plain': ['<Figure>']},
+                                    'metadata': {}, 'output_type': 'display_data'})
+        if i % 10 == 7 and Image is not None and images:
+            jpeg = base64.b64encode(make_jpeg(*image_size, seed=i)).decode('ascii')
+            cell['outputs'].append({'data': {'image/jpeg': jpeg, 'text/plain': ['<Figure>']},
+                                    'metadata': {}, 'output_type': 'display_data'})
+        if i % 10 == 9:
+            cell['outputs'].append({'data': {'text/plain': [f'array([{i}, {i + 1}])']},
+                                    'execution_count': i, 'metadata': {}, 'output_type': 'execute_result'})
+    nb['cells'].insert(len(nb['cells']) // 2, {'cell_type': 'markdown', 'id': 'md-1', 'metadata': {},
+                                                'source': ['## Sección\n', '\n', 'Texto *markdown*.\n']})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(nb, f, indent=1)
+
+
+class HandlerTimer:
+    """Sustituye temporalmente los manejadores registrados por versiones cronometradas."""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def _wrap(self, name, func):
+        def timed(value, extractor):
+            t0 = time.perf_counter()
+            try:
+                return func(value, extractor)
+            finally:
+                self.seconds[name] += time.perf_counter() - t0
+                self.calls[name] += 1
+        return timed
+
+    def __enter__(self):
+        self._saved = (dict(extraction.MIME_HANDLERS), dict(extraction.OUTPUT_HANDLERS))
+        for mime, func in self._saved[0].items():
+            extraction.MIME_HANDLERS[mime] = self._wrap(mime, func)
+        for output_type, func in self._saved[1].items():
+            extraction.OUTPUT_HANDLERS[output_type] = self._wrap(output_type, func)
+        return self
+
+    def __exit__(self, *exc):
+        extraction.MIME_HANDLERS.update(self._saved[0])
+        extraction.OUTPUT_HANDLERS.update(self._saved[1])
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cells', type=int, default=200)
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--image-size', type=int, default=400, help='lado de cada imagen en píxeles')
+    parser.add_argument('--text-size', type=int, default=2000)
+    parser.add_argument('--table-rows', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='imprimir los resultados como JSON')
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='bench_extract_')
+    try:
+        path = os.path.join(tmp, 'bench.ipynb')
+        build_notebook(path, args.cells, args.images, (args.image_size, args.image_size),
+                       args.text_size, args.table_rows)
+        size_mb = os.path.getsize(path) / 1e6
+        static_dir = os.path.join(tmp, 'static')
+        text_dir = os.path.join(tmp, 'notes', 'bench')
+        spool_dir = os.path.join(static_dir, 'objects')
+
+        def parse():
+            for _ in nbstream.iter_notebook(path, spool_dir=spool_dir):
+                pass
+
+        def extract():
+            return extraction.extract(path, static_dir, text_dir)
+
+        parse_times = timed(parse, args.repeat)
+        cold = timed(lambda: (shutil.rmtree(static_dir, ignore_errors=True), extract()), 1)[0]
+        with HandlerTimer() as handlers:
+            warm_times = timed(extract, args.repeat)
+        items, _ = extract()
+
+        warm = statistics.median(warm_times)
+        result = {
+            'file_mb': round(size_mb, 2),
+            'items': len(items),
+            'parse_s': round(statistics.median(parse_times), 4),
+            'cold_s': round(cold, 4),
+            'warm_s': round(warm, 4),
+            'warm_mb_s': round(size_mb / warm, 1),
+            'handlers': {
+                name: {'calls': handlers.calls[name] // args.repeat,
+                       'ms': round(handlers.seconds[name] / args.repeat * 1000, 3)}
+                for name in sorted(handlers.seconds, key=handlers.seconds.get, reverse=True)
+            },
+        }
+        if args.json:
+            print(json.dumps(result, indent=2))
+            return 0
+
+        print(f"notebook: {result['file_mb']} MB, {result['items']} items"
+              f"{'' if Image is not None else ' (sin Pillow: no hay JPEG)'}")
+        print(f"lectura (nbstream):      {result['parse_s']:.4f}s")
+        print(f"extracción en frío:      {result['cold_s']:.4f}s")
+        print(f"extracción en caliente:  {result['warm_s']:.4f}s  ({result['warm_mb_s']} MB/s)")
+        print('manejadores (por pasada):')
+        for name, h in result['handlers'].items():
+            print(f"  {name:<16} {h['calls']:>6} llamadas  {h['ms']:>9.3f} ms")
+        return 0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
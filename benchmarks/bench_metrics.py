@@ -0,0 +1,113 @@
+"""Coste de la instrumentación de viewer/metrics.py.
+
+Mide ``/notebook/<slug>/`` y ``/api/notebook/<slug>/items/`` (página ya
+guardada, el caso más barato y por tanto donde más pesaría) con las métricas
+activadas y desactivadas, alternando ambos modos en rondas y quedándose con la
+ronda más rápida de cada uno para apartar el ruido de la máquina. Mide también
+por separado el coste de ``metrics.phase`` y del middleware, que es lo que la
+instrumentación añade a cada petición.
+
+Uso::
+
+    python -m benchmarks.bench_metrics --requests 2000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'testserver')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import Client, RequestFactory  # noqa: E402
+
+from benchmarks.bench_suite import viewer_site  # noqa: E402
+from benchmarks.synthetic import make_notebook  # noqa: E402
+from viewer import extraction, metrics, previews  # noqa: E402
+
+
+def per_request(client, url, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        client.get(url)
+    return (time.perf_counter() - t0) / n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='peticiones por modo y URL')
+    parser.add_argument('--rounds', type=int, default=20, help='veces que se alterna entre modos')
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='bench_metrics_')
+    enabled = metrics.ENABLED
+    try:
+        notes_dir = os.path.join(tmp, 'templates', 'notebooks')
+        static_dir = os.path.join(tmp, 'static', 'notebooks')
+        os.makedirs(notes_dir)
+        path = os.path.join(tmp, 'bench.ipynb')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(make_notebook(cells=40, images=2), f)
+        items, _ = extraction.extract(path, static_dir, previews.blob_dir(notes_dir, 'bench'))
+        with open(os.path.join(notes_dir, 'bench.json'), 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+
+        client = Client()
+        urls = ('/notebook/bench/', '/api/notebook/bench/items/?offset=10')
+        per = max(1, args.requests // args.rounds)
+        with viewer_site(tmp):
+            for url in urls:
+                client.get(url)
+            print(f'{"URL":<40} {"sin métricas":>13} {"con métricas":>13} {"coste":>10}')
+            for url in urls:
+                off = on = float('inf')
+                for _ in range(args.rounds):
+                    metrics.ENABLED = False
+                    off = min(off, per_request(client, url, per))
+                    metrics.ENABLED = True
+                    on = min(on, per_request(client, url, per))
+                print(f'{url:<40} {off * 1e6:>10.1f} µs {on * 1e6:>10.1f} µs '
+                      f'{(on - off) * 1e6:>+7.1f} µs ({(on - off) / off:+.1%})')
+
+        n = 100000
+        metrics.ENABLED = True
+        t0 = time.perf_counter()
+        for _ in range(n):
+            with metrics.phase('bench'):
+                pass
+        print(f'metrics.phase aislado: {(time.perf_counter() - t0) / n * 1e6:.2f} µs')
+
+        # middleware alrededor de una vista vacía, con dos fases como una página típica
+        def view(request):
+            with metrics.phase('a'), metrics.phase('b'):
+                return HttpResponse()
+        middleware = metrics.MetricsMiddleware(view)
+        request = RequestFactory().get('/')
+        cost = {}
+        for mode in (False, True):
+            metrics.ENABLED = mode
+            t0 = time.perf_counter()
+            for _ in range(n):
+                middleware(request)
+            cost[mode] = (time.perf_counter() - t0) / n
+        print(f'middleware + 2 fases:  {(cost[True] - cost[False]) * 1e6:.2f} µs por petición')
+        return 0
+    finally:
+        metrics.ENABLED = enabled
+        metrics.reset()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
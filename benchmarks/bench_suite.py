@@ -0,0 +1,356 @@
+"""Suite de benchmarks de conversión y renderizado sobre notebooks sintéticas.
+
+Para cada escenario (dimensiones de ``benchmarks.synthetic.make_notebook``:
+celdas, tamaño del texto, número y tamaño de imágenes, filas de tablas HTML)
+mide:
+
+- ``extract``: extracción con ``viewer.extraction`` (la de la CLI y del visor)
+- ``dump`` / ``load``: serializar los items como los guarda la CLI y leerlos
+- ``nbc_dump`` / ``nbc_load`` / ``nbc_item``: lo mismo con el contenedor
+  indexado (``viewer.storage``) y, aparte, leer solo el item del medio
+- ``compile``: generar el modelo de vista (``viewer.compiled``), como al
+  final de cada conversión
+- ``view_cold``: primera visita a ``/notebook/<slug>/`` (lee el modelo,
+  renderiza, comprime y guarda la página)
+- ``view``: visitas siguientes (página ya guardada)
+- ``render``: solo la plantilla (``views._render_notebook_page``)
+
+y, aparte, ``/notebooks/`` con N notebooks convertidas. Cada medida da p50,
+p95 y throughput; la memoria pico se mide con tracemalloc en una pasada
+separada para no distorsionar los tiempos.
+
+Los resultados se escriben en JSON (``--output``). Con ``--baseline`` se
+comparan con una ejecución guardada y el código de salida es 1 si alguna
+medida empeora más de ``--tolerance``; ``--save-baseline`` guarda la ejecución
+actual como referencia::
+
+    python -m benchmarks.bench_suite --save-baseline
+    python -m benchmarks.bench_suite --baseline benchmarks/results/baseline.json
+
+Todo se escribe en una carpeta temporal; el proyecto no se modifica.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+os.environ.setdefault('DJANGO_ALLOWED_HOSTS', 'testserver')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.test import Client  # noqa: E402
+
+import convert_notebooks  # noqa: E402
+from benchmarks.synthetic import make_notebook, write_corpus  # noqa: E402
+from viewer import compiled, extraction, previews, storage, views  # noqa: E402
+
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'results')
+BASELINE_PATH = os.path.join(RESULTS_DIR, 'baseline.json')
+
+# Escenarios por defecto: cada uno estira una dimensión
+SCENARIOS = {
+    'small': {'cells': 20, 'text_size': 2000, 'images': 2, 'image_size': (320, 240), 'table_rows': 0},
+    'text': {'cells': 200, 'text_size': 20000, 'images': 0, 'image_size': (320, 240), 'table_rows': 0},
+    'images': {'cells': 40, 'text_size': 500, 'images': 30, 'image_size': (800, 600), 'table_rows': 0},
+    'tables': {'cells': 80, 'text_size': 500, 'images': 0, 'image_size': (320, 240), 'table_rows': 500},
+}
+QUICK_SCENARIOS = {
+    'small': SCENARIOS['small'],
+    'tables': dict(SCENARIOS['tables'], cells=20, table_rows=100),
+}
+INDEX_SIZES = (10, 100)
+
+# Diferencia absoluta por debajo de la cual no se cuenta como regresión
+MIN_DELTA_MS = 0.5
+
+
+def summarize(times, nbytes=None):
+    """Mínimo/p50/p95/media en ms y throughput de una lista de tiempos en segundos."""
+    ordered = sorted(times)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)]
+    out = {
+        'n': len(times),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'p50_ms': round(p50 * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'mean_ms': round(sum(times) / len(times) * 1000, 3),
+        'per_s': round(1 / p50, 1) if p50 else None,
+    }
+    if nbytes is not None:
+        out['mb_s'] = round(nbytes / 1e6 / p50, 1) if p50 else None
+    return out
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+    finally:
+        tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def viewer_site(site):
+    """Apunta las vistas a ``site`` (templates/notebooks y static/notebooks)."""
+    saved = views.TEMPLATES_NOTES_DIR, views.STATIC_NOTES_DIR
+    views.TEMPLATES_NOTES_DIR = os.path.join(site, 'templates', 'notebooks')
+    views.STATIC_NOTES_DIR = os.path.join(site, 'static', 'notebooks')
+    try:
+        yield
+    finally:
+        views.TEMPLATES_NOTES_DIR, views.STATIC_NOTES_DIR = saved
+        views.notebook_cache.clear()
+        views.page_cache.clear()
+
+
+def bench_scenario(tmp, name, dims, repeat):
+    """Mide extracción, serialización y vista de una notebook con ``dims``."""
+    site = os.path.join(tmp, name)
+    notes_dir = os.path.join(site, 'templates', 'notebooks')
+    static_dir = os.path.join(site, 'static', 'notebooks')
+    os.makedirs(notes_dir)
+    path = os.path.join(tmp, f'{name}.ipynb')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(make_notebook(**dims), f, indent=1)
+    nbytes = os.path.getsize(path)
+    text_dir = previews.blob_dir(notes_dir, name)
+
+    def extract():
+        return extraction.extract(path, static_dir, text_dir)
+
+    items, _ = extract()
+    json_path = os.path.join(notes_dir, f'{name}.json')
+
+    def dump():
+        # igual que convert_one
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+
+    def load():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    result = {
+        'dims': {k: list(v) if isinstance(v, tuple) else v for k, v in dims.items()},
+        'file_mb': round(nbytes / 1e6, 2),
+        'items': len(items),
+        'extract': summarize(timed(extract, repeat), nbytes),
+    }
+    result['extract']['peak_mb'] = peak_mb(extract)
+    dump()
+    json_bytes = os.path.getsize(json_path)
+    result['json_mb'] = round(json_bytes / 1e6, 2)
+    result['dump'] = summarize(timed(dump, repeat), json_bytes)
+    result['dump']['peak_mb'] = peak_mb(dump)
+    result['load'] = summarize(timed(load, repeat), json_bytes)
+    result['load']['peak_mb'] = peak_mb(load)
+
+    # el contenedor fuera de notes_dir: la vista sigue leyendo el JSON
+    nbc_path = os.path.join(site, f'{name}.nbc')
+
+    def nbc_dump():
+        storage.write_container(nbc_path, items)
+
+    def nbc_item():
+        with storage.Container(nbc_path) as container:
+            return container[len(container) // 2]
+
+    nbc_dump()
+    nbc_bytes = os.path.getsize(nbc_path)
+    result['nbc_mb'] = round(nbc_bytes / 1e6, 2)
+    result['nbc_dump'] = summarize(timed(nbc_dump, repeat), nbc_bytes)
+    result['nbc_load'] = summarize(timed(lambda: storage.load_items(nbc_path), repeat), nbc_bytes)
+    result['nbc_load']['peak_mb'] = peak_mb(lambda: storage.load_items(nbc_path))
+    result['nbc_item'] = summarize(timed(nbc_item, repeat * 10))
+
+    def compile_model():
+        st = os.stat(json_path)
+        compiled.write_model(text_dir, items, name, (st.st_mtime_ns, st.st_size))
+
+    result['compile'] = summarize(timed(compile_model, repeat))
+    result['compile']['peak_mb'] = peak_mb(compile_model)
+
+    client = Client()
+    url = f'/notebook/{name}/'
+    with viewer_site(site):
+        page_dir = previews.blob_dir(notes_dir, name)
+
+        def cold():
+            # sin página guardada ni JSON en caché, como tras una conversión
+            views.notebook_cache.clear()
+            views.page_cache.clear()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(page_dir, 'page.meta.json'))
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+        def warm():
+            response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+            assert response.status_code == 200, response.status_code
+
+        result['view_cold'] = summarize(timed(cold, repeat))
+        result['view_cold']['peak_mb'] = peak_mb(cold)
+        cold()
+        result['view'] = summarize(timed(warm, repeat * 10))
+        nb = views.notebook_cache.get(json_path, views._load_notebook)
+        result['render'] = summarize(timed(lambda: views._render_notebook_page(name, nb), repeat * 4))
+    return result
+
+
+def bench_index(tmp, count, repeat):
+    """Latencia de ``/notebooks/`` con ``count`` notebooks convertidas por la CLI."""
+    source = os.path.join(tmp, f'index_{count}', 'datasets')
+    site = os.path.join(tmp, f'index_{count}', 'site')
+    write_corpus(source, count, cells=5, text_size=200, images=0)
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_notebooks.main(['--source', source, '--site', site])
+    convert_s = time.perf_counter() - t0
+    client = Client()
+    with viewer_site(site):
+        def get():
+            response = client.get('/notebooks/')
+            assert response.status_code == 200, response.status_code
+
+        get()
+        result = summarize(timed(get, repeat * 10))
+    result['convert_s'] = round(convert_s, 2)
+    result['notebooks_per_s'] = round(count / convert_s, 1)
+    return result
+
+
+def flatten(results, prefix=''):
+    """``{'a.b.min_ms': valor}`` con las medidas comparables (menor es mejor).
+
+    Se compara el mínimo de cada medida, que es lo menos sensible a la carga
+    de la máquina; p50 y p95 se informan pero con pocas repeticiones varían
+    demasiado entre ejecuciones.
+    """
+    out = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            out.update(flatten(value, name + '.'))
+        elif key in ('min_ms', 'peak_mb') and value is not None:
+            out[name] = value
+    return out
+
+
+def compare(results, baseline, tolerance):
+    """Lista de ``(medida, base, actual, cambio)`` que empeoran más de ``tolerance``."""
+    current = flatten(results['scenarios']) | flatten(results['index'], 'index.')
+    previous = flatten(baseline.get('scenarios', {})) | flatten(baseline.get('index', {}), 'index.')
+    regressions = []
+    for name, value in sorted(current.items()):
+        base = previous.get(name)
+        if not base:
+            continue
+        change = value / base - 1
+        small = name.endswith('_ms') and value - base < MIN_DELTA_MS
+        if change > tolerance and not small:
+            regressions.append((name, base, value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='repeticiones de cada medida')
+    parser.add_argument('--quick', action='store_true', help='escenarios reducidos (para comprobar rápido)')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='ejecutar solo este escenario (se puede repetir)')
+    parser.add_argument('--index-sizes', default=','.join(map(str, INDEX_SIZES)),
+                        help='número de notebooks del índice, separados por comas ("" = no medir)')
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'))
+    parser.add_argument('--baseline', help='resultados previos con los que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='empeoramiento relativo admitido (por defecto %(default)s)')
+    parser.add_argument('--save-baseline', action='store_true', help=f'guardar también en {BASELINE_PATH}')
+    args = parser.parse_args(argv)
+
+    scenarios = QUICK_SCENARIOS if args.quick else SCENARIOS
+    if args.scenario:
+        scenarios = {name: SCENARIOS[name] for name in args.scenario}
+    index_sizes = [int(n) for n in args.index_sizes.split(',') if n.strip()]
+
+    results = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'converter': convert_notebooks.CONVERTER_VERSION,
+        },
+        'scenarios': {},
+        'index': {},
+    }
+    tmp = tempfile.mkdtemp(prefix='bench_suite_')
+    try:
+        for name, dims in scenarios.items():
+            r = bench_scenario(tmp, name, dims, args.repeat)
+            results['scenarios'][name] = r
+            print(f"{name:<8} {r['file_mb']:>7} MB  {r['items']:>5} items  "
+                  f"extract p50 {r['extract']['p50_ms']:>9.1f} ms ({r['extract']['mb_s']} MB/s, "
+                  f"pico {r['extract']['peak_mb']} MB)  dump {r['dump']['p50_ms']:.1f} ms  "
+                  f"load {r['load']['p50_ms']:.1f} ms  nbc {r['json_mb']}→{r['nbc_mb']} MB "
+                  f"load {r['nbc_load']['p50_ms']:.1f} ms item {r['nbc_item']['p50_ms']:.3f} ms  compile {r['compile']['p50_ms']:.1f} ms  vista fría {r['view_cold']['p50_ms']:.1f} ms  "
+                  f"vista p50/p95 {r['view']['p50_ms']:.2f}/{r['view']['p95_ms']:.2f} ms  "
+                  f"render {r['render']['p50_ms']:.2f} ms")
+        for count in index_sizes:
+            r = bench_index(tmp, count, args.repeat)
+            results['index'][str(count)] = r
+            print(f"índice con {count:>5} notebooks: p50/p95 {r['p50_ms']:.2f}/{r['p95_ms']:.2f} ms "
+                  f"({r['per_s']} peticiones/s; conversión {r['notebooks_per_s']} notebooks/s)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'Resultados en {args.output}')
+    if args.save_baseline:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        shutil.copyfile(args.output, BASELINE_PATH)
+        print(f'Referencia guardada en {BASELINE_PATH}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, base, value, change in regressions:
+            print(f'REGRESIÓN {name}: {base} -> {value} (+{change:.0%})')
+        if regressions:
+            return 1
+        print(f'Sin regresiones respecto a {args.baseline} (tolerancia {args.tolerance:.0%})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Generador de notebooks .ipynb sintéticas para benchmarks.
+
+Las notebooks se escriben directamente como JSON nbformat 4 (sin depender de
+nbformat) y las imágenes son PNG válidos generados con zlib, de modo que
+cualquier etapa de la conversión las puede procesar.
+"""
+import base64
+import json
+import os
+import random
+import struct
+import zlib
+
+
+def make_png(width, height, seed=0):
+    """PNG RGB de ``width`` x ``height`` con ruido determinista (poco comprimible)."""
+    rnd = random.Random(seed)
+    raw = bytearray()
+    for _ in range(height):
+        raw.append(0)  # filtro None
+        raw.extend(rnd.randbytes(width * 3))
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', ihdr)
+            + chunk(b'IDAT', zlib.compress(bytes(raw), 6)) + chunk(b'IEND', b''))
+
+
+def make_html_table(rows, cols, seed=0):
+    """Tabla con el mismo aspecto que ``DataFrame.to_html`` en Jupyter."""
+    rnd = random.Random(seed)
+    head = ''.join(f'      <th>col_{c}</th>\n' for c in range(cols))
+    body = []
+    for r in range(rows):
+        cells = ''.join(f'      <td>{rnd.random():.6f}</td>\n' for _ in range(cols))
+        body.append(f'    <tr>\n      <th>{r}</th>\n{cells}    </tr>\n')
+    return (
+        '<div>\n<style scoped>\n    .dataframe tbody tr th:only-of-type {\n        vertical-align: middle;\n    }\n'
+        '\n    .dataframe tbody tr th {\n        vertical-align: top;\n    }\n\n    .dataframe thead th {\n'
+        '        text-align: right;\n    }\n</style>\n<table border="1" class="dataframe">\n  <thead>\n'
+        f'    <tr style="text-align: right;">\n      <th></th>\n{head}    </tr>\n  </thead>\n  <tbody>\n'
+        + ''.join(body) + '  </tbody>\n</table>\n</div>'
+    )
+
+
+def make_notebook(cells=20, text_size=2000, images=2, image_size=(320, 240), table_rows=0,
+                  table_cols=8, seed=0):
+    """Notebook como dict nbformat 4 con las dimensiones pedidas.
+
+    Se reparten ``images`` salidas PNG y, si ``table_rows`` > 0, una tabla HTML
+    por cada cuatro celdas; todas las celdas de código imprimen ``text_size``
+    caracteres de texto.
+    """
+    rnd = random.Random(seed)
+    nb_cells = [{
+        'cell_type': 'markdown', 'id': 'md-0', 'metadata': {},
+        'source': ['# Notebook sintética\n', '\n', 'Resumen de prueba.\n', '\n', '## Resultados\n'],
+    }]
+    image_cells = set(rnd.sample(range(cells), min(images, cells))) if images else set()
+    for i in range(cells):
+        outputs = []
+        line = 'x' * 79 + '\n'
+        text = (line * (text_size // 80 + 1))[:text_size]
+        outputs.append({'name': 'stdout', 'output_type': 'stream', 'text': text.splitlines(True)})
+        if i in image_cells:
+            png = make_png(image_size[0], image_size[1], seed=seed * 1000 + i)
+            outputs.append({
+                'data': {'image/png': base64.b64encode(png).decode('ascii'), 'text/plain': ['<Figure>']},
+                'metadata': {}, 'output_type': 'display_data',
+            })
+        if table_rows and i % 4 == 0:
+            outputs.append({
+                'data': {'text/html': make_html_table(table_rows, table_cols, seed + i).splitlines(True),
+                         'text/plain': ['<DataFrame>']},
+                'execution_count': i + 1, 'metadata': {}, 'output_type': 'execute_result',
+            })
+        nb_cells.append({
+            'cell_type': 'code', 'execution_count': i + 1, 'id': f'code-{i}', 'metadata': {},
+            'outputs': outputs, 'source': [f'print("celda {i}")'],
+        })
+    return {
+        'cells': nb_cells,
+        'metadata': {'kernelspec': {'display_name': 'Python 3', 'language': 'python', 'name': 'python3'}},
+        'nbformat': 4, 'nbformat_minor': 5,
+    }
+
+
+def write_corpus(directory, count, **dims):
+    """Escribe ``count`` notebooks sintéticas en ``directory``; devuelve sus rutas."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n in range(count):
+        path = os.path.join(directory, f'synthetic_{n:04d}.ipynb')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(make_notebook(seed=n, **dims), f, indent=1)
+        paths.append(path)
+    return paths
@@ -0,0 +1,18 @@
+"""Configuración de pytest para las pruebas de ``viewer/tests``.
+
+Son pruebas de Django (``SimpleTestCase``, sin base de datos): aquí se
+prepara lo mismo que ``python manage.py test viewer``, así que ``pytest``
+desde la raíz ejecuta las mismas pruebas.
+"""
+import os
+
+import django
+
+collect_ignore = ['notebook_site']
+
+
+def pytest_configure(config):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
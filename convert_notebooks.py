@@ -4,104 +4,417 @@ Script para convertir notebooks de Jupyter a formato JSON
 para visualización web sin mostrar código.
 """
 import os
+import re
 import json
-import base64
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 
-try:
-    import nbformat
-except ImportError:
-    print("ERROR: nbformat no está instalado. Instala con: pip install nbformat")
-    exit(1)
+from viewer import catalog, compiled, extraction, images, jobs, previews, search, storage, tables, transforms, watch
+from viewer.atomic import atomic_open
 
 BASE_DIR = Path(__file__).resolve().parent
+# SITE_DIR es la raíz donde se escriben templates/notebooks y static/notebooks;
+# por defecto el propio proyecto (ver set_paths)
+SITE_DIR = BASE_DIR
 NOTEBOOKS_DIR = BASE_DIR / 'datasets'
 OUTPUT_DIR = BASE_DIR / 'templates' / 'notebooks'
 STATIC_DIR = BASE_DIR / 'static' / 'notebooks'
+MANIFEST_PATH = OUTPUT_DIR / '.manifest.json'
 
-def extract_outputs(cell):
-    """Extrae solo los outputs de una celda (sin código)."""
-    outputs = []
-    
-    if 'outputs' not in cell:
-        return outputs
-    
-    for output in cell['outputs']:
-        if output['output_type'] == 'stream':
-            outputs.append({
-                'type': 'text',
-                'content': output.get('text', '')
-            })
-        elif output['output_type'] == 'display_data':
-            if 'image/png' in output['data']:
-                outputs.append({
-                    'type': 'image',
-                    'content': output['data']['image/png']
-                })
-            elif 'text/html' in output['data']:
-                outputs.append({
-                    'type': 'html',
-                    'content': output['data']['text/html']
-                })
-        elif output['output_type'] == 'execute_result':
-            if 'image/png' in output['data']:
-                outputs.append({
-                    'type': 'image',
-                    'content': output['data']['image/png']
-                })
-            elif 'text/html' in output['data']:
-                outputs.append({
-                    'type': 'html',
-                    'content': output['data']['text/html']
-                })
-            elif 'text/plain' in output['data']:
-                outputs.append({
-                    'type': 'text',
-                    'content': output['data']['text/plain']
-                })
-    
-    return outputs
-
-def process_notebook(notebook_path):
-    """Procesa un notebook y retorna su contenido en JSON."""
-    with open(notebook_path, 'r', encoding='utf-8') as f:
-        notebook = nbformat.read(f, as_version=4)
-    
-    items = []
-    image_count = 0
-    notebook_name = notebook_path.stem
-    
-    for cell in notebook.cells:
-        # Saltar celdas markdown - solo procesar código y outputs
-        if cell.cell_type == 'code':
-            outputs = extract_outputs(cell)
-            
-            for output in outputs:
-                if output['type'] == 'image':
-                    image_count += 1
-                    image_data = output['content']
-                    
-                    # Crear carpeta si no existe
-                    static_notebook_dir = STATIC_DIR / notebook_name
-                    static_notebook_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    # Guardar imagen
-                    img_path = static_notebook_dir / f'img_{image_count}.png'
-                    with open(img_path, 'wb') as img_file:
-                        img_file.write(base64.b64decode(image_data))
-                    
-                    # Agregar referencia en JSON
-                    items.append({
-                        'type': 'image',
-                        'content': f'/static/notebooks/{notebook_name}/img_{image_count}.png'
-                    })
-                else:
-                    items.append(output)
-    
-    return items
-
-def main():
+# Subir cuando cambie el formato de salida: invalida todo el manifest
+CONVERTER_VERSION = 9
+
+# Imágenes del formato anterior al almacén de objetos (static/notebooks/<slug>/)
+LEGACY_IMAGE_RE = re.compile(r'^(img|output)_\d+\.png$')
+
+
+def set_paths(source=None, site=None):
+    """Cambia la carpeta de notebooks fuente y/o la raíz de salida."""
+    global SITE_DIR, NOTEBOOKS_DIR, OUTPUT_DIR, STATIC_DIR, MANIFEST_PATH
+    if source is not None:
+        NOTEBOOKS_DIR = Path(source).resolve()
+    if site is not None:
+        SITE_DIR = Path(site).resolve()
+        OUTPUT_DIR = SITE_DIR / 'templates' / 'notebooks'
+        STATIC_DIR = SITE_DIR / 'static' / 'notebooks'
+        MANIFEST_PATH = OUTPUT_DIR / '.manifest.json'
+
+def process_notebook(notebook_path, text_threshold=None, validate=False, stats=None, table_threshold=None,
+                     pipeline=None):
+    """Procesa un notebook y retorna ``(items, archivos generados)``.
+
+    La extracción la hace ``viewer.extraction`` (la misma que usa el visor):
+    la notebook se lee por trozos, las imágenes van al almacén por hash y las
+    salidas de texto más largas que ``text_threshold`` se guardan completas
+    aparte, y las tablas HTML más grandes que ``table_threshold`` pasan a datos
+    por columnas. ``pipeline`` son las transformaciones que se aplican a los
+    items al extraerlos (ver viewer/transforms.py). Con ``validate`` se
+    comprueba antes el esquema con nbformat. ``stats`` recibe los bytes de HTML
+    antes y después de minificar.
+    """
+    text_dir = previews.blob_dir(OUTPUT_DIR, notebook_path.stem)
+    items, written = extraction.extract(notebook_path, str(STATIC_DIR), text_dir,
+                                        text_threshold, validate=validate, stats=stats,
+                                        table_threshold=table_threshold, pipeline=pipeline)
+    return items, [Path(p) for p in written]
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest():
+    """Lee el manifest de conversiones; vacío si no existe o es de otra versión."""
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('converter') != CONVERTER_VERSION:
+        # Con otro formato de salida hay que reconvertir, pero conservamos las
+        # listas de archivos para poder limpiar los que ya no se generen
+        for entry in manifest.get('notebooks', {}).values():
+            entry['sha256'] = None
+    return manifest.get('notebooks', {})
+
+
+def save_manifest(entries):
+    with atomic_open(MANIFEST_PATH) as f:
+        json.dump({'converter': CONVERTER_VERSION, 'notebooks': entries}, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+def remove_outputs(paths, manifest=None):
+    """Borra archivos generados (rutas relativas a SITE_DIR) y carpetas vacías.
+
+    Las imágenes del almacén se comparten entre notebooks, también con las
+    convertidas desde el visor, que no están en el manifest: se borran al
+    final con ``images.prune_objects``, que mira qué usan los artefactos que
+    quedan.
+    """
+    if manifest:
+        in_use = {rel for entry in manifest.values() for rel in entry.get('outputs', [])}
+        paths = [rel for rel in paths if rel not in in_use]
+    objects_dir = STATIC_DIR / images.OBJECTS_DIRNAME
+    digests = set()
+    removed = 0
+    for rel in paths:
+        path = SITE_DIR / rel
+        if path.parent.parent == objects_dir and images.digest_of(rel):
+            digests.add(images.digest_of(rel))
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except FileNotFoundError:
+            continue
+        parent = path.parent
+        if parent not in (OUTPUT_DIR, STATIC_DIR, objects_dir):
+            try:
+                parent.rmdir()
+            except OSError:
+                pass
+    return removed + images.prune_objects(digests, str(OUTPUT_DIR), str(STATIC_DIR))
+
+
+def remove_legacy_outputs(manifest):
+    """Borra las imágenes del formato antiguo (``static/notebooks/<slug>/img_N.png``
+    y ``output_N.png``) de las notebooks ya convertidas con el almacén de
+    objetos: su artefacto nuevo ya no las usa. Devuelve cuántas borró."""
+    removed = 0
+    for name in manifest:
+        folder = STATIC_DIR / Path(name).stem
+        if not folder.is_dir():
+            continue
+        for path in folder.iterdir():
+            if LEGACY_IMAGE_RE.match(path.name):
+                path.unlink()
+                removed += 1
+        try:
+            folder.rmdir()
+        except OSError:
+            pass
+    return removed
+
+
+def stale_reason(entry, notebook_path, options):
+    """Motivo por el que hay que reconvertir la notebook, o None si la entrada
+    del manifest corresponde al notebook y opciones actuales.
+
+    Si (mtime, tamaño) no cambiaron no se vuelve a leer el archivo; si cambiaron
+    se compara el hash del contenido. Actualiza ``entry`` con la firma nueva.
+    """
+    if not entry or not entry.get('sha256'):
+        return 'sin convertir'
+    if entry.get('options') != options:
+        return 'opciones distintas'
+    if not all((SITE_DIR / rel).exists() for rel in entry.get('outputs', [])):
+        return 'faltan salidas'
+    st = notebook_path.stat()
+    if entry.get('mtime_ns') == st.st_mtime_ns and entry.get('size') == st.st_size:
+        return None
+    if entry['sha256'] != file_sha256(notebook_path):
+        return 'modificada'
+    # mismo contenido con otra fecha (p. ej. checkout de git): solo refrescar firma
+    entry['mtime_ns'] = st.st_mtime_ns
+    entry['size'] = st.st_size
+    return None
+
+
+def is_up_to_date(entry, notebook_path, options):
+    """True si la entrada del manifest corresponde al notebook y opciones actuales."""
+    return stale_reason(entry, notebook_path, options) is None
+
+
+def convert_one(notebook_path, options, validate=False):
+    """Convierte un notebook y escribe sus items; devuelve la entrada del manifest.
+
+    Cada notebook escribe solo en sus propias rutas, así que varias
+    conversiones pueden ejecutarse en paralelo en procesos distintos.
+    """
+    st = notebook_path.stat()
+    sha = file_sha256(notebook_path)
+    # Mismo bloqueo que open_notebook: nunca dos conversiones del mismo slug a la vez
+    with jobs.conversion_lock(OUTPUT_DIR / jobs.STATUS_DIRNAME, notebook_path.stem):
+        html_stats = {}
+        # hasta que el artefacto use sus imágenes, que ninguna poda las borre
+        with images.store_lock(str(STATIC_DIR), shared=True):
+            items, written = process_notebook(notebook_path, options['text_threshold'], validate, html_stats,
+                                              options.get('table_threshold'), options.get('pipeline'))
+            # <slug>.json o contenedor <slug>.nbc según --format (ver viewer/storage.py)
+            output_path = Path(storage.write_items(str(OUTPUT_DIR), notebook_path.stem, items,
+                                                   options.get('format')))
+        # Índice de búsqueda y modelo de vista compilado (ver viewer/search.py
+        # y viewer/compiled.py)
+        blob_dir = previews.blob_dir(OUTPUT_DIR, notebook_path.stem)
+        written.extend(Path(p) for p in search.write_segment(blob_dir, items, blob_dir))
+        out_st = output_path.stat()
+        _, model_path = compiled.write_model(blob_dir, items, notebook_path.stem,
+                                             (out_st.st_mtime_ns, out_st.st_size))
+        written.append(Path(model_path))
+
+    # Entrada del índice (con miniatura); main la vuelca en .catalog.json
+    converted_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    card, thumbs = catalog.make_entry(notebook_path.stem, items, output_path, STATIC_DIR, converted_at,
+                                      source=notebook_path)
+
+    outputs = [output_path] + written + [Path(p) for p in thumbs]
+    return {
+        'sha256': sha,
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'options': options,
+        'items': len(items),
+        # bytes de las salidas HTML antes y después de minificar (ver viewer/htmlmin.py)
+        'html_bytes': [html_stats['html_bytes'], html_stats['html_min_bytes']],
+        'outputs': sorted(set(str(p.relative_to(SITE_DIR).as_posix()) for p in outputs)),
+        'converted_at': converted_at,
+        'catalog': card,
+    }
+
+def write_catalog(manifest):
+    """Escribe el catálogo del índice a partir del manifest.
+
+    Se conservan las entradas añadidas por el visor (open_notebook) cuyo JSON
+    sigue existiendo.
+    """
+    entries = {e['catalog']['slug']: e['catalog'] for e in manifest.values() if e.get('catalog')}
+    with catalog.locked(OUTPUT_DIR):
+        try:
+            previous = catalog.load(catalog.catalog_path(OUTPUT_DIR))
+        except (OSError, ValueError):
+            previous = []
+        for e in previous:
+            if e['slug'] not in entries and storage.artifact_exists(str(OUTPUT_DIR), e['slug']):
+                entries[e['slug']] = e
+        catalog.save(OUTPUT_DIR, entries.values())
+
+
+def find_stale(args):
+    """``[(nombre, motivo)]`` de lo que cambiaría una conversión; no escribe nada.
+
+    Además de las notebooks nuevas, modificadas, con otras opciones o con
+    salidas que faltan, cuenta las borradas de la carpeta, las que no están en
+    el catálogo y las páginas pre-renderizadas que no corresponden a su
+    artefacto o a las plantillas actuales (si Django está disponible).
+    """
+    notebooks = sorted(NOTEBOOKS_DIR.glob('*.ipynb')) if NOTEBOOKS_DIR.exists() else []
+    manifest = load_manifest()
+    options = conversion_options(args)
+    stale = [(name, 'eliminada') for name in sorted(set(manifest) - {p.name for p in notebooks})]
+    current = []
+    for p in notebooks:
+        try:
+            reason = stale_reason(manifest.get(p.name), p, notebook_options(p, options, args.pipeline))
+        except ValueError as e:
+            reason = f'pipeline no válido ({e})'
+        if reason:
+            stale.append((p.name, reason))
+        else:
+            current.append(p)
+    if not current:
+        return stale
+    try:
+        entries = catalog.load(catalog.catalog_path(OUTPUT_DIR))
+    except (OSError, ValueError):
+        entries = []
+    listed = {e['slug'] for e in entries}
+    views = _django_views()
+    for p in current:
+        if p.stem not in listed:
+            stale.append((p.name, 'falta en el catálogo'))
+        elif views is not None and not views.page_is_current(p.stem, str(OUTPUT_DIR)):
+            stale.append((p.name, 'página desactualizada'))
+    return stale
+
+
+def _django_views():
+    # Las páginas se renderizan con las plantillas de Django; sin él, None
+    try:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+        import django
+        django.setup()
+        from viewer import views
+    except Exception as e:
+        print(f"WARN: no se pre-renderizan las páginas ({e})")
+        return None
+    return views
+
+
+def bake_pages(manifest):
+    """Pre-renderiza y comprime la página de cada notebook (ver viewer/pages.py).
+
+    Necesita Django para renderizar las plantillas; sin él, las páginas se
+    generan en la primera visita. Las rutas se añaden a las salidas del
+    manifest para que se borren junto con la notebook.
+    """
+    views = _django_views()
+    if views is None:
+        return
+    for name, entry in sorted(manifest.items()):
+        slug = Path(name).stem
+        try:
+            paths = views.bake_page(slug, str(OUTPUT_DIR))
+        except Exception as e:
+            print(f"WARN: página de {slug} no generada ({e})")
+            continue
+        outputs = set(entry.get('outputs', []))
+        outputs.update(Path(p).relative_to(SITE_DIR).as_posix() for p in paths)
+        entry['outputs'] = sorted(outputs)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Convierte las notebooks de datasets/ a JSON para el visor.')
+    parser.add_argument('--text-threshold', type=int, default=previews.TEXT_THRESHOLD,
+                        help='caracteres a partir de los cuales una salida de texto se guarda aparte '
+                             '(0 = nunca recortar; por defecto %(default)s)')
+    parser.add_argument('--table-threshold', type=int, default=tables.TABLE_THRESHOLD,
+                        help='bytes de HTML a partir de los cuales una tabla de pandas se sirve por páginas '
+                             '(0 = nunca; por defecto %(default)s)')
+    parser.add_argument('--force', action='store_true',
+                        help='reconvertir todo aunque el manifest indique que no hay cambios')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='procesos en paralelo (0 = uno por CPU; por defecto %(default)s)')
+    parser.add_argument('--validate', action='store_true',
+                        help='validar el esquema de cada notebook con nbformat (lee la notebook entera en memoria)')
+    parser.add_argument('--format', choices=sorted(storage.FORMATS), default=storage.DEFAULT_FORMAT,
+                        help='formato de los items convertidos: json o el contenedor indexado nbc '
+                             '(por defecto %(default)s; ver NOTEBOOK_STORAGE)')
+    parser.add_argument('--pipeline',
+                        help='transformaciones de los items, p. ej. "drop:markdown|truncate:2000" '
+                             '(por defecto las del transforms.json de la carpeta; "" = ninguna; '
+                             'ver viewer/transforms.py)')
+    parser.add_argument('--check', action='store_true',
+                        help='no convertir: listar lo que está desactualizado y terminar con código 1 si hay algo')
+    parser.add_argument('--watch', action='store_true',
+                        help='tras convertir, seguir vigilando la carpeta y reconvertir las notebooks '
+                             'que se crean, modifican o borran')
+    parser.add_argument('--source', help='carpeta con los .ipynb (por defecto datasets/)')
+    parser.add_argument('--site', help='raíz donde escribir templates/ y static/ (por defecto el proyecto)')
+    return parser.parse_args(argv)
+
+
+def conversion_options(args):
+    """Opciones generales de conversión (las que se guardan en el manifest)."""
+    return {'text_threshold': args.text_threshold, 'table_threshold': args.table_threshold,
+            'format': args.format}
+
+
+def notebook_options(notebook_path, options, pipeline=None):
+    """Opciones de conversión de una notebook: las generales más su pipeline.
+
+    El pipeline es ``pipeline`` (``--pipeline``) o el que toca a la notebook en
+    el ``transforms.json`` de su carpeta. Va en las opciones del manifest, así
+    que cambiarlo reconvierte solo las notebooks afectadas.
+    """
+    steps = transforms.parse(pipeline) if pipeline is not None else transforms.spec_for(notebook_path)
+    return dict(options, pipeline=steps) if steps else options
+
+
+def _timed_convert(notebook_path, options, validate=False):
+    t0 = time.perf_counter()
+    entry = convert_one(notebook_path, options, validate)
+    return entry, time.perf_counter() - t0
+
+
+def _init_worker(source, site):
+    # con el método 'spawn' los procesos hijos no heredan set_paths()
+    set_paths(source, site)
+
+
+def main(argv=None):
     """Función principal."""
+    args = parse_args(argv)
+    set_paths(args.source, args.site)
+    if args.pipeline is not None:
+        try:
+            args.pipeline = transforms.parse(args.pipeline)
+        except ValueError as e:
+            print(f"ERROR: --pipeline: {e}")
+            return 2
+    if args.check:
+        stale = find_stale(args)
+        for name, reason in stale:
+            print(f"  • {name}: {reason}")
+        print(f"{len(stale)} notebook(s) desactualizada(s)" if stale else "✓ Todo al día")
+        return 1 if stale else 0
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    # la vigilancia empieza antes de la primera pasada: lo que se guarde
+    # mientras tanto se convierte en cuanto termine
+    watcher = watch.Watcher(NOTEBOOKS_DIR, lambda changes: on_change(args, jobs, changes)) if args.watch else None
+    ok = convert_pass(args, jobs)
+    if watcher is not None:
+        print(f"Vigilando {NOTEBOOKS_DIR} ({watcher.backend}); Ctrl+C para terminar")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            watcher.close()
+            print()
+    return 0 if ok else 1
+
+
+def on_change(args, jobs, changes):
+    """Vuelve a convertir tras un cambio en la carpeta de notebooks (``--watch``).
+
+    La pasada es la misma de siempre: el manifest hace que solo se conviertan
+    las notebooks creadas o modificadas y que se poden las borradas.
+    """
+    labels = {'created': '+', 'modified': '~', 'deleted': '-'}
+    for path, kind in sorted(changes.items()):
+        print(f"{labels[kind]} {Path(path).name}")
+    convert_pass(args, jobs)
+
+
+def convert_pass(args, jobs):
+    """Una conversión incremental de toda la carpeta; False si algo falló."""
+    started = time.perf_counter()
     try:
         # Crear directorio de salida si no existe
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -109,36 +422,94 @@ def main():
         # Verificar si existe la carpeta de notebooks
         if not NOTEBOOKS_DIR.exists():
             print(f"WARN: La carpeta {NOTEBOOKS_DIR} no existe. Saltando conversión.")
-            return
+            return True
         
         # Buscar notebooks
-        notebooks = list(NOTEBOOKS_DIR.glob('*.ipynb'))
-        
+        notebooks = sorted(NOTEBOOKS_DIR.glob('*.ipynb'))
+        options = conversion_options(args)
+        manifest = load_manifest()
+        converted = skipped = failed = pruned = 0
+        html_saved = 0
+        convert_time = 0.0
+
+        # Salidas de notebooks que ya no existen en datasets/; se borran al
+        # final, cuando el manifest ya refleja qué imágenes siguen en uso
+        stale = set()
+        present = {p.name for p in notebooks}
+        for name in sorted(set(manifest) - present):
+            pruned += 1
+            stale.update(manifest.pop(name).get('outputs', []))
+            print(f"  - {name} (eliminada, salidas borradas)")
+
         if not notebooks:
             print(f"WARN: No se encontraron notebooks en {NOTEBOOKS_DIR}")
-            return
+        else:
+            print(f"Procesando {len(notebooks)} notebooks...")
         
-        print(f"Procesando {len(notebooks)} notebooks...")
-        
-        for notebook_path in sorted(notebooks):
+        per_notebook = {}
+        for p in notebooks:
             try:
-                print(f"  • {notebook_path.name}...", end=' ', flush=True)
-                items = process_notebook(notebook_path)
-                
-                # Guardar JSON
-                output_path = OUTPUT_DIR / f'{notebook_path.stem}.json'
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(items, f, indent=2, ensure_ascii=False)
-                
-                print(f"✓ ({len(items)} items)")
-            except Exception as e:
-                print(f"✗ Error: {str(e)}")
-        
-        print(f"✓ Conversión completada. Archivos guardados en {OUTPUT_DIR}")
+                per_notebook[p] = notebook_options(p, options, args.pipeline)
+            except ValueError as e:
+                failed += 1
+                print(f"  • {p.name}... ✗ Error en el pipeline: {e}")
+        pending = [p for p in per_notebook
+                   if args.force or not is_up_to_date(manifest.get(p.name), p, per_notebook[p])]
+        skipped = len(per_notebook) - len(pending)
+
+        pool = None
+        if jobs > 1 and len(pending) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(jobs, len(pending)), initializer=_init_worker,
+                                       initargs=(str(NOTEBOOKS_DIR), str(SITE_DIR)))
+            futures = [pool.submit(_timed_convert, p, per_notebook[p], args.validate) for p in pending]
+            results = ((p, f.result) for p, f in zip(pending, futures))
+        else:
+            results = ((p, lambda p=p: _timed_convert(p, per_notebook[p], args.validate)) for p in pending)
+
+        try:
+            # Los resultados se recogen en orden alfabético en ambos modos, así
+            # la salida y el manifest son idénticos con o sin --jobs
+            for notebook_path, result in results:
+                entry = manifest.get(notebook_path.name)
+                try:
+                    print(f"  • {notebook_path.name}...", end=' ', flush=True)
+                    new_entry, seconds = result()
+                    convert_time += seconds
+
+                    # Lo que generó la conversión anterior y ya no se usa
+                    if entry:
+                        stale.update(set(entry.get('outputs', [])) - set(new_entry['outputs']))
+                    manifest[notebook_path.name] = new_entry
+                    converted += 1
+                    html_before, html_after = new_entry['html_bytes']
+                    html_saved += html_before - html_after
+                    note = (f", HTML {html_before / 1024:.1f} → {html_after / 1024:.1f} KB"
+                            if html_before else '')
+                    print(f"✓ ({new_entry['items']} items{note})")
+                except Exception as e:
+                    failed += 1
+                    print(f"✗ Error: {str(e)}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        bake_pages(manifest)
+        remove_outputs(stale, manifest)
+        remove_legacy_outputs(manifest)
+        save_manifest(manifest)
+        write_catalog(manifest)
+        elapsed = time.perf_counter() - started
+        print(f"✓ Conversión completada: {converted} convertidas, {skipped} sin cambios, "
+              f"{pruned} eliminadas, {failed} con error "
+              f"({elapsed:.2f}s total, {convert_time:.2f}s convirtiendo, {jobs} proceso(s)). Archivos en {OUTPUT_DIR}")
+        if html_saved:
+            print(f"  HTML minificado: {html_saved / 1024:.1f} KB menos")
+        return not failed
     except Exception as e:
         print(f"ERROR crítico en conversión: {str(e)}")
         import traceback
         traceback.print_exc()
+        return False
 
 if __name__ == '__main__':
-    main()
+    raise SystemExit(main())
@@ -1,12 +1,16 @@
 import os
+import sys
 import json
-import base64
-from nbformat import read
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 NOTEBOOKS_DIR = os.path.join(BASE_DIR, 'datasets')
-TEMPLATES_OUT_DIR = os.path.join(BASE_DIR, 'notebook_site', 'templates', 'notebooks')
-STATIC_OUT_DIR = os.path.join(BASE_DIR, 'notebook_site', 'static', 'notebooks')
+TEMPLATES_OUT_DIR = os.path.join(BASE_DIR, 'templates', 'notebooks')
+STATIC_OUT_DIR = os.path.join(BASE_DIR, 'static', 'notebooks')
+
+# Extractor compartido con el proyecto principal (viewer/extraction.py); la
+# raíz va delante para que ``viewer`` no sea la app de esta carpeta
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from viewer import extraction, transforms  # noqa: E402
 
 TARGET_FILES = [
     '05_Regrecion_Loguistica.ipynb',
@@ -22,56 +26,13 @@ def ensure_dirs(path):
     os.makedirs(path, exist_ok=True)
 
 
-def save_image(b64data, out_path):
-    data = base64.b64decode(b64data.encode('utf-8'))
-    with open(out_path, 'wb') as f:
-        f.write(data)
-
-
 def extract_outputs(nb_path, base_name):
-    with open(nb_path, 'r', encoding='utf-8') as f:
-        nb = read(f, as_version=4)
-
-    items = []
-    static_dir = os.path.join(STATIC_OUT_DIR, base_name)
-    ensure_dirs(static_dir)
-
-    img_counter = 1
-    for cell in nb.cells:
-        if cell.cell_type == 'markdown':
-            items.append({'type': 'markdown', 'content': cell.source})
-        elif cell.cell_type == 'code':
-            for output in cell.get('outputs', []) or []:
-                data = output.get('data', {}) if isinstance(output, dict) else {}
-                # images (png/jpeg)
-                if 'image/png' in data:
-                    fname = f'img_{img_counter}.png'
-                    outpath = os.path.join(static_dir, fname)
-                    save_image(data['image/png'], outpath)
-                    items.append({'type': 'image', 'path': f'/static/notebooks/{base_name}/{fname}'})
-                    img_counter += 1
-                elif 'image/jpeg' in data:
-                    fname = f'img_{img_counter}.jpg'
-                    outpath = os.path.join(static_dir, fname)
-                    save_image(data['image/jpeg'], outpath)
-                    items.append({'type': 'image', 'path': f'/static/notebooks/{base_name}/{fname}'})
-                    img_counter += 1
-                # HTML output (tables rendered as HTML)
-                elif 'text/html' in data:
-                    html = data['text/html']
-                    if isinstance(html, list):
-                        html = ''.join(html)
-                    items.append({'type': 'html', 'content': html})
-                # plain text (streams or repr)
-                elif 'text/plain' in data:
-                    txt = data['text/plain']
-                    if isinstance(txt, list):
-                        txt = '\n'.join(txt)
-                    items.append({'type': 'text', 'content': txt})
-                elif output.get('output_type') == 'stream':
-                    txt = output.get('text', '')
-                    items.append({'type': 'text', 'content': txt})
-
+    # Sin recorte de textos ni tablas por páginas: las plantillas de este sitio
+    # no lo soportan. El pipeline sale de datasets/transforms.json (p. ej.
+    # {"*": "drop:markdown"} en lugar de pasar después remove_markdown.py)
+    text_dir = os.path.join(TEMPLATES_OUT_DIR, base_name)
+    items, _ = extraction.extract(nb_path, STATIC_OUT_DIR, text_dir, text_threshold=0,
+                                   table_threshold=0, pipeline=transforms.spec_for(nb_path))
     return items
 
 
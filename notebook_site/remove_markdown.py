@@ -1,31 +1,38 @@
-import json
+"""Quita los items markdown de las notebooks ya convertidas de este sitio.
+
+Usa el pipeline de transformaciones del proyecto principal
+(viewer/transforms.py): cada JSON se lee y se escribe una sola vez. Para no
+necesitar este paso, pon ``{"*": "drop:markdown"}`` en datasets/transforms.json
+y convert_notebooks.py los quitará al convertir.
+"""
 import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_OUT_DIR = os.path.join(BASE_DIR, 'templates', 'notebooks')
+
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+from viewer import storage, transforms  # noqa: E402
+
+PIPELINE = 'drop:markdown'
+
+
+def main():
+    for fname in sorted(os.listdir(TEMPLATES_OUT_DIR)):
+        found = storage.split_artifact(fname)
+        if found is None:
+            continue
+        slug, fmt = found
+        try:
+            items = storage.load_items(os.path.join(TEMPLATES_OUT_DIR, fname))
+            kept = list(transforms.apply(PIPELINE, items))
+            storage.write_items(TEMPLATES_OUT_DIR, slug, kept, fmt)
+            print(f'✓ Procesado: {fname} - Eliminados {len(items) - len(kept)} elementos markdown')
+        except Exception as e:
+            print(f'✗ Error en {fname}: {str(e)}')
+
+    print('\n✓ Proceso completado')
+
 
-# Archivos a procesar
-files = [
-    'templates/notebooks/05_Regrecion_Loguistica.json',
-    'templates/notebooks/06_Visualizacion_DtaSet.json',
-    'templates/notebooks/07_Divicion_del_DataSet.json',
-    'templates/notebooks/08_Preparacion_del_DataSet.json',
-    'templates/notebooks/09_Creacion-de-Transformadores-y-Pipeline-Personalizados.json',
-    'templates/notebooks/10_Evalucion-de-Resultados.json'
-]
-
-for file_path in files:
-    try:
-        # Leer el archivo JSON
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Filtrar eliminando todas las entradas con type: markdown
-        filtered_data = [entry for entry in data if entry.get('type') != 'markdown']
-        
-        # Guardar el archivo filtrado
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(filtered_data, f, indent=2, ensure_ascii=False)
-        
-        print(f'✓ Procesado: {os.path.basename(file_path)} - Eliminados {len(data) - len(filtered_data)} elementos markdown')
-    except Exception as e:
-        print(f'✗ Error en {os.path.basename(file_path)}: {str(e)}')
-
-print('\n✓ Proceso completado')
+if __name__ == '__main__':
+    main()
@@ -4,11 +4,9 @@ set -e
 echo "🔄 Ejecutando migraciones..."
 python manage.py migrate
 
-echo "📓 Convirtiendo notebooks..."
-python convert_notebooks.py
-
-echo "📦 Recolectando archivos estáticos..."
-python manage.py collectstatic --noinput
+# Las notebooks se convierten en el build (python manage.py bake_notebooks,
+# ver nixpacks.toml), así que arrancar no depende de cuántas haya. Si falta
+# alguna, su primera visita la convierte en segundo plano (NOTEBOOK_LAZY_CONVERT)
 
 echo "🚀 Iniciando gunicorn..."
 exec gunicorn app.wsgi
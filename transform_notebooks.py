@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Aplica un pipeline de transformaciones (viewer/transforms.py) a las notebooks
+ya convertidas de templates/notebooks, sin volver a leer los .ipynb.
+
+Cada notebook se lee una vez y se escribe una vez (en su mismo formato, .json
+o .nbc). Las transformaciones ven el texto completo de las salidas recortadas
+y las celdas de las tablas, que se vuelven a escribir con el resultado;
+después se regeneran su índice de búsqueda, su modelo compilado y su entrada
+del catálogo. La página pre-renderizada se regenera en la primera
+visita. Las notebooks se procesan en paralelo con --jobs.
+
+Ejemplo:
+    python transform_notebooks.py "drop:markdown|truncate:2000" --jobs 4
+
+Para que el cambio sobreviva a la próxima conversión de convert_notebooks.py,
+pon el mismo pipeline en el transforms.json de la carpeta de las notebooks.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import convert_notebooks as cn
+from viewer import catalog, compiled, images, jobs, pages, previews, search, storage, tables, transforms
+
+
+def expand_items(items, blob_dir):
+    """Items de un artefacto como items pendientes (ver transforms.py): los
+    textos recortados con su texto completo y las tablas con sus celdas en
+    ``_table``."""
+    for it in items:
+        if it.get('type') == 'text' and it.get('blob'):
+            with open(os.path.join(blob_dir, it['blob']), 'r', encoding='utf-8') as f:
+                yield {'type': 'text', 'content': f.read()}
+        elif it.get('type') == 'table' and it.get('blob'):
+            with open(os.path.join(blob_dir, it['blob']), 'r', encoding='utf-8') as f:
+                yield dict(it, _table=json.load(f))
+        else:
+            yield it
+
+
+def finish_items(items, blob_dir):
+    """Items definitivos: vuelve a escribir los textos completos y las tablas."""
+    previews.clear_blobs(blob_dir)
+    tables.clear_blobs(blob_dir)
+    out = []
+    texts = n_tables = 0
+    for it in items:
+        if it.get('type') == 'text' and 'blob' not in it:
+            texts += 1
+            it = previews.text_item(it.get('content') or '', blob_dir, texts)
+        elif '_table' in it:
+            n_tables += 1
+            it = dict(it)
+            table = it.pop('_table')
+            it['blob'] = f'table_{n_tables}.json'
+            tables.write_table(blob_dir, it['blob'], table['columns'], table['dtypes'], table['data'])
+        out.append(it)
+    return out
+
+
+def transform_one(slug, steps):
+    """Aplica ``steps`` a la notebook ``slug``; devuelve ``(antes, después, entrada)``.
+
+    ``antes`` y ``después`` son el número de items.
+    """
+    notes_dir = str(cn.OUTPUT_DIR)
+    with jobs.conversion_lock(cn.OUTPUT_DIR / jobs.STATUS_DIRNAME, slug):
+        path = storage.artifact_path(notes_dir, slug)
+        fmt = storage.split_artifact(os.path.basename(path))[1]
+        blob_dir = previews.blob_dir(cn.OUTPUT_DIR, slug)
+        with storage.open_items(path) as source:
+            before = len(source)
+            previous_images = images.item_digests(source)
+            # entero en memoria: los archivos de la notebook se reescriben después
+            items = list(transforms.apply(steps, expand_items(source, blob_dir)))
+        items = finish_items(items, blob_dir)
+        out_path = storage.write_items(notes_dir, slug, items, fmt)
+        # p. ej. con drop:image, las imágenes que ya no usa ninguna notebook
+        images.prune_objects(previous_images - images.item_digests(items), notes_dir, str(cn.STATIC_DIR))
+        search.write_segment(blob_dir, items, blob_dir)
+        # la página guardada es de los items anteriores: se rehace en la primera visita
+        for page_path in pages.page_files(blob_dir):
+            os.remove(page_path)
+        st = os.stat(out_path)
+        compiled.write_model(blob_dir, items, slug, (st.st_mtime_ns, st.st_size))
+    converted_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    entry, _ = catalog.make_entry(slug, items, out_path, cn.STATIC_DIR, converted_at)
+    return before, len(items), entry
+
+
+def _timed_transform(slug, steps):
+    t0 = time.perf_counter()
+    result = transform_one(slug, steps)
+    return result, time.perf_counter() - t0
+
+
+def catalog_slugs(notes_dir):
+    """Slugs con artefacto en ``notes_dir`` (cada uno una vez, sea cual sea el formato)."""
+    slugs = set()
+    for fname in os.listdir(notes_dir):
+        found = storage.split_artifact(fname)
+        if found is not None:
+            slugs.add(found[0])
+    return sorted(slugs)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Aplica un pipeline de transformaciones a las notebooks ya convertidas.')
+    parser.add_argument('pipeline', help='pasos separados por "|", p. ej. "drop:markdown|redact" '
+                                         f'(hay: {", ".join(sorted(transforms.TRANSFORMS))})')
+    parser.add_argument('slugs', nargs='*', help='notebooks a transformar (por defecto todas)')
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                        help='procesos en paralelo (0 = uno por CPU; por defecto %(default)s)')
+    parser.add_argument('--site', help='raíz con templates/ y static/ (por defecto el proyecto)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cn.set_paths(site=args.site)
+    try:
+        steps = transforms.parse(args.pipeline)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 2
+    if not steps:
+        print("WARN: pipeline vacío, no hay nada que hacer")
+        return 0
+    if not cn.OUTPUT_DIR.is_dir():
+        print(f"ERROR: no existe {cn.OUTPUT_DIR}")
+        return 2
+    slugs = args.slugs or catalog_slugs(str(cn.OUTPUT_DIR))
+    missing = [s for s in slugs if not storage.artifact_exists(str(cn.OUTPUT_DIR), s)]
+    if missing:
+        print(f"ERROR: no hay artefacto para {', '.join(missing)}")
+        return 2
+
+    jobs_n = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    started = time.perf_counter()
+    print(f"Aplicando {'|'.join(steps)} a {len(slugs)} notebooks...")
+    pool = None
+    if jobs_n > 1 and len(slugs) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(jobs_n, len(slugs)), initializer=cn._init_worker,
+                                   initargs=(None, str(cn.SITE_DIR)))
+        futures = [pool.submit(_timed_transform, slug, steps) for slug in slugs]
+        results = ((slug, f.result) for slug, f in zip(slugs, futures))
+    else:
+        results = ((slug, lambda slug=slug: _timed_transform(slug, steps)) for slug in slugs)
+
+    done = failed = 0
+    try:
+        for slug, result in results:
+            print(f"  • {slug}...", end=' ', flush=True)
+            try:
+                (before, after, entry), seconds = result()
+            except Exception as e:
+                failed += 1
+                print(f"✗ Error: {e}")
+                continue
+            catalog.upsert(str(cn.OUTPUT_DIR), entry)
+            done += 1
+            print(f"✓ ({before} → {after} items, {seconds:.2f}s)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(f"✓ {done} transformadas, {failed} con error ({time.perf_counter() - started:.2f}s, "
+          f"{jobs_n} proceso(s))")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,23 @@
+import os
+import sys
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+def _serving_runserver():
+    # Con el autorecargador, runserver arranca dos procesos y solo el hijo
+    # (RUN_MAIN=true) atiende peticiones
+    if len(sys.argv) < 2 or sys.argv[1] != 'runserver':
+        return False
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+
+
+class ViewerConfig(AppConfig):
+    name = 'viewer'
+
+    def ready(self):
+        # NOTEBOOK_WATCH: vigilar datasets/ solo en el servidor de desarrollo
+        if getattr(settings, 'NOTEBOOK_WATCH', False) and _serving_runserver():
+            from . import views
+            views.start_watcher()
@@ -0,0 +1,62 @@
+"""Escritura atómica y bloqueos entre procesos para los archivos generados.
+
+``atomic_open`` escribe en un temporal de la misma carpeta y lo renombra con
+``os.replace`` al cerrar: quien lee el archivo (otra petición, otro proceso de
+gunicorn) ve la versión anterior o la nueva completa, nunca una a medias.
+``file_lock`` serializa con ``flock`` las secciones que leen y reescriben un
+archivo compartido (o, con ``shared``, deja entrar a la vez a varios lectores).
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+@contextmanager
+def atomic_open(path, mode='w', encoding='utf-8'):
+    """Como ``open(path, mode)`` pero el archivo aparece entero o no aparece."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+        # mkstemp crea el archivo con permisos 0600
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path, blocking=True, shared=False):
+    """Bloqueo exclusivo (o compartido, con ``shared``) sobre ``path`` (se crea
+    si no existe).
+
+    Produce True si se obtuvo el bloqueo; con ``blocking=False`` produce False
+    en lugar de esperar cuando otro lo tiene. ``flock`` va por descriptor, así
+    que también excluye a otros hilos del mismo proceso (y al propio hilo si
+    ya tiene otro bloqueo sobre ``path``).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    f = open(path, 'a')
+    try:
+        if fcntl is not None:
+            try:
+                mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+                fcntl.flock(f, mode | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+    finally:
+        # cerrar el descriptor libera el flock
+        f.close()
@@ -0,0 +1,127 @@
+"""Caché LRU en memoria para notebooks convertidas.
+
+Guarda el resultado ya decodificado (items, resumen y secciones) de cada JSON
+de ``templates/notebooks`` para que las visitas repetidas no vuelvan a leer el
+archivo ni a ejecutar ``json.load``.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+# Bytes aproximados de cada número, None o contenedor además de su contenido
+SLOT_BYTES = 8
+
+
+def estimate_size(value):
+    """Bytes aproximados que ocupa ``value`` decodificado.
+
+    Suma la longitud de los textos y bytes de ``value`` (dicts, listas y
+    tuplas anidados) más ``SLOT_BYTES`` por cada elemento. No es
+    ``sys.getsizeof``, pero crece igual que la memoria real y cuesta una
+    pasada, que se hace una vez al cargar.
+    """
+    total = 0
+    stack = [value]
+    while stack:
+        v = stack.pop()
+        if isinstance(v, (str, bytes, bytearray)):
+            total += len(v) + SLOT_BYTES
+        elif isinstance(v, dict):
+            total += SLOT_BYTES
+            stack.extend(v.keys())
+            stack.extend(v.values())
+        elif isinstance(v, (list, tuple)):
+            total += SLOT_BYTES
+            stack.extend(v)
+        else:
+            total += SLOT_BYTES
+    return total
+
+
+class NotebookCache:
+    """LRU acotada por número de entradas y por bytes.
+
+    Las entradas se indexan por ruta y se validan con ``(mtime_ns, size)`` del
+    archivo: si cualquiera de los dos cambia, la entrada se recarga. El peso de
+    cada entrada es el del valor cargado, no el del archivo: un ``.nbc``
+    comprimido o la meta de una página pesan poco en disco y mucho en memoria.
+    ``weigh(valor)`` lo calcula; por defecto ``estimate_size``.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=64 * 1024 * 1024, weigh=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.weigh = weigh or estimate_size
+        self._entries = OrderedDict()  # path -> (signature, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def signature(path):
+        """Firma ``(mtime_ns, size)`` del archivo; lanza OSError si no existe."""
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, path, loader):
+        """Devuelve el valor cacheado para ``path`` o lo carga con ``loader(path)``."""
+        try:
+            sig = self.signature(path)
+        except OSError:
+            # El archivo desapareció: no retener su contenido en memoria
+            self.invalidate(path)
+            raise
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == sig:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = loader(path)
+        size = self.weigh(value)
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[1]
+            # Un valor más grande que todo el presupuesto no se cachea
+            if size <= self.max_bytes:
+                self._entries[path] = (sig, size, value)
+                self._bytes += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def invalidate(self, path):
+        """Descarta la entrada de ``path`` (p. ej. tras reescribir el JSON)."""
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Contadores y ocupación actual de la caché."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
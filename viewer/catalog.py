@@ -0,0 +1,131 @@
+"""Catálogo de notebooks convertidas para la página índice.
+
+La conversión escribe ``templates/notebooks/.catalog.json`` con una entrada
+por notebook (título, slug, número de items por tipo, tamaño, miniatura,
+fecha de conversión y ruta de la notebook fuente). La vista ``index`` lo mantiene en memoria y solo lo
+vuelve a leer cuando cambia el archivo, así que listar las notebooks cuesta un
+``stat`` sin importar cuántas haya.
+
+Este módulo no depende de Django para que también lo use convert_notebooks.py.
+"""
+import json
+import os
+from collections import Counter
+from datetime import datetime, timezone
+
+from . import images, storage
+from .atomic import atomic_open, file_lock
+
+CATALOG_NAME = '.catalog.json'
+CATALOG_VERSION = 1
+
+
+def catalog_path(notes_dir):
+    return os.path.join(notes_dir, CATALOG_NAME)
+
+
+def locked(notes_dir):
+    """Bloqueo para leer y reescribir el catálogo sin perder entradas ajenas."""
+    return file_lock(catalog_path(notes_dir) + '.lock')
+
+
+def make_entry(slug, items, path, static_dir, converted_at=None, source=None):
+    """Entrada del catálogo para una notebook ya convertida.
+
+    Genera (o reutiliza) la miniatura a partir de la primera imagen.
+    ``source`` es el ``.ipynb`` convertido: dos notebooks con el mismo nombre
+    en carpetas distintas comparten slug. Devuelve ``(entrada, rutas escritas)``.
+    """
+    counts = Counter(it.get('type') for it in items)
+    thumb = None
+    written = []
+    for it in items:
+        url = it.get('content') or it.get('path')
+        if it.get('type') == 'image' and url:
+            thumb, written = images.thumbnail(url, static_dir)
+            break
+    if converted_at is None:
+        converted_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    entry = {
+        'slug': slug,
+        'title': slug.replace('_', ' '),
+        'items': len(items),
+        'counts': dict(sorted(counts.items())),
+        'size': os.path.getsize(path),
+        'thumb': thumb,
+        'converted_at': converted_at,
+    }
+    if source is not None:
+        entry['source'] = os.path.abspath(source)
+    return entry, written
+
+
+def scan(notes_dir, static_dir):
+    """Construye el catálogo leyendo todas las notebooks (lento; solo como respaldo)."""
+    entries = []
+    if not os.path.isdir(notes_dir):
+        return entries
+    for fname in sorted(os.listdir(notes_dir)):
+        found = storage.split_artifact(fname)
+        if found is None:
+            continue
+        slug = found[0]
+        path = os.path.join(notes_dir, fname)
+        # con los dos formatos presentes, solo el que leería el visor
+        if path != storage.artifact_path(notes_dir, slug):
+            continue
+        try:
+            items = storage.load_items(path)
+        except (OSError, ValueError):
+            continue
+        mtime = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+        entry, _ = make_entry(slug, items, path, static_dir, mtime.isoformat(timespec='seconds'))
+        entries.append(entry)
+    return entries
+
+
+def load(path):
+    """Entradas de un catálogo escrito por ``save``; lanza OSError/ValueError."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != CATALOG_VERSION:
+        raise ValueError('versión de catálogo desconocida')
+    return data['notebooks']
+
+
+def save(notes_dir, entries):
+    """Escribe el catálogo de forma atómica, ordenado por slug."""
+    entries = sorted(entries, key=lambda e: e['slug'])
+    with atomic_open(catalog_path(notes_dir)) as f:
+        json.dump({'version': CATALOG_VERSION, 'notebooks': entries}, f, indent=1, ensure_ascii=False)
+
+
+def upsert(notes_dir, entry):
+    """Añade o reemplaza la entrada de una notebook (p. ej. tras open_notebook).
+
+    Una entrada sin ``source`` (p. ej. de transform_notebooks.py, que parte
+    del artefacto) conserva la fuente de la anterior.
+    """
+    with locked(notes_dir):
+        try:
+            entries = load(catalog_path(notes_dir))
+        except (OSError, ValueError):
+            entries = []
+        for old in entries:
+            if old['slug'] == entry['slug'] and 'source' in old and 'source' not in entry:
+                entry = {**entry, 'source': old['source']}
+        entries = [e for e in entries if e['slug'] != entry['slug']]
+        entries.append(entry)
+        save(notes_dir, entries)
+
+
+def remove(notes_dir, slug):
+    """Quita la entrada de ``slug`` (p. ej. cuando se borra su notebook)."""
+    with locked(notes_dir):
+        try:
+            entries = load(catalog_path(notes_dir))
+        except (OSError, ValueError):
+            return
+        kept = [e for e in entries if e['slug'] != slug]
+        if len(kept) != len(entries):
+            save(notes_dir, kept)
@@ -0,0 +1,264 @@
+"""Modelo de vista compilado de cada notebook convertida.
+
+Al convertir se genera ``templates/notebooks/<slug>/model.json`` con todo lo
+que la página necesita ya resuelto:
+
+- ``summary``: HTML del primer markdown (sin sus encabezados)
+- ``sections``: ``{'id', 'title'}`` de los encabezados (h1-h3) del resto de
+  celdas markdown; ``id`` es el ancla del encabezado en la página
+- ``items``: los items del JSON sin el markdown del resumen, cada uno con
+  ``html`` (el fragmento ``<article>`` que se muestra) y las celdas markdown
+  ya convertidas a HTML
+- ``markdown``: HTML de cada celda markdown por hash de su contenido, para
+  no volver a convertir las celdas que no cambian en la próxima conversión
+- ``stylesheet``: los bloques ``<style>`` de las salidas HTML (las tablas de
+  pandas), cada uno una vez; la página los pone una sola vez en lugar de
+  repetirlos en cada tabla (ver htmlmin.py)
+
+``source`` es la firma ``(mtime_ns, size)`` del JSON del que sale el modelo;
+si no coincide (o cambia ``COMPILED_VERSION``) el modelo se vuelve a generar.
+Así la petición no parsea markdown: solo lee el modelo.
+
+Este módulo no depende de Django.
+"""
+import hashlib
+import html as _html
+import json
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+
+try:
+    import markdown as md
+except ImportError:
+    md = None
+
+from . import htmlmin
+from .atomic import atomic_open
+
+# Subir cuando cambie el HTML generado
+COMPILED_VERSION = 3
+MODEL_NAME = 'model.json'
+
+# Encabezados del resumen que no se usan como secciones
+GENERIC_HEADINGS = {'dataset', 'data set', 'datafiles', 'data files', 'data', 'descripcion',
+                    'descripción', 'datos', 'datafile'}
+
+_HEADING_RE = re.compile(r'<h([1-3])>(.*?)</h\1>', re.S)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Memo del proceso: hash del markdown -> HTML
+MEMO_SIZE = 4096
+_memo = OrderedDict()
+
+
+def model_path(directory):
+    return os.path.join(directory, MODEL_NAME)
+
+
+def _plain_html(text):
+    # Sin la librería markdown: escapar y respetar párrafos y saltos de línea
+    return '<p>' + _html.escape(text).replace('\n\n', '</p><p>').replace('\n', '<br>') + '</p>'
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def render_markdown(text, known=None):
+    """HTML de ``text``; memorizado por hash (y ``known``: hash -> HTML previo)."""
+    key = content_hash(text)
+    html = _memo.get(key)
+    if html is None and known:
+        html = known.get(key)
+    if html is None:
+        if md is not None:
+            try:
+                html = md.markdown(text, extensions=['extra', 'sane_lists'])
+            except Exception:
+                html = _plain_html(text)
+        else:
+            html = _plain_html(text)
+    _memo[key] = html
+    _memo.move_to_end(key)
+    while len(_memo) > MEMO_SIZE:
+        _memo.popitem(last=False)
+    return key, html
+
+
+def slugify(text):
+    """Ancla estable para un encabezado: minúsculas, sin tildes ni signos."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r'[^\w\s-]', '', text)
+    return re.sub(r'[\s_-]+', '-', text).strip('-') or 'seccion'
+
+
+def _is_generic(title):
+    norm = title.lower().replace(':', '').strip()
+    return any(norm == g or norm.startswith(g + ' ') for g in GENERIC_HEADINGS)
+
+
+def _add_anchors(html, used, sections):
+    """Pone ``id`` a los h1-h3 de ``html`` y los apunta en ``sections``."""
+    def anchor(m):
+        title = _html.unescape(_TAG_RE.sub('', m.group(2))).strip()
+        base = slugify(title)
+        anchor_id = base
+        n = 1
+        while anchor_id in used:
+            n += 1
+            anchor_id = f'{base}-{n}'
+        used.add(anchor_id)
+        if title and not _is_generic(title) and title not in (s['title'] for s in sections):
+            sections.append({'id': anchor_id, 'title': title})
+        return f'<h{m.group(1)} id="{anchor_id}">{m.group(2)}</h{m.group(1)}>'
+    return _HEADING_RE.sub(anchor, html)
+
+
+def _summary_text(raw):
+    # quitar los encabezados para no repetir el título en el resumen
+    lines = [ln for ln in raw.splitlines() if not ln.strip().startswith('#')]
+    return '\n'.join(lines).strip()
+
+
+def summary_index(items):
+    """Posición del markdown que se muestra como resumen y no entre los
+    items, o None. Los demás items se numeran como si no estuviera."""
+    for idx, it in enumerate(items):
+        if it.get('type') == 'markdown' and it.get('content') and _summary_text(it['content']):
+            return idx
+    return None
+
+
+def _filesize(n):
+    # mismo formato que el filtro filesizeformat de Django
+    if n < 1024:
+        return f'{n}\xa0bytes'
+    for unit in ('KB', 'MB', 'GB', 'TB'):
+        n /= 1024
+        if n < 1024 or unit == 'TB':
+            return f'{n:.1f}\xa0{unit}'
+
+
+def item_html(item, slug):
+    """Fragmento ``<article>`` de un item (lo que pintaba notebook_items.html)."""
+    kind = item.get('type')
+    esc = _html.escape
+    if kind == 'markdown':
+        return f'<article class="card markdown">{item["rendered"]}</article>'
+    if kind == 'image':
+        src = esc(item.get('content') or item.get('path') or '')
+        attrs = ''
+        if item.get('variants'):
+            srcset = ''.join(f'{esc(v["url"])} {v["width"]}w, ' for v in item['variants'])
+            attrs += (f' srcset="{srcset}{src} {item.get("width", "")}w"'
+                      ' sizes="(max-width: 1200px) calc(100vw - 56px), 1144px"')
+        if item.get('width'):
+            attrs += f' width="{item["width"]}" height="{item["height"]}"'
+        return (f'<article class="card image"><img src="{src}"{attrs} loading="lazy" '
+                f'decoding="async" alt="imagen"></article>')
+    if kind == 'html':
+        return f'<article class="card html-output">{item.get("content") or ""}</article>'
+    if kind == 'text' and item.get('blob'):
+        return (
+            f'<article class="card text-output text-truncated" '
+            f'data-blob-url="/api/notebook/{esc(slug)}/text/{esc(item["blob"])}/" data-size="{item["size"]}">\n'
+            f'      <pre class="text-head">{esc(item.get("content") or "")}</pre>\n'
+            f'      <div class="text-omitted">\n'
+            f'        <button type="button" class="text-expand">Mostrar completo ({item["omitted"]} '
+            f'caracteres omitidos · {_filesize(item["size"])})</button>\n'
+            f'      </div>\n'
+            f'      <pre class="text-tail">{esc(item.get("tail") or "")}</pre>\n'
+            f'    </article>'
+        )
+    if kind == 'text':
+        return f'<article class="card text-output"><pre>{esc(item.get("content") or "")}</pre></article>'
+    if kind == 'table':
+        # solo el encabezado: las filas visibles las pide el JS (ver tables.py)
+        head = ''.join(
+            f'<th data-col="{i}" data-dtype="{esc(dtype)}" title="Ordenar por {esc(col)}">{esc(col)}</th>'
+            for i, (col, dtype) in enumerate(zip(item['columns'], item['dtypes'])))
+        caption = esc(item.get('caption') or f'{item["rows"]} filas')
+        return (
+            f'<article class="card table-output" data-rows-url="/api/notebook/{esc(slug)}/table/{esc(item["blob"])}/" '
+            f'data-total="{item["rows"]}" data-index-columns="{item.get("index_columns", 0)}">\n'
+            f'      <div class="table-meta">{caption}</div>\n'
+            f'      <div class="vtable-scroll"><table class="vtable"><thead><tr>{head}</tr></thead>'
+            f'<tbody></tbody></table></div>\n'
+            f'    </article>'
+        )
+    return ''
+
+
+def compile_items(items, slug, source, known=None):
+    """Modelo de vista de ``items`` (lista del JSON convertido).
+
+    ``known`` es el mapa hash -> HTML de un modelo anterior; las celdas
+    markdown que ya estaban no se vuelven a convertir.
+    """
+    items = list(items)
+    summary = None
+    rendered = {}
+    idx = summary_index(items)
+    if idx is not None:
+        # el markdown del resumen no se repite entre los items
+        key, summary = render_markdown(_summary_text(items.pop(idx)['content']), known)
+        rendered[key] = summary
+
+    sections = []
+    used = set()
+    styles = []
+    out = []
+    for it in items:
+        it = dict(it)
+        shown = it
+        if it.get('type') == 'markdown':
+            key, html = render_markdown(it.get('content') or '', known)
+            rendered[key] = html
+            shown = dict(it, rendered=_add_anchors(html, used, sections))
+        elif it.get('type') == 'html' and it.get('content'):
+            # el fragmento va sin sus <style>; ``content`` (API JSON) queda igual
+            content, found = htmlmin.split_styles(it['content'])
+            styles.extend(css for css in found if css not in styles)
+            shown = dict(it, content=content)
+        it['html'] = item_html(shown, slug)
+        out.append(it)
+    return {
+        'version': COMPILED_VERSION,
+        'markdown_lib': md is not None,
+        'source': list(source),
+        'summary': summary,
+        'sections': sections,
+        'stylesheet': ''.join(styles),
+        'items': out,
+        'markdown': rendered,
+    }
+
+
+def is_current(model, source):
+    return (model.get('version') == COMPILED_VERSION and model.get('markdown_lib') == (md is not None)
+            and tuple(model.get('source') or ()) == tuple(source))
+
+
+def load_model(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_model(directory, items, slug, source):
+    """Compila y guarda el modelo; reutiliza el markdown del modelo anterior."""
+    path = model_path(directory)
+    try:
+        previous = load_model(path)
+    except (OSError, ValueError):
+        previous = {}
+    # el HTML guardado solo sirve si se generó igual que ahora
+    known = None
+    if previous.get('version') == COMPILED_VERSION and previous.get('markdown_lib') == (md is not None):
+        known = previous.get('markdown')
+    model = compile_items(items, slug, source, known)
+    with atomic_open(path) as f:
+        json.dump(model, f, ensure_ascii=False, separators=(',', ':'))
+    return model, path
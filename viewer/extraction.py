@@ -0,0 +1,239 @@
+"""Extracción de items (lo que muestra el visor) a partir de una notebook.
+
+Es el único extractor del proyecto: lo usan convert_notebooks.py, el script de
+notebook_site/ y ``/api/open-notebook/``, así que todos generan el mismo JSON.
+
+Cada salida se traduce con un manejador registrado:
+
+- ``display_data`` / ``execute_result``: se recorre ``MIME_ORDER`` y se usa el
+  primer tipo MIME presente en ``data`` que tenga manejador (una gráfica con
+  ``image/png`` y ``text/plain`` da solo la imagen).
+- ``stream`` y ``error``: manejador por ``output_type``.
+
+Para añadir un tipo basta con decorar una función ``(valor, extractor) ->
+item o None`` con ``mime_handler`` u ``output_handler``.
+
+Los manejadores dan items *pendientes*: los de texto llevan el texto completo
+y los de imagen la ``StreamedImage`` aún sin guardar (en ``_image``). Si se
+pide, el flujo de items pendientes pasa por un pipeline de transformaciones
+(``transforms.py``) y después ``Extractor.finish`` escribe lo que va aparte:
+recorta los textos largos guardando el completo (``previews.text_item``) y
+lleva las imágenes al almacén por hash (``images.image_item``). Así lo que el
+pipeline redacta o quita no llega a ningún archivo. Al final las tablas HTML
+grandes pasan a items ``table`` (``tables.tabulate_items``) y el resto de
+salidas HTML se minifican (``htmlmin.minify_items``).
+
+``python -m benchmarks.bench_extraction`` mide el coste de cada manejador.
+
+Este módulo no depende de Django.
+"""
+import os
+import re
+
+from . import htmlmin, images, nbstream, previews, tables, transforms
+
+# Manejadores por tipo MIME, en orden de preferencia
+MIME_HANDLERS = {}
+MIME_ORDER = []
+# Manejadores por output_type (salidas sin ``data``)
+OUTPUT_HANDLERS = {}
+
+# Secuencias de color ANSI de los tracebacks de IPython
+_ANSI_RE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+
+def mime_handler(mime, before=None):
+    """Registra un manejador para ``mime``; ``before`` lo antepone a otro tipo."""
+    def register(func):
+        MIME_HANDLERS[mime] = func
+        if mime in MIME_ORDER:
+            MIME_ORDER.remove(mime)
+        if before in MIME_ORDER:
+            MIME_ORDER.insert(MIME_ORDER.index(before), mime)
+        else:
+            MIME_ORDER.append(mime)
+        return func
+    return register
+
+
+def output_handler(output_type):
+    """Registra un manejador para las salidas de tipo ``output_type``."""
+    def register(func):
+        OUTPUT_HANDLERS[output_type] = func
+        return func
+    return register
+
+
+def _as_text(value):
+    # nbformat guarda los textos multilínea como listas de líneas
+    if isinstance(value, list):
+        return ''.join(value)
+    return value if isinstance(value, str) else ''
+
+
+class Extractor:
+    """Convierte los eventos de ``nbstream.iter_notebook`` en items.
+
+    ``item`` da el item pendiente de un evento y ``finish`` el definitivo.
+    ``items`` es la lista resultante y ``written`` las rutas que se han
+    escrito (imágenes, variantes y textos completos). ``text_dir`` es la
+    carpeta de los textos recortados; ``text_threshold=0`` no recorta nunca.
+    """
+
+    def __init__(self, static_dir, text_dir, text_threshold=None, markdown=True):
+        self.static_dir = static_dir
+        self.text_dir = text_dir
+        self.text_threshold = text_threshold
+        self.markdown = markdown
+        self.items = []
+        self.written = []
+        self.images = 0
+        self.texts = 0
+
+    def feed(self, kind, value):
+        """Procesa un evento ``(tipo, valor)`` de ``iter_notebook``."""
+        item = self.item(kind, value)
+        if item is not None:
+            self.items.append(self.finish(item))
+
+    def item(self, kind, value):
+        """Item pendiente de un evento ``(tipo, valor)``, sin añadirlo a ``items``."""
+        if kind == 'output':
+            return self.output_item(value)
+        if kind == 'markdown' and self.markdown:
+            return markdown_item(value, self)
+        return None
+
+    def output_item(self, output):
+        handler = OUTPUT_HANDLERS.get(output.get('output_type'))
+        if handler is not None:
+            return handler(output, self)
+        data = output.get('data')
+        if data:
+            for mime in MIME_ORDER:
+                if mime in data:
+                    return MIME_HANDLERS[mime](data[mime], self)
+        return None
+
+    def text(self, text):
+        """Item ``text`` pendiente (con el texto completo); None si está vacío."""
+        if not text.strip():
+            return None
+        return {'type': 'text', 'content': text}
+
+    def finish(self, item):
+        """Item definitivo de uno pendiente: escribe el texto completo y la imagen.
+
+        Las imágenes hay que terminarlas antes de pedir el siguiente evento:
+        ``iter_notebook`` borra al avanzar las que no se guardaron.
+        """
+        if item.get('type') == 'image' and '_image' in item:
+            stored, paths = images.image_item(item['_image'], self.static_dir)
+            self.written.extend(paths)
+            self.images += 1
+            return stored
+        if item.get('type') == 'text' and 'blob' not in item:
+            self.texts += 1
+            item = previews.text_item(item.get('content') or '', self.text_dir, self.texts,
+                                      self.text_threshold)
+            if 'blob' in item:
+                self.written.append(os.path.join(self.text_dir, item['blob']))
+        return item
+
+
+def markdown_item(source, extractor):
+    source = _as_text(source)
+    return {'type': 'markdown', 'content': source} if source.strip() else None
+
+
+def image_item(image, extractor):
+    if not isinstance(image, nbstream.StreamedImage):
+        # base64 que no venía como string (p. ej. una lista vacía)
+        return None
+    return {'type': 'image', '_image': image}
+
+
+for _mime in nbstream.IMAGE_MIMES:
+    mime_handler(_mime)(image_item)
+
+
+@mime_handler('image/svg+xml')
+def svg_item(svg, extractor):
+    # el SVG es texto: va en línea, como el resto de salidas HTML
+    svg = _as_text(svg)
+    return {'type': 'html', 'content': f'<div class="svg-output">{svg}</div>'} if svg.strip() else None
+
+
+@mime_handler('text/html')
+def html_item(html, extractor):
+    html = _as_text(html)
+    return {'type': 'html', 'content': html} if html.strip() else None
+
+
+@mime_handler('text/markdown')
+def markdown_output_item(source, extractor):
+    return markdown_item(source, extractor)
+
+
+@mime_handler('text/plain')
+def plain_item(text, extractor):
+    return extractor.text(_as_text(text))
+
+
+@output_handler('stream')
+def stream_item(output, extractor):
+    return extractor.text(_as_text(output.get('text')))
+
+
+@output_handler('error')
+def error_item(output, extractor):
+    traceback = output.get('traceback') or []
+    if traceback:
+        text = '\n'.join(_ANSI_RE.sub('', line) for line in traceback)
+    else:
+        text = f"{output.get('ename', 'Error')}: {output.get('evalue', '')}"
+    return extractor.text(text)
+
+
+def extract(path, static_dir, text_dir, text_threshold=None, markdown=True, validate=False,
+            progress=None, stats=None, table_threshold=None, pipeline=None):
+    """Extrae los items de la notebook ``path``; devuelve ``(items, rutas escritas)``.
+
+    Borra antes los textos completos y las tablas de una conversión anterior
+    en ``text_dir``; ``table_threshold=0`` deja todas las tablas como HTML.
+    ``pipeline`` son las transformaciones (transforms.py) que se aplican a los
+    items pendientes según salen del extractor, antes de escribir nada. ``progress(índice_celda, extractor)`` se
+    llama tras cada evento, para informar del avance. Si se pasa el dict
+    ``stats`` se rellena con ``html_bytes`` y ``html_min_bytes`` (HTML antes y
+    después de minificar).
+    """
+    previews.clear_blobs(text_dir)
+    tables.clear_blobs(text_dir)
+    extractor = Extractor(static_dir, text_dir, text_threshold, markdown)
+    spool_dir = os.path.join(static_dir, images.OBJECTS_DIRNAME)
+
+    def stream():
+        for cell_idx, kind, value in nbstream.iter_notebook(path, spool_dir=spool_dir, validate=validate):
+            item = extractor.item(kind, value)
+            if item is not None:
+                yield item
+            if progress is not None:
+                progress(cell_idx, extractor)
+
+    # El pipeline va antes de escribir textos, imágenes y tablas: lo que
+    # redacta o quita no llega a ningún archivo. Los pasos no acumulan items,
+    # así que cada uno se termina antes de leer el siguiente evento
+    source = stream()
+    try:
+        for item in transforms.apply(pipeline, source):
+            extractor.items.append(extractor.finish(item))
+    finally:
+        # con head:N el resto no se lee; cerrar borra los temporales abiertos
+        source.close()
+    # antes de minificar: así los <style> se deduplican solo entre los items
+    # que siguen siendo HTML
+    extractor.written.extend(tables.tabulate_items(extractor.items, text_dir, table_threshold))
+    before, after = htmlmin.minify_items(extractor.items)
+    if stats is not None:
+        stats.update(html_bytes=before, html_min_bytes=after)
+    return extractor.items, extractor.written
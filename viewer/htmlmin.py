@@ -0,0 +1,163 @@
+"""Minificación de las salidas HTML (tablas de pandas) al convertir.
+
+``DataFrame.to_html`` genera cada tabla con sangría, un bloque ``<style
+scoped>`` idéntico en todas las tablas y ``style="text-align: right;"`` en la
+fila de encabezados. ``minify_items`` recorre los items ``html`` de una
+notebook y:
+
+- colapsa los espacios: se quitan los que rodean las etiquetas de tabla (ahí
+  no se pintan) y el resto se reduce a uno, que se ve igual que varios; ``<pre>``,
+  ``<textarea>`` y ``<script>`` no se tocan, ni los fragmentos que usan
+  ``white-space`` (ahí los espacios sí se ven)
+- minifica el CSS de los ``<style>`` y de los atributos ``style``
+- deja cada bloque ``<style>`` distinto una sola vez por notebook, en el
+  primer item que lo usa: los navegadores no respetan ``scoped`` y cada bloque
+  ya se aplicaba a toda la página. El modelo compilado (compiled.py) los saca
+  a una única hoja de estilos con ``split_styles``.
+- quita atributos que no cambian nada: ``class``/``style``/``id`` vacíos y el
+  ``text-align`` de la fila de encabezados cuando la propia hoja de pandas ya
+  lo fija en cada ``th``
+- omite los cierres ``</td>``, ``</th>`` y ``</tr>`` que HTML5 permite omitir
+  (la celda o fila siguiente, o el fin de la sección, ya la cierra); en una
+  tabla de números son casi la mitad de los bytes
+
+Este módulo no depende de Django.
+"""
+import re
+
+# Etiquetas junto a las que los espacios no se pintan. Los bloques genéricos
+# (div, p...) no están: con display:inline-block un espacio sí se vería
+TRIM_TAGS = frozenset(('br', 'caption', 'col', 'colgroup', 'style', 'table', 'tbody', 'td', 'tfoot',
+                       'th', 'thead', 'tr'))
+# Contenido que se copia tal cual
+RAW_TAGS = frozenset(('pre', 'textarea', 'script'))
+
+_TOKEN_RE = re.compile(r'(<!--.*?-->|<[^>]*>)', re.S)
+_TAG_NAME_RE = re.compile(r'<\s*(/?)\s*([a-zA-Z][a-zA-Z0-9-]*)')
+_STYLE_BLOCK_RE = re.compile(r'<style\b[^>]*>(.*?)</style\s*>', re.S | re.I)
+_STYLE_ATTR_RE = re.compile(r'(\sstyle=)"([^"]*)"', re.I)
+_EMPTY_ATTR_RE = re.compile(r'\s(?:class|style|id)=""', re.I)
+_THEAD_RE = re.compile(r'<thead>.*?</thead>', re.S)
+_WS_RE = re.compile(r'\s+')
+# Cierres opcionales: se omiten si lo que sigue ya cierra la fila o la celda
+_END_TR_RE = re.compile(r'</tr>(?=<tr[\s>]|</t(?:body|head|foot)>|</table>)', re.I)
+_END_CELL_RE = re.compile(r'</t[dh]>(?=<t[dhr][\s>]|</t(?:body|head|foot|r)>|</table>)', re.I)
+
+# Regla de la hoja de pandas que hace redundante el text-align de <thead><tr>
+_PANDAS_THEAD_RULE = '.dataframe thead th{text-align:right}'
+_PANDAS_THEAD_TR = '<tr style="text-align:right">'
+
+
+def minify_css(css):
+    """CSS sin comentarios ni espacios sobrantes."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = _WS_RE.sub(' ', css).strip()
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # antes de ':' no: en 'a :hover' el espacio es un selector descendiente
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').rstrip(';')
+
+
+def _tag_name(token):
+    m = _TAG_NAME_RE.match(token)
+    return (m.group(2).lower(), m.group(1) == '/') if m else (None, False)
+
+
+def _minify_tag(token):
+    token = _STYLE_ATTR_RE.sub(lambda m: f'{m.group(1)}"{minify_css(m.group(2))}"', token)
+    return _EMPTY_ATTR_RE.sub('', token)
+
+
+def minify(html):
+    """Fragmento HTML minificado (ver el docstring del módulo)."""
+    collapse = 'white-space' not in html
+    tokens = _TOKEN_RE.split(html)
+    out = []
+    raw = None   # etiqueta raw abierta (pre, textarea, script) o 'style'
+    for i, token in enumerate(tokens):
+        if not token:
+            continue
+        if i % 2:  # etiqueta o comentario
+            if token.startswith('<!--'):
+                # los comentarios no se pintan (salvo los condicionales de IE)
+                if raw is not None or token.startswith('<!--['):
+                    out.append(token)
+                continue
+            name, closing = _tag_name(token)
+            if raw is not None:
+                if closing and name == raw:
+                    raw = None
+                    out.append(token)
+                else:
+                    out.append(token)
+                continue
+            if not closing and (name in RAW_TAGS or name == 'style'):
+                raw = name
+            out.append(_minify_tag(token))
+            continue
+        if raw == 'style':
+            out.append(minify_css(token))
+            continue
+        if raw is not None or not collapse:
+            out.append(token)
+            continue
+        # texto: espacios pegados a etiquetas de tabla fuera, el resto a uno
+        text = _WS_RE.sub(' ', token)
+        if i == 0 or _tag_name(tokens[i - 1])[0] in TRIM_TAGS:
+            text = text.lstrip()
+        if i == len(tokens) - 1 or _tag_name(tokens[i + 1])[0] in TRIM_TAGS:
+            text = text.rstrip()
+        if text:
+            out.append(text)
+    html = ''.join(out)
+    if not collapse or '<pre' in html or '<textarea' in html or '<script' in html:
+        return html
+    return _END_CELL_RE.sub('', _END_TR_RE.sub('', html))
+
+
+def split_styles(html):
+    """``(html sin bloques <style>, [css de cada bloque])``."""
+    styles = [minify_css(css) for css in _STYLE_BLOCK_RE.findall(html)]
+    return (_STYLE_BLOCK_RE.sub('', html) if styles else html), styles
+
+
+def _drop_redundant(html, styles):
+    if _PANDAS_THEAD_RULE in ''.join(styles):
+        html = _THEAD_RE.sub(lambda m: m.group(0).replace(_PANDAS_THEAD_TR, '<tr>'), html)
+    return html
+
+
+def minify_item(item, seen):
+    """Minifica en su sitio un item ``html``; ``seen`` son los ``<style>`` ya
+    emitidos en la notebook. Devuelve ``(bytes antes, bytes después)``."""
+    html = item['content']
+    before = len(html.encode('utf-8'))
+    html = minify(html)
+    _, styles = split_styles(html)
+    html = _drop_redundant(html, styles)
+    if styles:
+        # cada bloque <style> distinto solo la primera vez
+        def keep_first(m):
+            css = m.group(1)
+            if css in seen:
+                return ''
+            seen.add(css)
+            return m.group(0)
+        html = _STYLE_BLOCK_RE.sub(keep_first, html)
+    item['content'] = html
+    return before, len(html.encode('utf-8'))
+
+
+def minify_items(items):
+    """Minifica en su sitio los items ``html`` de una notebook.
+
+    Devuelve ``(bytes antes, bytes después)`` del contenido HTML (UTF-8).
+    """
+    before = after = 0
+    seen = set()
+    for it in items:
+        if it.get('type') == 'html' and it.get('content'):
+            b, a = minify_item(it, seen)
+            before += b
+            after += a
+    return before, after
@@ -0,0 +1,279 @@
+"""Almacén de imágenes direccionado por contenido.
+
+Cada imagen extraída se guarda una sola vez como
+``static/notebooks/objects/<aa>/<sha256>.<ext>``: la misma gráfica en dos
+notebooks (o en dos conversiones) ocupa un único archivo, y como la URL
+cambia cuando cambia el contenido se puede servir con
+``Cache-Control: immutable``.
+
+Para cada imagen se generan además versiones reducidas (``<sha256>-w480.png``,
+``-w960``) y se anotan sus dimensiones, de modo que la página puede usar
+``srcset`` y reservar el espacio antes de descargarlas. Las variantes
+necesitan Pillow; sin él solo se guardan las dimensiones del original.
+
+Los objetos no tienen dueño: una notebook convertida con el CLI, desde el
+visor (``/api/open-notebook/``, primera visita, ``--watch``) o con
+``transform_notebooks.py`` puede usar los mismos. Por eso ``prune_objects``
+solo borra un objeto tras comprobar, leyendo todos los artefactos
+convertidos, que ninguna notebook lo usa. Entre guardar una imagen (que puede
+reutilizar un objeto que ya existe) y escribir el artefacto que la usa, la
+conversión tiene ``store_lock`` compartido; ``prune_objects`` lo toma
+exclusivo, así que no borra un objeto que una conversión en curso acaba de
+reutilizar.
+
+Este módulo no depende de Django para que también lo use convert_notebooks.py.
+"""
+import io
+import os
+import re
+import struct
+
+from . import storage
+from .atomic import atomic_open, file_lock
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+OBJECTS_DIRNAME = 'objects'
+STORE_LOCK_NAME = '.lock'
+OBJECTS_URL = '/static/notebooks/objects/'
+EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/gif': 'gif'}
+CONTENT_TYPES = {ext: mime for mime, ext in EXTENSIONS.items()}
+
+# <sha256>[-w<ancho>|-t<ancho>].<ext>; variantes y miniaturas dependen solo del
+# original, así que también son inmutables
+OBJECT_NAME_RE = re.compile(r'^([0-9a-f]{64}(?:-[wt]\d+)?)\.(png|jpg|gif)$')
+
+# Anchos de las versiones reducidas (solo las menores que el original)
+VARIANT_WIDTHS = (480, 960)
+# Ancho de las miniaturas del índice
+THUMB_WIDTH = 360
+
+
+def object_relpath(name, ext):
+    """Ruta relativa a ``static/notebooks`` del objeto ``name`` (hash o hash-wN)."""
+    return os.path.join(OBJECTS_DIRNAME, name[:2], f'{name}.{ext}')
+
+
+def object_url(name, ext):
+    return f'{OBJECTS_URL}{name[:2]}/{name}.{ext}'
+
+
+def store_lock(static_dir, shared=False):
+    """Bloqueo del almacén: compartido para las conversiones (desde antes de
+    guardar imágenes hasta escribir su artefacto), exclusivo para podar.
+
+    Quien lo tiene compartido no debe llamar a ``prune_objects`` dentro.
+    """
+    return file_lock(os.path.join(static_dir, OBJECTS_DIRNAME, STORE_LOCK_NAME), shared=shared)
+
+
+def store_image(image, static_dir):
+    """Guarda una ``nbstream.StreamedImage`` en el almacén.
+
+    Si ya existe un objeto con el mismo hash, el temporal se descarta.
+    Llamarla con ``store_lock`` compartido. Devuelve ``(url, ruta absoluta)``.
+    """
+    ext = EXTENSIONS.get(image.mime, 'bin')
+    digest = image.digest
+    path = os.path.join(static_dir, object_relpath(digest, ext))
+    if os.path.exists(path):
+        image.discard()
+    else:
+        image.save(path)
+    return object_url(digest, ext), path
+
+
+def image_size(path):
+    """``(ancho, alto)`` de un PNG, JPEG o GIF leyendo solo la cabecera."""
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if head.startswith(b'\x89PNG\r\n\x1a\n'):
+            return struct.unpack('>II', head[16:24])
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', head[6:10])
+        if head.startswith(b'\xff\xd8'):
+            # recorrer segmentos hasta el SOFn
+            f.seek(2)
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                    continue
+                length = struct.unpack('>H', f.read(2))[0]
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack('>xHH', f.read(5))
+                    return width, height
+                f.seek(length - 2, os.SEEK_CUR)
+    return None
+
+
+def _make_variant(src_path, dest, width, ext):
+    with Image.open(src_path) as img:
+        height = max(1, round(img.height * width / img.width))
+        small = img.resize((width, height), Image.LANCZOS)
+        buf = io.BytesIO()
+        if ext == 'jpg':
+            small.convert('RGB').save(buf, 'JPEG', quality=85, optimize=True)
+        else:
+            small.save(buf, 'PNG', optimize=True)
+    with atomic_open(dest, 'wb') as f:
+        f.write(buf.getvalue())
+    return height
+
+
+def image_item(image, static_dir):
+    """Guarda la imagen y sus variantes; devuelve ``(item, rutas escritas)``.
+
+    El item lleva ``content`` (URL del original), ``width``/``height`` y, si hay
+    Pillow, ``variants``: lista de ``{'width', 'height', 'url'}`` de menor a
+    mayor. Las variantes que ya existen en el almacén no se regeneran.
+    """
+    ext = EXTENSIONS.get(image.mime, 'bin')
+    digest = image.digest
+    url, path = store_image(image, static_dir)
+    item = {'type': 'image', 'content': url}
+    written = [path]
+
+    size = image_size(path)
+    if not size:
+        return item, written
+    width, height = size
+    item['width'], item['height'] = width, height
+
+    if Image is None or ext == 'gif':
+        # sin Pillow no hay variantes; los GIF pueden ser animados
+        return item, written
+    variants = []
+    for w in VARIANT_WIDTHS:
+        if w >= width:
+            break
+        name = f'{digest}-w{w}'
+        dest = os.path.join(static_dir, object_relpath(name, ext))
+        if os.path.exists(dest):
+            h = max(1, round(height * w / width))
+        else:
+            h = _make_variant(path, dest, w, ext)
+        if os.path.getsize(dest) >= os.path.getsize(path):
+            # al reescalar un PNG pequeño el suavizado puede hacerlo más pesado
+            os.remove(dest)
+            continue
+        variants.append({'width': w, 'height': h, 'url': object_url(name, ext)})
+        written.append(dest)
+    if variants:
+        item['variants'] = variants
+    return item, written
+
+
+def url_to_path(url, static_dir):
+    """Ruta local de una URL del almacén, o None si no es un objeto."""
+    if not url.startswith(OBJECTS_URL):
+        return None
+    shard, _, name = url[len(OBJECTS_URL):].partition('/')
+    m = OBJECT_NAME_RE.match(name)
+    if not m or shard != name[:2]:
+        return None
+    return os.path.join(static_dir, object_relpath(*m.groups()))
+
+
+def thumbnail(url, static_dir):
+    """Miniatura (``THUMB_WIDTH`` px de ancho) de la imagen en ``url``.
+
+    Devuelve ``(url de la miniatura, rutas escritas)``. Sin Pillow, o si la
+    imagen ya es pequeña, se usa la propia imagen.
+    """
+    path = url_to_path(url, static_dir)
+    if path is None or Image is None or not os.path.exists(path):
+        return url, []
+    key, ext = OBJECT_NAME_RE.match(os.path.basename(path)).groups()
+    size = image_size(path)
+    if ext == 'gif' or not size or size[0] <= THUMB_WIDTH:
+        return url, []
+    name = f'{key[:64]}-t{THUMB_WIDTH}'
+    dest = os.path.join(static_dir, object_relpath(name, ext))
+    if not os.path.exists(dest):
+        _make_variant(path, dest, THUMB_WIDTH, ext)
+    return object_url(name, ext), [dest]
+
+
+def digest_of(url_or_path):
+    """Hash del objeto (original, variante o miniatura) en una URL o ruta; si no, None."""
+    m = OBJECT_NAME_RE.match(os.path.basename(url_or_path or ''))
+    return m.group(1)[:64] if m else None
+
+
+def item_digests(items):
+    """Hashes de las imágenes que usan ``items``."""
+    digests = set()
+    for it in items:
+        if not isinstance(it, dict) or it.get('type') != 'image':
+            continue
+        urls = [it.get('content') or it.get('path')] + [v.get('url') for v in it.get('variants') or ()]
+        digests.update(d for d in map(digest_of, urls) if d)
+    return digests
+
+
+def referenced_digests(notes_dir):
+    """Hashes de las imágenes que usa alguna notebook convertida en ``notes_dir``.
+
+    Lee los artefactos y no un manifest, así que cuenta también las notebooks
+    convertidas desde el visor. Lanza OSError o ValueError si algún
+    artefacto no se puede leer.
+    """
+    digests = set()
+    try:
+        names = os.listdir(notes_dir)
+    except FileNotFoundError:
+        return digests
+    for fname in names:
+        if storage.split_artifact(fname) is None:
+            continue
+        try:
+            items = storage.load_items(os.path.join(notes_dir, fname))
+        except FileNotFoundError:
+            continue
+        digests |= item_digests(items)
+    return digests
+
+
+def prune_objects(digests, notes_dir, static_dir):
+    """Borra los objetos de ``digests`` (con sus variantes y miniaturas) que
+    ya no usa ninguna notebook de ``notes_dir``; devuelve cuántos archivos borró.
+
+    Llamarla después de reescribir o borrar los artefactos. Si algún
+    artefacto no se puede leer no se borra nada. Espera a que terminen las
+    conversiones que tienen ``store_lock`` compartido.
+    """
+    if not digests:
+        return 0
+    with store_lock(static_dir):
+        return _prune_locked(digests, notes_dir, static_dir)
+
+
+def _prune_locked(digests, notes_dir, static_dir):
+    try:
+        orphans = set(digests) - referenced_digests(notes_dir)
+    except (OSError, ValueError):
+        return 0
+    removed = 0
+    for digest in orphans:
+        shard = os.path.join(static_dir, OBJECTS_DIRNAME, digest[:2])
+        try:
+            names = os.listdir(shard)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            if digest_of(name) == digest:
+                try:
+                    os.remove(os.path.join(shard, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        try:
+            os.rmdir(shard)
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,274 @@
+"""Trabajos de conversión en segundo plano.
+
+``open_notebook`` no convierte dentro de la petición: encola el trabajo en un
+pool de hilos y devuelve su id al momento. El estado de cada trabajo (fase,
+celdas procesadas, imágenes escritas...) se guarda en memoria y se copia a
+``<status_dir>/<id>.json``, de modo que cualquier proceso de gunicorn puede
+responder a ``/api/jobs/<id>/`` aunque el trabajo corra en otro.
+
+La coordinación entre procesos usa archivos en ``status_dir`` protegidos con
+``flock``:
+
+- ``<slug>.active`` apunta al trabajo pendiente de cada notebook; quien pide
+  la misma notebook mientras tanto recibe ese id (single-flight) en lugar de
+  lanzar otra conversión.
+- ``<slug>.convert.lock`` se mantiene durante la conversión; también lo toma
+  convert_notebooks.py, así que nunca se escriben las mismas rutas a la vez.
+- ``admission.json`` suma el tamaño de las notebooks fuente en curso; si una
+  nueva superaría ``max_bytes`` se rechaza con ``AdmissionError``.
+"""
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .atomic import atomic_open, file_lock
+
+JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+STATUS_DIRNAME = '.jobs'
+
+# Estados de un trabajo
+QUEUED, RUNNING, DONE, ERROR = 'queued', 'running', 'done', 'error'
+
+# Intervalo mínimo (s) entre escrituras del estado mientras avanza
+FLUSH_INTERVAL = 0.25
+# Los archivos de estado más viejos que esto se borran
+STATUS_TTL = 24 * 3600
+
+HOSTNAME = socket.gethostname()
+
+
+class AdmissionError(Exception):
+    """No hay presupuesto para otra conversión; reintentar en ``retry_after`` s."""
+
+    def __init__(self, retry_after, in_flight):
+        super().__init__('Demasiadas conversiones en curso')
+        self.retry_after = retry_after
+        self.in_flight = in_flight
+
+
+def conversion_lock(status_dir, key):
+    """Bloqueo que se mantiene mientras se escriben las salidas de ``key``."""
+    return file_lock(os.path.join(status_dir, f'{key}.convert.lock'))
+
+
+def _owner_alive(state):
+    # Un trabajo cuyo proceso murió (reinicio de gunicorn) no cuenta como activo
+    if state.get('host') != HOSTNAME:
+        return True
+    try:
+        os.kill(state['pid'], 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, KeyError, TypeError):
+        return True
+    return True
+
+
+class Job:
+    """Estado de un trabajo; ``update`` lo modifica desde el hilo que convierte."""
+
+    def __init__(self, job_id, status_dir, **info):
+        self.id = job_id
+        self.status_dir = status_dir
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+        self.state = {'id': job_id, 'status': QUEUED, 'created': time.time(),
+                      'started': None, 'finished': None, 'error': None,
+                      'pid': os.getpid(), 'host': HOSTNAME,
+                      'progress': {}, **info}
+
+    @property
+    def path(self):
+        return os.path.join(self.status_dir, f'{self.id}.json')
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.state))
+
+    def update(self, status=None, force=False, **fields):
+        """Actualiza el estado; ``fields`` desconocidos van a ``progress``."""
+        with self._lock:
+            if status is not None:
+                self.state['status'] = status
+                force = True
+            for key, value in fields.items():
+                if key in self.state and key != 'progress':
+                    self.state[key] = value
+                else:
+                    self.state['progress'][key] = value
+            now = time.monotonic()
+            if not force and now - self._flushed < FLUSH_INTERVAL:
+                return
+            self._flushed = now
+            data = json.dumps(self.state, ensure_ascii=False)
+        with atomic_open(self.path) as f:
+            f.write(data)
+
+    @property
+    def finished(self):
+        return self.state['status'] in (DONE, ERROR)
+
+
+class JobPool:
+    """Pool de hilos que ejecuta ``func(job, *args)`` y publica su estado.
+
+    ``max_bytes`` limita la suma de tamaños de las notebooks en conversión
+    entre todos los procesos (0 = sin límite); una notebook sola siempre se
+    admite aunque lo supere.
+    """
+
+    def __init__(self, status_dir, max_workers=2, max_bytes=0, retry_after=5):
+        self.status_dir = status_dir
+        self.max_workers = max_workers
+        self.max_bytes = max_bytes
+        self.retry_after = retry_after
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Se crea al primer uso: importar las vistas no arranca hilos
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix='notebook-job')
+        return self._executor
+
+    def submit(self, key, size, func, *args, **info):
+        """Encola ``func`` para la notebook ``key`` y devuelve el id del trabajo.
+
+        Si ya hay un trabajo pendiente con la misma ``key`` (en este o en otro
+        proceso) se devuelve ese. Lanza ``AdmissionError`` si la conversión
+        superaría el presupuesto de ``max_bytes``.
+        """
+        os.makedirs(self.status_dir, exist_ok=True)
+        pointer = os.path.join(self.status_dir, f'{key}.active')
+        with self._lock, file_lock(pointer + '.lock'):
+            active = self._active_job(pointer)
+            if active is not None:
+                return active
+            self._prune()
+            job = Job(uuid.uuid4().hex, self.status_dir, size=size, **info)
+            self._admit(job.id, size)
+            job.update(status=QUEUED)
+            with atomic_open(pointer) as f:
+                f.write(job.id)
+            self._jobs[job.id] = job
+        self._pool().submit(self._run, job, key, func, args)
+        return job.id
+
+    def active(self):
+        """Trabajos de este proceso en cola o en curso."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _active_job(self, pointer):
+        try:
+            with open(pointer, 'r', encoding='utf-8') as f:
+                job_id = f.read().strip()
+        except OSError:
+            return None
+        state = self.status(job_id) if JOB_ID_RE.match(job_id) else None
+        if state is None or state['status'] not in (QUEUED, RUNNING):
+            return None
+        if state.get('pid') == os.getpid() and state.get('host') == HOSTNAME:
+            return job_id if job_id in self._jobs else None
+        return job_id if _owner_alive(state) else None
+
+    def run(self, key, func, *args, **info):
+        """Ejecuta ``func`` en el hilo actual como un trabajo más; devuelve su estado final.
+
+        Sin cola ni presupuesto (quien llama ya está en segundo plano, p. ej.
+        la vigilancia de datasets/), pero con el mismo bloqueo por notebook y
+        el mismo estado consultable en ``/api/jobs/<id>/``.
+        """
+        os.makedirs(self.status_dir, exist_ok=True)
+        job = Job(uuid.uuid4().hex, self.status_dir, **info)
+        job.update(status=QUEUED)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._execute(job, key, func, args)
+        return job.snapshot()
+
+    def _execute(self, job, key, func, args):
+        with conversion_lock(self.status_dir, key):
+            job.update(status=RUNNING, started=time.time())
+            try:
+                result = func(job, *args) or {}
+            except Exception as e:
+                job.update(status=ERROR, finished=time.time(), error=str(e))
+            else:
+                job.update(status=DONE, finished=time.time(), **result)
+
+    def _run(self, job, key, func, args):
+        try:
+            self._execute(job, key, func, args)
+        finally:
+            self._release(job.id)
+
+    def status(self, job_id):
+        """Estado del trabajo, propio o de otro proceso; None si no existe."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.snapshot()
+        try:
+            with open(os.path.join(self.status_dir, f'{job_id}.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # Presupuesto compartido: admission.json = {job_id: {bytes, pid, host}}
+
+    def _admission(self):
+        path = os.path.join(self.status_dir, 'admission.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        # descartar reservas de procesos que ya no existen
+        return path, {k: v for k, v in entries.items() if self._reservation_alive(k, v)}
+
+    def _reservation_alive(self, job_id, entry):
+        if entry.get('pid') == os.getpid() and entry.get('host') == HOSTNAME:
+            # nuestra (o de un proceso anterior con el mismo pid)
+            job = self._jobs.get(job_id)
+            return job is not None and not job.finished
+        return _owner_alive(entry)
+
+    def _admit(self, job_id, size):
+        with file_lock(os.path.join(self.status_dir, 'admission.lock')):
+            path, entries = self._admission()
+            in_flight = sum(e['bytes'] for e in entries.values())
+            if self.max_bytes and entries and in_flight + size > self.max_bytes:
+                raise AdmissionError(self.retry_after, in_flight)
+            entries[job_id] = {'bytes': size, 'pid': os.getpid(), 'host': HOSTNAME}
+            with atomic_open(path) as f:
+                json.dump(entries, f)
+
+    def _release(self, job_id):
+        with file_lock(os.path.join(self.status_dir, 'admission.lock')):
+            path, entries = self._admission()
+            entries.pop(job_id, None)
+            with atomic_open(path) as f:
+                json.dump(entries, f)
+
+    def _prune(self):
+        # Olvidar trabajos terminados hace tiempo (memoria y disco)
+        cutoff = time.time() - STATUS_TTL
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and (job.state['finished'] or 0) < cutoff:
+                del self._jobs[job_id]
+        for name in os.listdir(self.status_dir):
+            if not name.endswith('.json') or not JOB_ID_RE.match(name[:-5]):
+                continue
+            path = os.path.join(self.status_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,214 @@
+"""Listado de notebooks de una carpeta para ``/api/list-files/``.
+
+Cada carpeta se recorre con ``os.scandir`` (el tipo de cada entrada viene del
+propio directorio y el ``stat`` se hace solo para los ``.ipynb``) y el
+resultado se guarda en memoria asociado al ``mtime`` de la carpeta: mientras
+no se añadan, borren o renombren archivos, listar no vuelve a leerla.
+Reescribir una notebook en su sitio no cambia el ``mtime`` de la carpeta, así
+que cada carpeta cacheada se comprueba además con un ``stat`` por notebook,
+como mucho una vez cada ``verify_interval`` segundos (``refresh`` la vuelve a
+leer al momento). ``signature`` (el ETag) sale de esa caché: mientras no toque
+comprobar, cuesta un ``stat`` por carpeta.
+
+La respuesta se pagina con un cursor (la ruta relativa del último archivo
+devuelto), así que añadir archivos entre dos páginas no hace que se repitan
+ni se salten entradas. Los metadatos de cada notebook (número de celdas, si
+tiene salidas) se obtienen contando claves en los bytes del archivo, sin
+decodificar el JSON, y se cachean por ``(mtime_ns, size)``.
+
+Este módulo no depende de Django.
+"""
+import base64
+import bisect
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Profundidad máxima del modo recursivo
+MAX_DEPTH = 8
+# Segundos entre comprobaciones de las notebooks de una carpeta cacheada
+VERIFY_INTERVAL = float(os.environ.get('NOTEBOOK_LISTING_VERIFY_INTERVAL', '2'))
+CHUNK_SIZE = 1024 * 1024
+
+# Dentro de un string JSON las comillas van escapadas (\"), así que estas
+# secuencias solo aparecen como claves reales del documento
+CELL_KEY = b'"cell_type":'
+OUTPUT_KEY = b'"output_type":'
+
+
+def count_keys(path):
+    """``(celdas, salidas)`` de una notebook contando sus claves en crudo."""
+    cells = outputs = 0
+    # Se arrastra el final del trozo anterior para no perder una clave
+    # partida en dos; lo que ya estaba entero en ese final no se recuenta
+    keep = max(len(CELL_KEY), len(OUTPUT_KEY)) - 1
+    tail = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data = tail + chunk
+            cells += data.count(CELL_KEY) - tail.count(CELL_KEY)
+            outputs += data.count(OUTPUT_KEY) - tail.count(OUTPUT_KEY)
+            tail = data[-keep:]
+    return cells, outputs
+
+
+def encode_cursor(relpath):
+    return base64.urlsafe_b64encode(relpath.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Ruta relativa codificada en ``cursor``; ValueError si no es válido."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return base64.b64decode(padded.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('cursor inválido') from e
+
+
+class FolderListing:
+    """Caché de carpetas (por ``mtime``) y de metadatos de notebooks."""
+
+    def __init__(self, max_dirs=256, max_meta=4096, verify_interval=None):
+        self.max_dirs = max_dirs
+        self.max_meta = max_meta
+        self.verify_interval = VERIFY_INTERVAL if verify_interval is None else verify_interval
+        self._dirs = OrderedDict()   # ruta -> (mtime_ns, notebooks, subcarpetas, comprobada)
+        self._meta = OrderedDict()   # ruta -> ((mtime_ns, size), metadatos)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unchanged(path, notebooks):
+        # un stat por notebook: tamaño y fecha siguen como en la caché
+        for name, size, mtime in notebooks:
+            try:
+                st = os.stat(os.path.join(path, name))
+            except OSError:
+                return False
+            if st.st_size != size or st.st_mtime_ns != mtime:
+                return False
+        return True
+
+    def _scan_dir(self, path, refresh=False):
+        """``(notebooks, subcarpetas)`` de ``path``; lanza OSError.
+
+        La caché vale mientras no cambie el ``mtime`` de la carpeta y, pasado
+        ``verify_interval`` desde la última comprobación, ninguna notebook.
+        """
+        mtime = os.stat(path).st_mtime_ns
+        now = time.monotonic()
+        with self._lock:
+            cached = self._dirs.get(path)
+            if cached is not None and (cached[0] != mtime or refresh):
+                cached = None
+        if cached is not None and now - cached[3] >= self.verify_interval:
+            if self._unchanged(path, cached[1]):
+                cached = cached[:3] + (now,)
+            else:
+                cached = None
+        if cached is not None:
+            with self._lock:
+                if path in self._dirs:
+                    self._dirs[path] = cached
+                    self._dirs.move_to_end(path)
+                self.hits += 1
+            return cached[1], cached[2]
+        with self._lock:
+            self.misses += 1
+        notebooks = []
+        subdirs = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.name.lower().endswith('.ipynb') and entry.is_file():
+                    st = entry.stat()
+                    notebooks.append((entry.name, st.st_size, st.st_mtime_ns))
+        notebooks.sort()
+        subdirs.sort()
+        with self._lock:
+            self._dirs[path] = (mtime, notebooks, subdirs, now)
+            self._dirs.move_to_end(path)
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+        return notebooks, subdirs
+
+    def entries(self, root, recursive=False, refresh=False):
+        """Lista ordenada de ``(ruta relativa, tamaño, mtime_ns)`` bajo ``root``."""
+        out = []
+
+        def walk(rel, depth):
+            folder = os.path.join(root, rel) if rel else root
+            try:
+                notebooks, subdirs = self._scan_dir(folder, refresh)
+            except OSError:
+                # una subcarpeta ilegible no impide listar el resto
+                if not rel:
+                    raise
+                return
+            for name, size, mtime in notebooks:
+                out.append((f'{rel}/{name}' if rel else name, size, mtime))
+            if recursive and depth < MAX_DEPTH:
+                for sub in subdirs:
+                    walk(f'{rel}/{sub}' if rel else sub, depth + 1)
+
+        walk('', 0)
+        if recursive:
+            out.sort()
+        return out
+
+    def metadata(self, path, size, mtime):
+        """``{'cells', 'has_outputs'}`` de la notebook, cacheado por versión."""
+        sig = (mtime, size)
+        with self._lock:
+            cached = self._meta.get(path)
+            if cached is not None and cached[0] == sig:
+                self._meta.move_to_end(path)
+                return cached[1]
+        try:
+            cells, outputs = count_keys(path)
+            meta = {'cells': cells, 'has_outputs': outputs > 0}
+        except OSError:
+            meta = {'cells': None, 'has_outputs': None}
+        with self._lock:
+            self._meta[path] = (sig, meta)
+            while len(self._meta) > self.max_meta:
+                self._meta.popitem(last=False)
+        return meta
+
+    def page(self, root, cursor=None, limit=200, recursive=False, refresh=False):
+        """Una página del listado: ``(entradas, siguiente cursor o None, total)``."""
+        entries = self.entries(root, recursive, refresh)
+        start = 0
+        if cursor:
+            after = decode_cursor(cursor)
+            start = bisect.bisect_right(entries, (after, float('inf')))
+        chunk = entries[start:start + limit]
+        next_cursor = encode_cursor(chunk[-1][0]) if start + limit < len(entries) else None
+        return chunk, next_cursor, len(entries)
+
+    def invalidate(self, path):
+        """Olvida el listado de ``path``: un archivo modificado no cambia el
+        ``mtime`` de su carpeta, así que sin esto se verían su tamaño y fecha
+        anteriores."""
+        with self._lock:
+            self._dirs.pop(path, None)
+
+    def signature(self, root, recursive=False, refresh=False):
+        """Huella del listado para el ETag.
+
+        Sale de las carpetas cacheadas (ver ``_scan_dir``) y deja la caché al
+        día para la respuesta que sigue.
+        """
+        h = hashlib.sha1(root.encode('utf-8'))
+        for rel, size, mtime in self.entries(root, recursive, refresh):
+            h.update(f'{rel}:{size}:{mtime};'.encode('utf-8'))
+        return h.hexdigest()[:20]
@@ -0,0 +1,49 @@
+"""``python manage.py bake_notebooks``: convierte y pre-renderiza todo en el build.
+
+Es la misma pasada incremental que convert_notebooks.py (items, modelos,
+índices de búsqueda, catálogo y páginas comprimidas), pensada para ejecutarse
+al construir la imagen y no al arrancar el servidor. Con ``--check`` no
+convierte nada: lista lo que está desactualizado y termina con error si hay
+algo, para usarlo en CI.
+"""
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from viewer import storage
+
+
+class Command(BaseCommand):
+    help = 'Convierte las notebooks de datasets/ y pre-renderiza sus páginas (para el build).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', '-j', type=int, default=0,
+                            help='procesos en paralelo (0 = uno por CPU; por defecto %(default)s)')
+        parser.add_argument('--check', action='store_true',
+                            help='no convertir: terminar con error si algún artefacto está desactualizado')
+        parser.add_argument('--force', action='store_true',
+                            help='reconvertir todo aunque el manifest indique que no hay cambios')
+        parser.add_argument('--format', choices=sorted(storage.FORMATS),
+                            help='formato de los items convertidos (por defecto el de NOTEBOOK_STORAGE)')
+
+    def handle(self, *args, **options):
+        # convert_notebooks.py está en la raíz del proyecto, junto a manage.py
+        root = str(settings.BASE_DIR)
+        if root not in sys.path:
+            sys.path.insert(0, root)
+        import convert_notebooks
+
+        argv = ['--jobs', str(options['jobs']),
+                '--text-threshold', str(settings.NOTEBOOK_TEXT_THRESHOLD),
+                '--table-threshold', str(settings.NOTEBOOK_TABLE_THRESHOLD)]
+        if options['format']:
+            argv += ['--format', options['format']]
+        if options['force']:
+            argv.append('--force')
+        if options['check']:
+            argv.append('--check')
+        code = convert_notebooks.main(argv)
+        if code:
+            raise CommandError('hay artefactos desactualizados' if options['check']
+                               else 'algunas notebooks no se pudieron convertir')
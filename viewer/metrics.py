@@ -0,0 +1,202 @@
+"""Tiempos por fase de cada petición, histogramas y ``/metrics``.
+
+Las vistas marcan sus fases con ``phase('read')``, ``phase('render')``...
+Mientras dura una petición, ``MetricsMiddleware`` junta esas duraciones y las
+devuelve en la cabecera ``Server-Timing`` (visible en las herramientas de
+desarrollo del navegador), junto con ``total``. Cada duración se acumula
+además en un histograma; ``render()`` vuelca histogramas y contadores en el
+formato de texto de Prometheus para ``/metrics``.
+
+Las métricas son de cada proceso (como las cachés): con varios procesos de
+gunicorn, cada lectura de ``/metrics`` corresponde al que atiende la
+petición, identificado por la etiqueta ``pid``. ``NOTEBOOK_METRICS=0``
+desactiva todo; entonces ``phase`` no hace nada y ``/metrics`` responde 404.
+
+Este módulo no depende de Django.
+"""
+import bisect
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('NOTEBOOK_METRICS', '1').lower() not in ('0', 'false', 'no')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Límites (s) de los histogramas: de 0,5 ms (un stat) a minutos (una conversión)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+HELP = {
+    'http_request_duration_seconds': 'Duración de las peticiones por vista',
+    'http_requests_total': 'Peticiones por vista y código de estado',
+    'notebook_phase_seconds': 'Duración de cada fase dentro de las peticiones',
+    'notebook_conversion_seconds': 'Duración de cada fase de las conversiones de open-notebook',
+    'notebook_conversions_total': 'Conversiones de open-notebook terminadas, por resultado',
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = {}   # (nombre, etiquetas) -> Histogram
+_counters = {}     # (nombre, etiquetas) -> valor
+
+
+class Histogram:
+    """Histograma con los límites de ``BUCKETS`` (cuentas no acumuladas)."""
+
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, **labels):
+    """Añade ``value`` (segundos) al histograma ``name`` con ``labels``."""
+    _observe(_key(name, labels), value)
+
+
+def _observe(key, value):
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = Histogram()
+        hist.observe(value)
+
+
+def inc(name, value=1, **labels):
+    """Suma ``value`` al contador ``name`` con ``labels``."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+class phase:
+    """Mide el bloque ``with`` como la fase ``name`` de la petición en curso.
+
+    Es una clase y no un ``contextmanager`` porque se usa en el camino de
+    cada petición y así cuesta la mitad.
+    """
+
+    __slots__ = ('name', 'key', 'started')
+
+    def __init__(self, name, metric='notebook_phase_seconds'):
+        self.name = name
+        self.key = (metric, (('phase', name),))
+        self.started = None
+
+    def __enter__(self):
+        if ENABLED:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.started is None:
+            return False
+        elapsed = time.perf_counter() - self.started
+        _observe(self.key, elapsed)
+        timings = getattr(_local, 'timings', None)
+        if timings is not None:
+            timings.append((self.name, elapsed))
+        return False
+
+
+def server_timing(timings, total):
+    """Valor de la cabecera ``Server-Timing``; las fases repetidas se suman."""
+    merged = {}
+    for name, elapsed in timings:
+        merged[name] = merged.get(name, 0.0) + elapsed
+    merged['total'] = total
+    return ', '.join(f'{name};dur={elapsed * 1000:.3f}' for name, elapsed in merged.items())
+
+
+class MetricsMiddleware:
+    """Mide cada petición, añade ``Server-Timing`` y alimenta los histogramas."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not ENABLED:
+            return self.get_response(request)
+        _local.timings = timings = []
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name if match is not None else None) or 'other'
+        observe('http_request_duration_seconds', total, view=view)
+        inc('http_requests_total', view=view, status=str(response.status_code))
+        response['Server-Timing'] = server_timing(timings, total)
+        return response
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+    return '{' + body + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(extra=()):
+    """Texto de ``/metrics``.
+
+    ``extra`` son métricas calculadas al momento (cachés, trabajos): tuplas
+    ``(nombre, tipo, ayuda, [(etiquetas_dict, valor), ...])``.
+    """
+    pid = ('pid', str(os.getpid()))
+    with _lock:
+        histograms = [(k, (list(h.counts), h.total, h.count)) for k, h in _histograms.items()]
+        counters = list(_counters.items())
+    lines = []
+    seen = set()
+
+    def header(name, kind, help_text):
+        if name not in seen:
+            seen.add(name)
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), (counts, total, count) in sorted(histograms):
+        header(name, 'histogram', HELP.get(name, name))
+        labels = labels + (pid,)
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float('inf'),), counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {total!r}')
+        lines.append(f'{name}_count{_labels(labels)} {count}')
+    for (name, labels), value in sorted(counters):
+        header(name, 'counter', HELP.get(name, name))
+        lines.append(f'{name}{_labels(labels + (pid,))} {_number(value)}')
+    for name, kind, help_text, samples in extra:
+        header(name, kind, help_text)
+        for labels, value in samples:
+            lines.append(f'{name}{_labels(tuple(sorted(labels.items())) + (pid,))} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Vacía histogramas y contadores."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
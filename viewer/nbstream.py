@@ -0,0 +1,420 @@
+"""Lectura incremental de archivos .ipynb.
+
+``nbformat.read`` construye todo el árbol de la notebook (con las imágenes en
+base64 dentro) y lo valida; en notebooks de cientos de MB el pico de memoria
+es varias veces el tamaño del archivo. ``iter_notebook`` recorre el JSON por
+trozos y devuelve las celdas y salidas una a una; las imágenes se decodifican
+directamente a un archivo temporal sin tener nunca el base64 completo en
+memoria. Así el pico queda acotado por la salida no-imagen más grande.
+
+Solo entiende la estructura de nbformat 4 (``cells`` / ``outputs`` / ``data``);
+cualquier otro valor se lee entero con ``json.loads``. Las notebooks nbformat 3
+se leen con nbformat como antes.
+"""
+import binascii
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+try:
+    import nbformat
+except ImportError:
+    nbformat = None
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_MIMES = ('image/png', 'image/jpeg', 'image/gif')
+
+_WS_RE = re.compile(r'[ \t\n\r]*')
+_STR_SPECIAL_RE = re.compile(r'["\\]')
+_STRUCT_RE = re.compile(r'[{}\[\]"]')
+_LITERAL_RE = re.compile(r'[^\s,\]}]+')
+_B64_DROP = {ord(c): None for c in ' \t\n\r'}
+
+
+class NotebookFormatError(ValueError):
+    """El archivo no es un JSON de notebook válido."""
+
+
+class _LegacyNotebook(Exception):
+    """La notebook no es nbformat 4 y hay que leerla con nbformat."""
+
+
+class StreamedImage:
+    """Imagen decodificada a un archivo temporal mientras se lee la notebook.
+
+    El consumidor llama a ``save(dest)`` para quedarse con ella; las que no se
+    guardan se borran solas al avanzar a la siguiente salida. ``digest`` es el
+    SHA-256 de los bytes decodificados, calculado mientras se escriben.
+    """
+
+    def __init__(self, mime, directory=None):
+        self.mime = mime
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._pending = ''
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix='.img-', suffix='.part', dir=directory)
+        self._file = os.fdopen(fd, 'wb')
+
+    def feed(self, text):
+        """Añade base64 (puede venir partido en cualquier punto)."""
+        self._pending += text.translate(_B64_DROP)
+        n = len(self._pending) - len(self._pending) % 4
+        if n:
+            self._write(binascii.a2b_base64(self._pending[:n]))
+            self._pending = self._pending[n:]
+
+    def _write(self, data):
+        self._file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+
+    @property
+    def digest(self):
+        return self._hash.hexdigest()
+
+    def close(self):
+        if self._pending:
+            # base64 sin relleno final: completarlo antes de decodificar
+            self._write(binascii.a2b_base64(self._pending + '=' * (-len(self._pending) % 4)))
+            self._pending = ''
+        self._file.close()
+
+    def save(self, dest):
+        """Mueve la imagen a ``dest`` (crea la carpeta si hace falta)."""
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.move(self.path, dest)
+        self.path = None
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+class _Reader:
+    """Tokenizador JSON mínimo sobre un archivo de texto leído por trozos."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def error(self, msg):
+        return NotebookFormatError(f'{msg} (cerca de: {self.buf[self.pos:self.pos + 40]!r})')
+
+    def peek(self):
+        """Siguiente carácter no blanco sin consumirlo ('' al final del archivo)."""
+        while True:
+            self.pos = _WS_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise self.error(f'se esperaba {ch!r}')
+        self.pos += 1
+
+    def string_segments(self):
+        """Trozos crudos (con escapes JSON) del string siguiente.
+
+        Cada trozo es texto sin escapes o una única secuencia de escape
+        completa, así que se pueden decodificar por separado.
+        """
+        self.expect('"')
+        while True:
+            m = _STR_SPECIAL_RE.search(self.buf, self.pos)
+            if m is None:
+                seg = self.buf[self.pos:]
+                self.pos = len(self.buf)
+                if seg:
+                    yield seg
+                if not self._fill():
+                    raise self.error('string sin cerrar')
+                continue
+            i = m.start()
+            seg = self.buf[self.pos:i]
+            self.pos = i
+            if seg:
+                yield seg
+            if self.buf[i] == '"':
+                self.pos += 1
+                return
+            # escape: asegurar que la secuencia entera está en el buffer
+            while len(self.buf) - self.pos < 2 and self._fill():
+                pass
+            n = 6 if self.buf[self.pos + 1:self.pos + 2] == 'u' else 2
+            while len(self.buf) - self.pos < n and self._fill():
+                pass
+            esc = self.buf[self.pos:self.pos + n]
+            if len(esc) < n:
+                raise self.error('escape incompleto')
+            self.pos += n
+            yield esc
+
+    def read_string(self):
+        return json.loads('"' + ''.join(self.string_segments()) + '"')
+
+    def _container(self, collect):
+        pieces = []
+        depth = 0
+        start = self.pos
+        while True:
+            m = _STRUCT_RE.search(self.buf, self.pos)
+            if m is None:
+                if collect:
+                    pieces.append(self.buf[start:])
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise self.error('valor sin cerrar')
+                start = self.pos
+                continue
+            i = m.start()
+            ch = self.buf[i]
+            if ch == '"':
+                self.pos = i
+                if collect:
+                    pieces.append(self.buf[start:i])
+                    pieces.append('"' + ''.join(self.string_segments()) + '"')
+                else:
+                    for _ in self.string_segments():
+                        pass
+                start = self.pos
+            elif ch in '{[':
+                depth += 1
+                self.pos = i + 1
+            else:
+                depth -= 1
+                self.pos = i + 1
+                if depth == 0:
+                    if collect:
+                        pieces.append(self.buf[start:self.pos])
+                    return ''.join(pieces)
+
+    def _literal(self):
+        while True:
+            m = _LITERAL_RE.match(self.buf, self.pos)
+            if m is None or m.end() < len(self.buf):
+                break
+            if not self._fill():
+                m = _LITERAL_RE.match(self.buf, self.pos)
+                break
+        if not m:
+            raise self.error('valor inválido')
+        self.pos = m.end()
+        return m.group()
+
+    def read_value(self):
+        """Lee el valor siguiente completo (decodificado con json.loads)."""
+        c = self.peek()
+        if c == '"':
+            return self.read_string()
+        if c in ('{', '['):
+            return json.loads(self._container(collect=True))
+        if not c:
+            raise self.error('fin de archivo inesperado')
+        return json.loads(self._literal())
+
+    def skip_value(self):
+        c = self.peek()
+        if c == '"':
+            for _ in self.string_segments():
+                pass
+        elif c in ('{', '['):
+            self._container(collect=False)
+        else:
+            self._literal()
+
+    def iter_object(self):
+        """Recorre un objeto devolviendo sus claves; el llamador consume cada valor."""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(':')
+            yield key
+            c = self.peek()
+            self.pos += 1
+            if c == '}':
+                return
+            if c != ',':
+                self.pos -= 1
+                raise self.error("se esperaba ',' o '}'")
+
+    def iter_array(self):
+        """Recorre un array devolviendo índices; el llamador consume cada elemento."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            c = self.peek()
+            self.pos += 1
+            if c == ']':
+                return
+            if c != ',':
+                self.pos -= 1
+                raise self.error("se esperaba ',' o ']'")
+
+
+def _join(key, value):
+    # igual que nbformat: los strings multilínea se guardan como listas
+    if isinstance(value, list) and not (key == 'application/json' or key.endswith('+json')):
+        return ''.join(value)
+    return value
+
+
+def _unescape(seg):
+    return json.loads('"' + seg + '"') if seg.startswith('\\') else seg
+
+
+def _read_image(r, mime, spool_dir):
+    image = StreamedImage(mime, spool_dir)
+    try:
+        if r.peek() == '[':
+            for _ in r.iter_array():
+                for seg in r.string_segments():
+                    image.feed(_unescape(seg))
+        else:
+            for seg in r.string_segments():
+                image.feed(_unescape(seg))
+        image.close()
+    except BaseException:
+        image.discard()
+        raise
+    return image
+
+
+def _read_output(r, spool_dir):
+    output = {}
+    for key in r.iter_object():
+        if key == 'data':
+            data = {}
+            for mime in r.iter_object():
+                if mime in IMAGE_MIMES and r.peek() in ('"', '['):
+                    data[mime] = _read_image(r, mime, spool_dir)
+                else:
+                    data[mime] = _join(mime, r.read_value())
+            output['data'] = data
+        else:
+            output[key] = _join(key, r.read_value()) if key == 'text' else r.read_value()
+    return output
+
+
+def _images(output):
+    return [v for v in output.get('data', {}).values() if isinstance(v, StreamedImage)]
+
+
+def _iter_cells(r, spool_dir):
+    for idx in r.iter_array():
+        cell_type = None
+        source = None
+        for key in r.iter_object():
+            if key == 'cell_type':
+                cell_type = r.read_value()
+            elif key == 'source' and cell_type != 'code':
+                source = _join(key, r.read_value())
+            elif key == 'outputs':
+                for _ in r.iter_array():
+                    output = _read_output(r, spool_dir)
+                    try:
+                        yield idx, 'output', output
+                    finally:
+                        for image in _images(output):
+                            image.discard()
+            else:
+                r.skip_value()
+        if cell_type == 'markdown' and source is not None:
+            yield idx, 'markdown', source
+        yield idx, 'cell', cell_type
+
+
+def _iter_nbformat(path, spool_dir):
+    """Mismos eventos que iter_notebook, a partir de nbformat (carga completa)."""
+    if nbformat is None:
+        raise NotebookFormatError('nbformat no está instalado; no se puede leer una notebook nbformat < 4')
+    with open(path, 'r', encoding='utf-8') as f:
+        nb = nbformat.read(f, as_version=4)
+    for idx, cell in enumerate(nb.cells):
+        if cell.cell_type == 'code':
+            for out in cell.get('outputs', []):
+                output = {k: v for k, v in out.items() if k != 'data'}
+                if 'data' in out:
+                    data = dict(out['data'])
+                    for mime in IMAGE_MIMES:
+                        if isinstance(data.get(mime), str):
+                            image = StreamedImage(mime, spool_dir)
+                            image.feed(data[mime])
+                            image.close()
+                            data[mime] = image
+                    output['data'] = data
+                try:
+                    yield idx, 'output', output
+                finally:
+                    for image in _images(output):
+                        image.discard()
+        elif cell.cell_type == 'markdown':
+            yield idx, 'markdown', cell.source
+        yield idx, 'cell', cell.cell_type
+
+
+def iter_notebook(path, spool_dir=None, validate=False, chunk_size=CHUNK_SIZE):
+    """Recorre una notebook devolviendo eventos ``(índice_celda, tipo, valor)``.
+
+    - ``('markdown', texto)`` por cada celda markdown
+    - ``('output', dict)`` por cada salida de una celda de código, con la misma
+      forma que en nbformat (``output_type``, ``data``, ``text``...) salvo las
+      imágenes de ``data``, que son ``StreamedImage``
+    - ``('cell', cell_type)`` al terminar cada celda
+
+    ``spool_dir`` es la carpeta de los temporales de imagen (conviene que esté
+    en el mismo disco que el destino final). ``validate=True`` valida antes el
+    esquema con nbformat, lo que sí carga la notebook entera en memoria.
+    """
+    if validate:
+        if nbformat is None:
+            raise NotebookFormatError('nbformat no está instalado; no se puede validar')
+        with open(path, 'r', encoding='utf-8') as f:
+            nbformat.validate(nbformat.read(f, as_version=4))
+
+    with open(path, 'r', encoding='utf-8') as f:
+        r = _Reader(f, chunk_size)
+        if r.peek() != '{':
+            raise NotebookFormatError(f'{os.path.basename(path)} no parece un JSON de notebook')
+        try:
+            for key in r.iter_object():
+                if key == 'cells':
+                    yield from _iter_cells(r, spool_dir)
+                elif key == 'worksheets':
+                    raise _LegacyNotebook()
+                else:
+                    r.skip_value()
+            return
+        except _LegacyNotebook:
+            pass
+    yield from _iter_nbformat(path, spool_dir)
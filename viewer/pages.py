@@ -0,0 +1,106 @@
+"""Páginas de notebook ya renderizadas y comprimidas.
+
+La página de detalle se renderiza una vez por versión del JSON y se guarda en
+``templates/notebooks/<slug>/`` como ``page.html``, ``page.html.gz`` y, si
+está instalado ``brotli``, ``page.html.br``. ``page.meta.json`` se escribe al
+final e indica de qué JSON (``mtime_ns``, ``size``) y de qué versión de las
+plantillas sale la página; si no coincide, la página está caducada.
+
+``notebook_view`` elige la codificación según ``Accept-Encoding`` y envía los
+bytes guardados tal cual, sin comprimir en cada petición.
+
+Este módulo no depende de Django; el render lo hace ``views.bake_page``.
+"""
+import gzip
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .atomic import atomic_open
+
+PAGE_NAME = 'page.html'
+META_NAME = 'page.meta.json'
+
+# Codificación -> extensión del archivo guardado, en orden de preferencia
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_TOKEN_RE = re.compile(r'\s*([A-Za-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+def meta_path(directory):
+    return os.path.join(directory, META_NAME)
+
+
+def write_page(directory, html, source, render_version):
+    """Guarda ``html`` sin comprimir, en gzip y en brotli; devuelve sus rutas."""
+    data = html.encode('utf-8')
+    path = os.path.join(directory, PAGE_NAME)
+    variants = {'identity': data, 'gzip': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+    written = []
+    for encoding, body in variants.items():
+        dest = path + dict(ENCODINGS).get(encoding, '')
+        with atomic_open(dest, 'wb') as f:
+            f.write(body)
+        written.append(dest)
+    # Sin brotli, no dejar un .br de una versión anterior
+    if 'br' not in variants and os.path.exists(path + '.br'):
+        os.remove(path + '.br')
+    # La meta va al final: marca la página como completa
+    meta = {'source': list(source), 'render': render_version,
+            'sizes': {k: len(v) for k, v in variants.items()}}
+    with atomic_open(meta_path(directory)) as f:
+        json.dump(meta, f)
+    written.append(meta_path(directory))
+    return written
+
+
+def page_files(directory):
+    """Rutas de la página guardada en ``directory`` que existen."""
+    base = os.path.join(directory, PAGE_NAME)
+    candidates = [base] + [base + ext for _, ext in ENCODINGS] + [meta_path(directory)]
+    return [p for p in candidates if os.path.exists(p)]
+
+
+def load_page(path):
+    """Carga la meta y todas las variantes guardadas (``loader`` para la caché)."""
+    directory = os.path.dirname(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    bodies = {}
+    base = os.path.join(directory, PAGE_NAME)
+    for encoding in meta['sizes']:
+        with open(base + dict(ENCODINGS).get(encoding, ''), 'rb') as f:
+            bodies[encoding] = f.read()
+    return {'source': tuple(meta['source']), 'render': meta['render'], 'bodies': bodies}
+
+
+def accepted_encodings(header):
+    """Codificaciones aceptadas en ``Accept-Encoding`` (con q > 0)."""
+    accepted = {}
+    for token in header.split(','):
+        m = _TOKEN_RE.match(token)
+        if not m:
+            continue
+        try:
+            q = float(m.group(2)) if m.group(2) else 1.0
+        except ValueError:
+            continue
+        accepted[m.group(1).lower()] = q
+    wildcard = accepted.pop('*', None)
+    return {enc for enc, _ in ENCODINGS if accepted.get(enc, wildcard or 0) > 0}
+
+
+def choose_encoding(header, available):
+    """Mejor codificación disponible para el cliente; 'identity' si ninguna."""
+    accepted = accepted_encodings(header or '')
+    for encoding, _ in ENCODINGS:
+        if encoding in accepted and encoding in available:
+            return encoding
+    return 'identity'
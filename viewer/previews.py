@@ -0,0 +1,77 @@
+"""Vista previa de salidas de texto largas.
+
+Durante la conversión, los items ``text`` que superan un umbral se guardan
+completos en un archivo aparte (``templates/notebooks/<slug>/text_N.txt``) y en
+el JSON solo queda el principio y el final. La vista ``notebook_text`` sirve el
+archivo completo (con soporte de ``Range``) cuando el usuario lo pide.
+
+Este módulo no depende de Django para que también lo use convert_notebooks.py.
+"""
+import os
+import re
+
+from .atomic import atomic_open
+
+# Tamaño (en caracteres) a partir del cual una salida de texto se recorta
+TEXT_THRESHOLD = int(os.environ.get('NOTEBOOK_TEXT_THRESHOLD', '16384'))
+# Caracteres que se conservan al principio y al final de la vista previa
+PREVIEW_HEAD = 4000
+PREVIEW_TAIL = 1000
+
+BLOB_RE = re.compile(r'^text_\d+\.txt$')
+
+
+def blob_dir(notes_dir, slug):
+    """Carpeta de archivos auxiliares de una notebook convertida."""
+    return os.path.join(notes_dir, slug)
+
+
+def clear_blobs(directory):
+    """Borra los textos completos de una conversión anterior."""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if BLOB_RE.match(name):
+            os.remove(os.path.join(directory, name))
+
+
+def _cut_head(text, n):
+    # cortar en el último salto de línea dentro de la ventana, si lo hay
+    head = text[:n]
+    nl = head.rfind('\n')
+    return head[:nl + 1] if nl > n // 2 else head
+
+
+def _cut_tail(text, n):
+    tail = text[-n:]
+    nl = tail.find('\n')
+    return tail[nl + 1:] if 0 <= nl < n // 2 else tail
+
+
+def text_item(text, directory, counter, threshold=None):
+    """Item ``text`` para el JSON; si ``text`` es largo, guarda el completo aparte.
+
+    ``counter`` numera los archivos dentro de la notebook. El item recortado
+    lleva ``tail`` (final del texto), ``blob`` (nombre del archivo completo),
+    ``size`` (bytes UTF-8 del archivo) y ``omitted`` (caracteres no incluidos).
+    """
+    if threshold is None:
+        threshold = TEXT_THRESHOLD
+    if threshold <= 0 or len(text) <= threshold:
+        return {'type': 'text', 'content': text}
+
+    name = f'text_{counter}.txt'
+    data = text.encode('utf-8')
+    with atomic_open(os.path.join(directory, name), 'wb') as f:
+        f.write(data)
+
+    head = _cut_head(text, PREVIEW_HEAD)
+    tail = _cut_tail(text, PREVIEW_TAIL)
+    return {
+        'type': 'text',
+        'content': head,
+        'tail': tail,
+        'blob': name,
+        'size': len(data),
+        'omitted': len(text) - len(head) - len(tail),
+    }
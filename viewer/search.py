@@ -0,0 +1,422 @@
+"""Búsqueda de texto completo en las salidas de las notebooks convertidas.
+
+Al convertir, cada notebook escribe en ``templates/notebooks/<slug>/``:
+
+- ``search.json``: vocabulario del notebook (``token -> df``, los items en
+  los que aparece), la longitud en tokens de cada item y ``id``, la huella de
+  sus apariciones.
+- ``postings.json``: índice invertido (``token -> [[item, tf, offset],
+  ...]``, donde ``offset`` es la posición de la primera aparición en el texto
+  del item), con el mismo ``id``.
+- ``snippets.json``: los primeros ``SNIPPET_SOURCE_CHARS`` caracteres del
+  texto plano de cada item, para armar los fragmentos de los resultados.
+
+Los items se numeran como los sirve el visor (``/api/notebook/<slug>/items/``
+y la página), que no incluyen el markdown del resumen (ver
+``compiled.summary_index``): ese va el último y ``summary`` es su posición.
+
+Se indexan los items ``markdown``, ``text`` (el texto completo, también la
+parte guardada aparte por previews.py), ``html`` (sin etiquetas) y
+``table`` (encabezados y celdas, de su archivo aparte; ver tables.py). Los
+índices son independientes por notebook, así que reconvertir una notebook
+solo reescribe el suyo.
+
+``SearchIndex`` junta en memoria solo los vocabularios: de cada token, en qué
+notebooks aparece y en cuántos items. Las apariciones y los fragmentos se
+leen al buscar, solo de las notebooks que tienen todos los términos, y quedan
+en una ``NotebookCache`` acotada por bytes (ver cache.py); la memoria no
+crece con el texto indexado. Los prefijos (``término*``) se buscan con
+bisección sobre el vocabulario ordenado, sin recorrer ningún índice.
+
+Este módulo no depende de Django para que también lo use convert_notebooks.py.
+"""
+import bisect
+import hashlib
+import heapq
+import html
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from . import compiled, tables
+from .atomic import atomic_open
+from .cache import NotebookCache
+
+SEGMENT_NAME = 'search.json'
+POSTINGS_NAME = 'postings.json'
+SNIPPETS_NAME = 'snippets.json'
+SEGMENT_VERSION = 3
+
+# Caracteres de cada item que se guardan para los fragmentos
+SNIPPET_SOURCE_CHARS = 4000
+# Contexto alrededor de la coincidencia en el fragmento
+SNIPPET_BEFORE = 60
+SNIPPET_AFTER = 140
+MAX_TOKEN_LEN = 64
+# Prefijos: como mucho esta cantidad de términos del vocabulario por prefijo
+MAX_PREFIX_EXPANSION = 50
+
+# Palabras con puntos internos (0.953, sklearn.metrics) cuentan como un token
+_TOKEN_RE = re.compile(r'\w+(?:\.\w+)*')
+_TAG_RE = re.compile(r'<(script|style)\b.*?</\1\s*>|<[^>]+>', re.S | re.I)
+
+# Parámetros de BM25
+K1 = 1.2
+B = 0.75
+
+
+def normalize(text):
+    """Minúsculas y sin tildes: 'Regresión' y 'regresion' son el mismo token."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Lista de ``(token, posición)`` del texto ya normalizado.
+
+    Los tokens compuestos (``petal_length``, ``sklearn.metrics``) se indexan
+    completos y también por partes.
+    """
+    tokens = []
+    for m in _TOKEN_RE.finditer(text):
+        token = m.group()
+        if len(token) > MAX_TOKEN_LEN:
+            continue
+        tokens.append((token, m.start()))
+        if '_' in token or '.' in token:
+            for part in re.split(r'[._]', token):
+                if part and part != token:
+                    tokens.append((part, m.start()))
+    return tokens
+
+
+def item_text(item, blob_dir=None):
+    """Texto plano de un item, o None si no se indexa."""
+    kind = item.get('type')
+    if kind == 'html':
+        return html.unescape(_TAG_RE.sub(' ', item.get('content', '')))
+    if kind == 'table':
+        return tables.table_text(os.path.join(blob_dir, item['blob'])) if blob_dir else ' '.join(item['columns'])
+    if kind == 'text' and item.get('blob') and blob_dir:
+        try:
+            with open(os.path.join(blob_dir, item['blob']), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            pass
+    if kind in ('text', 'markdown'):
+        return item.get('content', '') + item.get('tail', '')
+    return None
+
+
+def build_segment(items, blob_dir=None):
+    """Índice de una notebook: ``(segmento, textos para fragmentos)``."""
+    items = list(items)
+    summary = compiled.summary_index(items)
+    if summary is not None:
+        # mismo orden que el visor; el resumen al final
+        items.append(items.pop(summary))
+        summary = len(items) - 1
+    postings = {}
+    lengths = []
+    snippets = []
+    for idx, item in enumerate(items):
+        text = item_text(item, blob_dir)
+        if not text:
+            lengths.append(0)
+            snippets.append('')
+            continue
+        text = re.sub(r'\s+', ' ', text)
+        tokens = tokenize(normalize(text))
+        lengths.append(len(tokens))
+        snippets.append(text[:SNIPPET_SOURCE_CHARS])
+        counts = Counter(t for t, _ in tokens)
+        first = {}
+        for token, pos in tokens:
+            first.setdefault(token, pos)
+        for token, tf in counts.items():
+            postings.setdefault(token, []).append([idx, tf, first[token]])
+    segment = {'version': SEGMENT_VERSION, 'lengths': lengths, 'postings': postings, 'summary': summary}
+    return segment, snippets
+
+
+def write_segment(directory, items, blob_dir=None):
+    """Construye y guarda el índice de una notebook; devuelve las rutas."""
+    segment, snippets = build_segment(items, blob_dir)
+    postings = json.dumps(segment['postings'], ensure_ascii=False, separators=(',', ':'))
+    segment_id = hashlib.sha1(postings.encode('utf-8')).hexdigest()[:16]
+    vocabulary = {
+        'version': SEGMENT_VERSION,
+        'id': segment_id,
+        'lengths': segment['lengths'],
+        'summary': segment['summary'],
+        'terms': {token: len(entries) for token, entries in segment['postings'].items()},
+    }
+    paths = [os.path.join(directory, SEGMENT_NAME), os.path.join(directory, POSTINGS_NAME),
+             os.path.join(directory, SNIPPETS_NAME)]
+    # el vocabulario al final: el índice nuevo nunca apunta a textos viejos
+    with atomic_open(paths[2]) as f:
+        json.dump(snippets, f, ensure_ascii=False, separators=(',', ':'))
+    with atomic_open(paths[1]) as f:
+        f.write(f'{{"version":{SEGMENT_VERSION},"id":"{segment_id}","postings":{postings}}}')
+    with atomic_open(paths[0]) as f:
+        json.dump(vocabulary, f, ensure_ascii=False, separators=(',', ':'))
+    return paths
+
+
+def _load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def make_snippet(text, offset):
+    """Fragmento de ``text`` alrededor de ``offset``.
+
+    ``offset`` es la posición en el texto normalizado; quitar tildes no cambia
+    la longitud de los caracteres latinos, así que sirve para el original.
+    """
+    if offset >= len(text):
+        offset = 0
+    start = max(0, offset - SNIPPET_BEFORE)
+    end = min(len(text), offset + SNIPPET_AFTER)
+    if start > 0:
+        space = text.find(' ', start, offset)
+        start = space + 1 if space != -1 else start
+    snippet = text[start:end].strip()
+    return ('…' if start > 0 else '') + snippet + ('…' if end < len(text) else '')
+
+
+class SearchIndex:
+    """Vocabulario en memoria de todas las notebooks; las apariciones se leen
+    al buscar.
+
+    ``cache`` guarda las apariciones y los fragmentos de las notebooks
+    consultadas; por defecto una ``NotebookCache`` de ``max_bytes``.
+    """
+
+    def __init__(self, notes_dir, cache=None, max_bytes=32 * 1024 * 1024):
+        self.notes_dir = notes_dir
+        self.cache = cache if cache is not None else NotebookCache(max_entries=256, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._source = None
+        self._segments = {}   # slug -> firma del search.json cargado
+        self._ids = {}        # slug -> id de sus apariciones (postings.json)
+        self._where = {}      # token -> {slug: items en los que aparece}
+        self._df = Counter()  # token -> items en los que aparece
+        self._lengths = {}    # slug -> longitud en tokens de cada item
+        self._summary = {}    # slug -> posición del resumen en el segmento
+        self._items = 0       # items con texto en todo el índice
+        self._total_length = 0
+        self._vocabulary = None  # tokens ordenados, para prefijos
+        self._tokens = {}     # slug -> tokens de su segmento
+
+    def _dir(self, slug):
+        return os.path.join(self.notes_dir, slug)
+
+    def refresh(self, slugs, source=None, build=None):
+        """Sincroniza con la lista de notebooks ``slugs``.
+
+        ``source`` identifica la lista (el catálogo cacheado): si es el mismo
+        objeto que en la llamada anterior no se hace nada, así que el caso
+        normal no cuesta ni un ``stat``. ``build(slug)``, si se da, crea el
+        índice de las notebooks convertidas antes de que existiera la búsqueda.
+        """
+        if source is not None and source is self._source:
+            return
+        with self._lock:
+            wanted = set(slugs)
+            for slug in list(self._segments):
+                if slug not in wanted:
+                    self._drop(slug)
+            for slug in wanted:
+                sig = _signature(os.path.join(self._dir(slug), SEGMENT_NAME))
+                if sig is None and build is not None:
+                    try:
+                        build(slug)
+                    except (OSError, ValueError):
+                        pass
+                    sig = _signature(os.path.join(self._dir(slug), SEGMENT_NAME))
+                if self._segments.get(slug, False) == sig:
+                    continue
+                if slug in self._segments:
+                    self._drop(slug)
+                if sig is not None and not self._load(slug, sig) and build is not None:
+                    # índice de una versión anterior: rehacerlo
+                    try:
+                        build(slug)
+                    except (OSError, ValueError):
+                        continue
+                    sig = _signature(os.path.join(self._dir(slug), SEGMENT_NAME))
+                    if sig is not None:
+                        self._load(slug, sig)
+            self._source = source
+
+    def _drop(self, slug):
+        # Quitar una notebook cuesta lo mismo que su propio vocabulario
+        self._segments.pop(slug)
+        self._ids.pop(slug, None)
+        for token in self._tokens.pop(slug, ()):
+            by_slug = self._where[token]
+            self._df[token] -= by_slug.pop(slug)
+            if not by_slug:
+                del self._where[token]
+                del self._df[token]
+                self._vocabulary = None
+        lengths = self._lengths.pop(slug, [])
+        self._summary.pop(slug, None)
+        self._items -= sum(1 for n in lengths if n)
+        self._total_length -= sum(lengths)
+        for name in (POSTINGS_NAME, SNIPPETS_NAME):
+            self.cache.invalidate(os.path.join(self._dir(slug), name))
+
+    def _load(self, slug, sig):
+        """Carga el vocabulario de ``slug``; False si no se puede o es de otra versión."""
+        try:
+            segment = _load_json(os.path.join(self._dir(slug), SEGMENT_NAME))
+        except (OSError, ValueError):
+            return False
+        if segment.get('version') != SEGMENT_VERSION:
+            return False
+        where, df = self._where, self._df
+        for token, count in segment['terms'].items():
+            by_slug = where.get(token)
+            if by_slug is None:
+                by_slug = where[token] = {}
+                self._vocabulary = None
+            by_slug[slug] = count
+            df[token] += count
+        self._tokens[slug] = tuple(segment['terms'])
+        self._ids[slug] = segment['id']
+        self._lengths[slug] = segment['lengths']
+        self._items += sum(1 for n in segment['lengths'] if n)
+        self._total_length += sum(segment['lengths'])
+        self._summary[slug] = segment.get('summary')
+        self._segments[slug] = sig
+        return True
+
+    def _expand(self, prefix):
+        # 'regres' -> tokens del vocabulario que empiezan por 'regres'
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._where)
+        vocab = self._vocabulary
+        i = bisect.bisect_left(vocab, prefix)
+        out = []
+        while i < len(vocab) and vocab[i].startswith(prefix) and len(out) < MAX_PREFIX_EXPANSION:
+            out.append(vocab[i])
+            i += 1
+        return out
+
+    def _term(self, term, prefix):
+        """``(df, tokens, notebooks)`` de un término de la consulta.
+
+        Con prefijo, ``df`` suma el de cada token: un item con dos tokens del
+        prefijo cuenta dos veces, lo que solo baja un poco su idf.
+        """
+        tokens = self._expand(term) if prefix else [term] if term in self._where else []
+        notebooks = set()
+        for token in tokens:
+            notebooks.update(self._where[token])
+        return sum(self._df[token] for token in tokens), tokens, notebooks
+
+    def _postings(self, slug):
+        """Apariciones de ``slug`` (de la caché), o None si no se pueden leer."""
+        try:
+            return self.cache.get(os.path.join(self._dir(slug), POSTINGS_NAME), _load_json)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _merge(postings, tokens):
+        """``{item: [item, tf, offset]}`` de los ``tokens`` en una notebook."""
+        merged = {}
+        for token in tokens:
+            for item, tf, offset in postings.get(token, ()):
+                old = merged.get(item)
+                merged[item] = [item, tf, offset] if old is None else [item, old[1] + tf, min(old[2], offset)]
+        return merged
+
+    @staticmethod
+    def parse_query(query):
+        """Términos de la consulta: ``[(token, es_prefijo)]``; ``palabra*`` es prefijo."""
+        terms = []
+        for word in normalize(query).split():
+            tokens = [t for t in _TOKEN_RE.findall(word) if len(t) <= MAX_TOKEN_LEN]
+            for i, token in enumerate(tokens):
+                prefix = word.endswith('*') and i == len(tokens) - 1
+                if (token, prefix) not in terms:
+                    terms.append((token, prefix))
+        return terms
+
+    def search(self, query, limit=10):
+        """Resultados ``[{'slug', 'item', 'score', 'snippet'}]`` ordenados por BM25.
+
+        Todos los términos tienen que aparecer en el item. Solo se leen las
+        apariciones de las notebooks que tienen todos los términos, y en cada
+        una se recorren las del término menos frecuente.
+        """
+        terms = self.parse_query(query)
+        if not terms:
+            return []
+        with self._lock:
+            lists = sorted((self._term(t, p) for t, p in terms), key=lambda x: x[0])
+            if not lists[0][0]:
+                return []
+            candidates = set.intersection(*(notebooks for _, _, notebooks in lists))
+            n = self._items or 1
+            avgdl = self._total_length / n if self._total_length else 1.0
+            idfs = [math.log(1 + (n - df + 0.5) / (df + 0.5)) for df, _, _ in lists]
+            segments = {slug: (self._ids[slug], self._lengths[slug], self._summary.get(slug))
+                        for slug in candidates}
+        # fuera del candado: leer las apariciones no frena otras búsquedas
+        scored = []
+        for slug in sorted(candidates):
+            segment_id, lengths, _ = segments[slug]
+            postings = self._postings(slug)
+            if postings is None or postings.get('id') != segment_id:
+                # reconvertida a medias: entra en la próxima búsqueda
+                continue
+            postings = postings['postings']
+            first = self._merge(postings, lists[0][1])
+            # los demás términos, indexados por item solo en esta notebook
+            others = [{item: e[1] for item, e in self._merge(postings, tokens).items()}
+                      for _, tokens, _ in lists[1:]]
+            for item, tf, offset in first.values():
+                dl = lengths[item] if item < len(lengths) else avgdl
+                norm = K1 * (1 - B + B * dl / avgdl)
+                score = idfs[0] * tf * (K1 + 1) / (tf + norm)
+                for tfs, idf in zip(others, idfs[1:]):
+                    tf = tfs.get(item)
+                    if tf is None:
+                        break
+                    score += idf * tf * (K1 + 1) / (tf + norm)
+                else:
+                    scored.append((score, slug, item, offset))
+        top = heapq.nlargest(limit, scored, key=lambda s: s[0])
+        # 'item' es la posición en el visor; None si la coincidencia está en el resumen
+        return [{'slug': slug, 'item': None if item == segments[slug][2] else item,
+                 'score': round(score, 4), 'snippet': self._snippet(slug, item, offset)}
+                for score, slug, item, offset in top]
+
+    def _snippet(self, slug, item, offset):
+        try:
+            texts = self.cache.get(os.path.join(self._dir(slug), SNIPPETS_NAME), _load_json)
+        except (OSError, ValueError):
+            texts = []
+        if item >= len(texts):
+            return ''
+        return make_snippet(texts[item], offset)
+
+    def stats(self):
+        with self._lock:
+            return {'notebooks': len(self._segments), 'items': self._items, 'tokens': len(self._where)}
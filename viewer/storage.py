@@ -0,0 +1,223 @@
+"""Almacenamiento de las notebooks convertidas (lista de items).
+
+Hay dos formatos de artefacto en ``templates/notebooks``:
+
+- ``<slug>.json``: el formato histórico, un array JSON (con ``indent=2``).
+  Leer un solo item o el número de items obliga a decodificarlo entero.
+- ``<slug>.nbc``: contenedor binario indexado. Se lee con ``mmap``: el número
+  de items está en la cabecera y el item ``i`` se decodifica en O(1) sin tocar
+  los demás.
+
+Formato ``.nbc`` (little endian)::
+
+    cabecera  magic b'NBC1', versión u16, flags u16, número de items u32
+    tabla     un u64 por item: posición de su registro en el archivo
+    registros longitud u32, códec u8, payload (JSON compacto en UTF-8)
+
+El códec 1 indica payload comprimido con zlib; solo se comprime cuando el item
+es grande y se reduce (``FLAG_ZLIB`` en la cabecera indica que se pidió).
+
+``NOTEBOOK_STORAGE`` (``json`` o ``nbc``) elige el formato que escriben la CLI
+y el visor. Los lectores aceptan los dos: ``artifact_path`` busca primero el
+formato configurado y después el otro, así que las notebooks convertidas con
+una versión anterior se siguen sirviendo sin reconvertir.
+
+Este módulo no depende de Django.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+
+from .atomic import atomic_open
+
+FORMATS = {'json': '.json', 'nbc': '.nbc'}
+DEFAULT_FORMAT = os.environ.get('NOTEBOOK_STORAGE', 'json').lower()
+if DEFAULT_FORMAT not in FORMATS:
+    DEFAULT_FORMAT = 'json'
+
+MAGIC = b'NBC1'
+CONTAINER_VERSION = 1
+FLAG_ZLIB = 1
+HEADER = struct.Struct('<4sHHI')
+OFFSET = struct.Struct('<Q')
+RECORD = struct.Struct('<IB')
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+# Items más pequeños no se comprimen: zlib apenas gana y cuesta al leer
+ZLIB_MIN_BYTES = 512
+
+
+def _lookup_order(fmt=None):
+    fmt = fmt or DEFAULT_FORMAT
+    return [fmt] + [f for f in FORMATS if f != fmt]
+
+
+def artifact_path(notes_dir, slug):
+    """Ruta del artefacto de ``slug``: el del formato configurado si existe,
+    si no el del otro formato; si no hay ninguno, la del configurado."""
+    slug = os.path.basename(slug)
+    order = _lookup_order()
+    for fmt in order:
+        path = os.path.join(notes_dir, slug + FORMATS[fmt])
+        if os.path.exists(path):
+            return path
+    return os.path.join(notes_dir, slug + FORMATS[order[0]])
+
+
+def artifact_exists(notes_dir, slug):
+    return any(os.path.exists(os.path.join(notes_dir, slug + ext)) for ext in FORMATS.values())
+
+
+def split_artifact(fname):
+    """``(slug, formato)`` si ``fname`` es un artefacto de notebook; si no None."""
+    if fname.startswith('.'):
+        return None
+    stem, ext = os.path.splitext(fname)
+    for fmt, fmt_ext in FORMATS.items():
+        if ext.lower() == fmt_ext:
+            return stem, fmt
+    return None
+
+
+def slug_of(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def write_container(path, items, compress=True):
+    """Escribe ``items`` en el contenedor ``.nbc`` de forma atómica."""
+    payloads = []
+    for it in items:
+        data = json.dumps(it, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        codec = CODEC_RAW
+        if compress and len(data) >= ZLIB_MIN_BYTES:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                data, codec = packed, CODEC_ZLIB
+        payloads.append((codec, data))
+    position = HEADER.size + OFFSET.size * len(payloads)
+    offsets = []
+    for _, data in payloads:
+        offsets.append(position)
+        position += RECORD.size + len(data)
+    with atomic_open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, CONTAINER_VERSION, FLAG_ZLIB if compress else 0, len(payloads)))
+        f.write(b''.join(OFFSET.pack(off) for off in offsets))
+        for codec, data in payloads:
+            f.write(RECORD.pack(len(data), codec))
+            f.write(data)
+    return path
+
+
+def write_items(notes_dir, slug, items, fmt=None, compress=True):
+    """Guarda los items de ``slug`` en el formato ``fmt``; devuelve la ruta.
+
+    Borra el artefacto del otro formato para que los lectores no sirvan una
+    conversión anterior.
+    """
+    fmt = fmt or DEFAULT_FORMAT
+    path = os.path.join(notes_dir, slug + FORMATS[fmt])
+    if fmt == 'nbc':
+        write_container(path, items, compress)
+    else:
+        with atomic_open(path) as f:
+            json.dump(items, f, indent=2, ensure_ascii=False)
+    for other, ext in FORMATS.items():
+        if other != fmt:
+            try:
+                os.remove(os.path.join(notes_dir, slug + ext))
+            except FileNotFoundError:
+                pass
+    return path
+
+
+class Container:
+    """Lector del contenedor ``.nbc`` sobre ``mmap``.
+
+    ``len()`` lee la cabecera y ``container[i]`` decodifica solo el item ``i``;
+    se puede iterar y usar con ``with`` para liberar el mapeo.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.flags, self._count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != CONTAINER_VERSION:
+                raise ValueError(f'{path}: no es un contenedor de notebook válido')
+            if HEADER.size + OFFSET.size * self._count > len(self._map):
+                raise ValueError(f'{path}: contenedor truncado')
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+
+    def __len__(self):
+        return self._count
+
+    def raw(self, index):
+        """Bytes JSON del item ``index`` (ya descomprimidos)."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('item fuera de rango')
+        off, = OFFSET.unpack_from(self._map, HEADER.size + OFFSET.size * index)
+        length, codec = RECORD.unpack_from(self._map, off)
+        start = off + RECORD.size
+        data = self._map[start:start + length]
+        return zlib.decompress(data) if codec == CODEC_ZLIB else data
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        return json.loads(self.raw(index))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class JsonItems(list):
+    """Artefacto JSON histórico con la misma interfaz que ``Container``."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def open_items(path):
+    """Lector de los items de ``path`` (``Container`` o ``JsonItems``).
+
+    Lanza OSError si no existe y ValueError si el archivo no es válido.
+    """
+    if path.lower().endswith(FORMATS['nbc']):
+        return Container(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return JsonItems(json.load(f))
+
+
+def load_items(path):
+    """Todos los items de ``path`` como lista, sea cual sea el formato."""
+    with open_items(path) as items:
+        return list(items)
+
+
+def count_items(path):
+    """Número de items; en ``.nbc`` sin decodificar ninguno."""
+    with open_items(path) as items:
+        return len(items)
@@ -0,0 +1,253 @@
+"""Tablas de pandas grandes como datos por columnas, servidas por páginas.
+
+Durante la conversión, los items ``html`` de más de ``TABLE_THRESHOLD``
+bytes que son una tabla de ``DataFrame.to_html`` se convierten en items
+``table``: encabezados, tipo de cada columna y número de filas. Las celdas
+van aparte, por columnas, en ``templates/notebooks/<slug>/table_N.json``. La
+página solo lleva el encabezado; las filas visibles se piden a
+``/api/notebook/<slug>/table/<archivo>/`` (con orden en el servidor), así que
+ni el HTML inicial ni el DOM crecen con el número de filas.
+
+Las tablas que no se pueden representar así (encabezados de varios niveles,
+celdas combinadas, más de una tabla en la salida...) se quedan como HTML.
+
+Este módulo no depende de Django para que también lo use convert_notebooks.py.
+"""
+import json
+import math
+import os
+import re
+from html.parser import HTMLParser
+
+from .atomic import atomic_open
+
+# Tamaño (bytes del HTML) a partir del cual una tabla se sirve por páginas
+TABLE_THRESHOLD = int(os.environ.get('NOTEBOOK_TABLE_THRESHOLD', '32768'))
+BLOB_RE = re.compile(r'^table_\d+\.json$')
+TABLE_VERSION = 1
+
+# Valores que pandas muestra para los datos ausentes
+MISSING = frozenset(('', 'NaN', 'nan', 'None', 'NaT', '<NA>', '...'))
+_INT_RE = re.compile(r'^[-+]?\d+$')
+_FLOAT_RE = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$|^[-+]?inf$', re.I)
+_STYLE_RE = re.compile(r'<style\b.*?</style\s*>', re.S | re.I)
+_CAPTION_RE = re.compile(r'</table>\s*<p>(.*?)</p>', re.S | re.I)
+
+
+class _TableParser(HTMLParser):
+    """Filas ``(sección, [(etiqueta, texto), ...])`` de una tabla simple."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.tables = 0
+        self.complex = False
+        self.section = None
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self.tables += 1
+        elif tag in ('thead', 'tbody'):
+            self.section = tag
+        elif tag == 'tr':
+            self.rows.append((self.section, []))
+        elif tag in ('td', 'th'):
+            if any(name in ('colspan', 'rowspan') for name, _ in attrs) or not self.rows:
+                self.complex = True
+            self.cell = [tag, []]
+            if self.rows:
+                self.rows[-1][1].append(self.cell)
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th', 'tr'):
+            self.cell = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell[1].append(data)
+
+
+def parse_table(html):
+    """Tabla de pandas de ``html`` como datos, o None si no es una tabla simple.
+
+    Devuelve ``{'columns', 'index_columns', 'rows', 'caption'}``; ``rows`` son
+    listas de textos con las columnas del índice primero.
+    """
+    body = _STYLE_RE.sub('', html)
+    if body.count('<table') != 1 or 'dataframe' not in body:
+        return None
+    parser = _TableParser()
+    try:
+        parser.feed(body)
+        parser.close()
+    except Exception:
+        return None
+    if parser.complex or parser.tables != 1:
+        return None
+
+    def texts(cells):
+        return [' '.join(''.join(parts).split()) for _, parts in cells]
+
+    head = [cells for section, cells in parser.rows if section == 'thead']
+    rows = [cells for section, cells in parser.rows if section != 'thead']
+    if not head or not rows:
+        return None
+    columns = texts(head[0])
+    index_columns = sum(1 for tag, _ in rows[0] if tag == 'th')
+    if len(head) == 2:
+        # segunda fila con los nombres del índice (df.index.name)
+        names = texts(head[1])
+        if len(names) != len(columns) or any(names[index_columns:]):
+            return None
+        columns[:index_columns] = names[:index_columns]
+    elif len(head) > 2:
+        return None
+    values = [texts(cells) for cells in rows]
+    if any(len(r) != len(columns) for r in values):
+        return None
+    m = _CAPTION_RE.search(body)
+    caption = ' '.join(re.sub(r'<[^>]+>', ' ', m.group(1)).split()) if m else ''
+    return {'columns': columns, 'index_columns': index_columns, 'rows': values, 'caption': caption}
+
+
+def _number(value):
+    if value in MISSING:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return None if math.isnan(number) else number
+
+
+def infer_dtype(values):
+    """``int``, ``float`` o ``str`` según los valores (ignorando los ausentes)."""
+    present = [v for v in values if v not in MISSING]
+    if not present:
+        return 'str'
+    if all(_INT_RE.match(v) for v in present):
+        return 'int'
+    if all(_FLOAT_RE.match(v) for v in present):
+        return 'float'
+    return 'str'
+
+
+def write_table(directory, name, columns, dtypes, data):
+    """Guarda las celdas de una tabla (por columnas) en ``directory/name``."""
+    with atomic_open(os.path.join(directory, name)) as f:
+        json.dump({'version': TABLE_VERSION, 'columns': columns, 'dtypes': dtypes, 'data': data}, f,
+                  ensure_ascii=False, separators=(',', ':'))
+
+
+def table_item(html, directory, counter, threshold=None):
+    """Item ``table`` si ``html`` es una tabla grande; si no, None.
+
+    Como ``previews.text_item``: escribe las celdas en
+    ``directory/table_<counter>.json`` y el item lleva ``blob``, ``columns``,
+    ``dtypes``, ``index_columns``, ``rows`` (número de filas) y ``caption``
+    (p. ej. ``1000 rows × 5 columns``).
+    """
+    if threshold is None:
+        threshold = TABLE_THRESHOLD
+    if threshold <= 0 or len(html.encode('utf-8')) <= threshold:
+        return None
+    table = parse_table(html)
+    if table is None:
+        return None
+    data = [list(col) for col in zip(*table['rows'])]
+    dtypes = [infer_dtype(col) for col in data]
+    name = f'table_{counter}.json'
+    write_table(directory, name, table['columns'], dtypes, data)
+    return {
+        'type': 'table',
+        'blob': name,
+        'columns': table['columns'],
+        'dtypes': dtypes,
+        'index_columns': table['index_columns'],
+        'rows': len(table['rows']),
+        'caption': table['caption'],
+    }
+
+
+def tabulate_items(items, directory, threshold=None):
+    """Sustituye en su sitio los items ``html`` grandes por items ``table``.
+
+    Devuelve las rutas escritas.
+    """
+    written = []
+    counter = 0
+    for idx, it in enumerate(items):
+        if it.get('type') != 'html' or not it.get('content'):
+            continue
+        item = table_item(it['content'], directory, counter + 1, threshold)
+        if item is not None:
+            counter += 1
+            items[idx] = item
+            written.append(os.path.join(directory, item['blob']))
+    return written
+
+
+def clear_blobs(directory):
+    """Borra las tablas de una conversión anterior."""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if BLOB_RE.match(name):
+            os.remove(os.path.join(directory, name))
+
+
+def load_table(path):
+    """Tabla guardada por ``table_item`` (cargador de la caché).
+
+    Añade ``orders``: permutaciones de filas ya ordenadas, por
+    ``(columna, descendente)``.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+    if table.get('version') != TABLE_VERSION:
+        raise ValueError('versión de tabla desconocida')
+    table['total'] = len(table['data'][0]) if table['data'] else 0
+    table['orders'] = {}
+    return table
+
+
+def row_order(table, column, descending=False):
+    """Índices de las filas ordenadas por ``column``; los ausentes al final."""
+    key = (column, descending)
+    order = table['orders'].get(key)
+    if order is not None:
+        return order
+    values = table['data'][column]
+    if table['dtypes'][column] in ('int', 'float'):
+        keys = [_number(v) for v in values]
+    else:
+        keys = [None if v in MISSING else v.casefold() for v in values]
+    present = [i for i, k in enumerate(keys) if k is not None]
+    present.sort(key=keys.__getitem__, reverse=descending)
+    order = present + [i for i, k in enumerate(keys) if k is None]
+    # la asignación de un dict es atómica: dos hilos como mucho ordenan dos veces
+    table['orders'][key] = order
+    return order
+
+
+def rows(table, offset, limit, column=None, descending=False):
+    """Filas ``[offset, offset+limit)`` (cada una con todas las columnas)."""
+    data = table['data']
+    if column is None:
+        indices = range(offset, min(offset + limit, table['total']))
+    else:
+        indices = row_order(table, column, descending)[offset:offset + limit]
+    return [[col[i] for col in data] for i in indices]
+
+
+def table_text(path):
+    """Texto plano de una tabla guardada (encabezados y celdas), para la búsqueda."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        return ''
+    lines = [' '.join(table.get('columns', []))]
+    lines.extend(' '.join(row) for row in zip(*table.get('data', [])))
+    return '\n'.join(lines)
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+
+from viewer.cache import NotebookCache, estimate_size
+
+
+class NotebookCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'nb.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, items, mtime_ns=None):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(items, f)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def load(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_repeated_get_is_a_hit(self):
+        self.write([{'type': 'text', 'content': 'a'}])
+        cache = NotebookCache()
+        first = cache.get(self.path, self.load)
+        self.assertIs(cache.get(self.path, self.load), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_reloads_file_rewritten_in_place(self):
+        # mismo tamaño, otro mtime: lo que deja open_notebook al reconvertir
+        self.write([{'type': 'text', 'content': 'a'}], mtime_ns=1_000_000_000_000_000_000)
+        size = os.path.getsize(self.path)
+        cache = NotebookCache()
+        self.assertEqual(cache.get(self.path, self.load)[0]['content'], 'a')
+
+        self.write([{'type': 'text', 'content': 'b'}], mtime_ns=1_000_000_001_000_000_000)
+        self.assertEqual(os.path.getsize(self.path), size)
+        self.assertEqual(cache.get(self.path, self.load)[0]['content'], 'b')
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_missing_file_drops_entry(self):
+        self.write([])
+        cache = NotebookCache()
+        cache.get(self.path, self.load)
+        os.remove(self.path)
+        with self.assertRaises(FileNotFoundError):
+            cache.get(self.path, self.load)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_weight_is_loaded_value_not_file_size(self):
+        # archivo diminuto que carga un valor grande (como la meta de una página)
+        self.write({'page': 'page.html'})
+        cache = NotebookCache(max_bytes=10_000)
+        cache.get(self.path, lambda path: {'bodies': {'identity': b'x' * 20_000}})
+        self.assertEqual(cache.stats()['entries'], 0)
+        cache.get(self.path, lambda path: {'bodies': {'identity': b'x' * 5_000}})
+        self.assertGreaterEqual(cache.stats()['bytes'], 5_000)
+
+    def test_evicts_by_bytes(self):
+        paths = []
+        for name in 'abc':
+            path = os.path.join(self.tmp.name, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            paths.append(path)
+        cache = NotebookCache(max_bytes=2 * estimate_size('x' * 1000))
+        for path in paths:
+            cache.get(path, lambda path: 'x' * 1000)
+        self.assertEqual(cache.stats()['entries'], 2)
+        self.assertEqual(cache.evictions, 1)
+
+
+class EstimateSizeTests(unittest.TestCase):
+
+    def test_grows_with_nested_content(self):
+        small = estimate_size({'items': [{'html': 'x' * 10}]})
+        large = estimate_size({'items': [{'html': 'x' * 10_000}] * 3})
+        self.assertGreater(large, 30_000)
+        self.assertLess(small, 100)
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from viewer import compiled
+
+
+class WriteModelTests(unittest.TestCase):
+    """El modelo compilado reutiliza el HTML del anterior para el markdown que no cambia."""
+
+    ITEMS = [
+        {'type': 'markdown', 'content': '# Ventas\n\nResumen del dataset'},
+        {'type': 'markdown', 'content': '## Limpieza\n\nSe quitan nulos'},
+        {'type': 'html', 'content': '<style>.a{color:red}</style><table></table>'},
+        {'type': 'html', 'content': '<style>.a{color:red}</style><table><tr></tr></table>'},
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        compiled._memo.clear()
+        self.addCleanup(compiled._memo.clear)
+
+    def write(self, items, source=(1, 10)):
+        return compiled.write_model(self.tmp.name, items, 'ventas', source)
+
+    def test_model_contents(self):
+        model, path = self.write(self.ITEMS)
+        self.assertEqual(path, os.path.join(self.tmp.name, compiled.MODEL_NAME))
+        self.assertEqual(compiled.load_model(path), model)
+        self.assertTrue(compiled.is_current(model, (1, 10)))
+        self.assertFalse(compiled.is_current(model, (2, 10)))
+        self.assertIn('Resumen del dataset', model['summary'])
+        self.assertEqual(model['sections'], [{'id': 'limpieza', 'title': 'Limpieza'}])
+        # el resumen no se repite entre los items; el estilo repetido va una vez
+        self.assertEqual(len(model['items']), 3)
+        self.assertEqual(model['stylesheet'], '.a{color:red}')
+        self.assertNotIn('<style>', model['items'][1]['html'])
+        self.assertIn('<style>', model['items'][1]['content'])
+
+    def test_unchanged_markdown_is_not_converted_again(self):
+        self.write(self.ITEMS)
+        compiled._memo.clear()  # como en otro proceso: solo queda el modelo guardado
+
+        changed = self.ITEMS + [{'type': 'markdown', 'content': 'Celda nueva'}]
+        real = compiled.render_markdown
+        seen = []
+
+        def render(text, known=None):
+            key = compiled.content_hash(text)
+            if not (known and key in known):
+                seen.append(text)
+            return real(text, known)
+
+        with mock.patch.object(compiled, 'render_markdown', side_effect=render):
+            model, _ = self.write(changed, source=(2, 20))
+        self.assertEqual(seen, ['Celda nueva'])
+        self.assertEqual(len(model['markdown']), 3)
+        self.assertTrue(compiled.is_current(model, (2, 20)))
+
+    def test_previous_model_of_another_version_is_ignored(self):
+        model, _ = self.write(self.ITEMS)
+        compiled._memo.clear()
+        with mock.patch.object(compiled, 'COMPILED_VERSION', compiled.COMPILED_VERSION + 1), \
+                mock.patch.object(compiled, 'render_markdown', wraps=compiled.render_markdown) as render:
+            self.write(self.ITEMS)
+        self.assertTrue(all(call.args[1] is None for call in render.call_args_list))
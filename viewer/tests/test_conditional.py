@@ -0,0 +1,91 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils.http import http_date
+
+from viewer import images, storage, views
+
+DIGEST = 'cd' * 32
+
+
+class ConditionalGetTests(SimpleTestCase):
+    """Páginas y APIs responden 304 mientras no cambie el artefacto."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.notes = os.path.join(self.tmp.name, 'notebooks')
+        self.static = os.path.join(self.tmp.name, 'static')
+        for name, value in (('TEMPLATES_NOTES_DIR', self.notes), ('STATIC_NOTES_DIR', self.static)):
+            patcher = mock.patch.object(views, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(views.notebook_cache.clear)
+        self.write([{'type': 'text', 'content': 'hola'}])
+
+    def write(self, items):
+        path = storage.write_items(self.notes, 'nb', items, 'json')
+        # otra fecha en cada escritura, aunque caiga en el mismo tick del reloj
+        mtime = 1_700_000_000_000_000_000 + len(items) * 1_000_000_000
+        os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_page_revalidates_with_etag_and_last_modified(self):
+        first = self.client.get('/notebook/nb/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertEqual(self.client.get('/notebook/nb/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/notebook/nb/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code,
+                         304)
+
+        self.write([{'type': 'text', 'content': 'hola'}, {'type': 'text', 'content': 'adiós'}])
+        second = self.client.get('/notebook/nb/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_items_share_the_validator_of_the_page(self):
+        page = self.client.get('/notebook/nb/')
+        items = self.client.get('/api/notebook/nb/items/', HTTP_IF_NONE_MATCH=page['ETag'])
+        self.assertEqual(items.status_code, 304)
+
+    def test_stale_if_modified_since_is_200(self):
+        response = self.client.get('/notebook/nb/', HTTP_IF_MODIFIED_SINCE=http_date(1_600_000_000))
+        self.assertEqual(response.status_code, 200)
+
+
+class ImmutableImageTests(SimpleTestCase):
+    """Las imágenes del almacén se cachean para siempre: la URL lleva su hash."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(views, 'STATIC_NOTES_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        path = os.path.join(self.tmp.name, images.object_relpath(DIGEST, 'png'))
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'\x89PNG datos')
+        self.url = images.object_url(DIGEST, 'png')
+
+    def test_image_is_immutable(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], f'"{DIGEST}"')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(b''.join(response.streaming_content), b'\x89PNG datos')
+
+    def test_revalidation_is_304_without_reading_the_file(self):
+        with mock.patch('builtins.open', side_effect=AssertionError('no debe leer')):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{DIGEST}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], f'"{DIGEST}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_unknown_or_misplaced_object_is_404(self):
+        self.assertEqual(self.client.get(images.object_url('ef' * 32, 'png')).status_code, 404)
+        misplaced = f'/static/notebooks/objects/00/{DIGEST}.png'
+        self.assertEqual(self.client.get(misplaced).status_code, 404)
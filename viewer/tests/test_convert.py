@@ -0,0 +1,113 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import convert_notebooks as cn
+from viewer import storage
+from viewer.tests.test_transforms import make_notebook
+
+
+class ConvertNotebooksTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = Path(self.tmp.name) / 'datasets'
+        self.site = Path(self.tmp.name) / 'site'
+        self.source.mkdir()
+        with open(self.source / 'usuarios.ipynb', 'w', encoding='utf-8') as f:
+            json.dump(make_notebook(), f)
+
+    def tearDown(self):
+        cn.set_paths(cn.BASE_DIR / 'datasets', cn.BASE_DIR)
+        self.tmp.cleanup()
+
+    def run_cli(self, *extra):
+        argv = ['--source', str(self.source), '--site', str(self.site), '--format', 'json', *extra]
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(cn.main(argv), 0)
+
+    def convert(self, *extra):
+        self.run_cli(*extra)
+        notes = self.site / 'templates' / 'notebooks'
+        return storage.load_items(storage.artifact_path(str(notes), 'usuarios'))
+
+    def test_unchanged_notebooks_are_skipped(self):
+        self.convert()
+        manifest = cn.load_manifest()
+        entry = manifest['usuarios.ipynb']
+        self.assertTrue(all((self.site / rel).exists() for rel in entry['outputs']))
+        artifact = self.site / 'templates' / 'notebooks' / 'usuarios.json'
+        before = artifact.stat().st_mtime_ns
+
+        self.convert()
+        self.assertEqual(artifact.stat().st_mtime_ns, before)
+
+        # otra fecha con el mismo contenido (p. ej. un checkout): solo se
+        # refresca la firma del manifest
+        path = self.source / 'usuarios.ipynb'
+        os.utime(path, ns=(1_000_000_000_000_000_000, 1_000_000_000_000_000_000))
+        self.convert()
+        self.assertEqual(artifact.stat().st_mtime_ns, before)
+        self.assertEqual(cn.load_manifest()['usuarios.ipynb']['mtime_ns'], 1_000_000_000_000_000_000)
+
+    def test_modified_and_deleted_notebooks(self):
+        self.convert()
+        path = self.source / 'usuarios.ipynb'
+        nb = make_notebook()
+        nb['cells'].append({'cell_type': 'markdown', 'metadata': {}, 'source': 'Nueva sección'})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(nb, f)
+        items = self.convert()
+        self.assertEqual(items[-1]['content'], 'Nueva sección')
+
+        outputs = cn.load_manifest()['usuarios.ipynb']['outputs']
+        path.unlink()
+        self.run_cli()
+        self.assertEqual(cn.load_manifest(), {})
+        self.assertFalse([rel for rel in outputs if (self.site / rel).exists()])
+
+    def test_changed_options_reconvert(self):
+        self.convert()
+        entry = cn.load_manifest()['usuarios.ipynb']
+        self.assertEqual(cn.stale_reason(entry, self.source / 'usuarios.ipynb', {**entry['options'], 'x': 1}),
+                         'opciones distintas')
+        artifact = self.site / 'templates' / 'notebooks' / 'usuarios.json'
+        before = artifact.stat().st_mtime_ns
+        self.convert('--pipeline', 'drop:markdown')
+        self.assertNotEqual(artifact.stat().st_mtime_ns, before)
+
+    def test_parallel_conversion_matches_serial(self):
+        for name in ('b', 'c'):
+            with open(self.source / f'{name}.ipynb', 'w', encoding='utf-8') as f:
+                json.dump(make_notebook(), f)
+        notes = self.site / 'templates' / 'notebooks'
+
+        def snapshot():
+            manifest = cn.load_manifest()
+            for entry in manifest.values():
+                entry.pop('converted_at')
+                entry['catalog'].pop('converted_at')
+            artifacts = {p.name: p.read_bytes() for p in notes.iterdir() if storage.split_artifact(p.name)}
+            return manifest, artifacts
+
+        self.convert('--jobs', '1', '--force')
+        serial = snapshot()
+        self.convert('--jobs', '3', '--force')
+        self.assertEqual(snapshot(), serial)
+        self.assertEqual(len(serial[1]), 3)
+
+    def test_markdown_cells_are_kept_unless_dropped(self):
+        self.assertIn('markdown', {it['type'] for it in self.convert()})
+        self.assertNotIn('markdown', {it['type'] for it in self.convert('--pipeline', 'drop:markdown')})
+
+    def test_legacy_images_are_removed_on_conversion(self):
+        legacy = self.site / 'static' / 'notebooks' / 'usuarios'
+        legacy.mkdir(parents=True)
+        for name in ('img_1.png', 'output_2.png', 'notas.txt'):
+            (legacy / name).write_bytes(b'x')
+        self.convert()
+        self.assertEqual(sorted(p.name for p in legacy.iterdir()), ['notas.txt'])
@@ -0,0 +1,74 @@
+import unittest
+
+from viewer import compiled, htmlmin
+
+# Lo que genera DataFrame.to_html en un notebook
+STYLE = """<style scoped>
+    .dataframe tbody tr th:only-of-type {
+        vertical-align: middle;
+    }
+
+    .dataframe thead th {
+        text-align: right;
+    }
+</style>"""
+
+
+def pandas_table(value):
+    return f"""<div>
+{STYLE}
+<table border="1" class="dataframe">
+  <thead>
+    <tr style="text-align: right;">
+      <th></th>
+      <th>a</th>
+    </tr>
+  </thead>
+  <tbody>
+    <tr>
+      <th>0</th>
+      <td>{value}</td>
+    </tr>
+  </tbody>
+</table>
+</div>"""
+
+
+class MinifyItemsTests(unittest.TestCase):
+    """Las tablas de pandas se minifican y su ``<style>`` va una vez por notebook."""
+
+    def test_style_is_kept_only_in_the_first_table(self):
+        items = [{'type': 'html', 'content': pandas_table(1)},
+                 {'type': 'text', 'content': '  sin   tocar  '},
+                 {'type': 'html', 'content': pandas_table(2)}]
+        before, after = htmlmin.minify_items(items)
+        self.assertLess(after, before)
+        first, text, second = (it['content'] for it in items)
+        self.assertEqual(text, '  sin   tocar  ')
+        self.assertEqual(first.count('<style'), 1)
+        self.assertNotIn('<style', second)
+        self.assertIn('.dataframe thead th{text-align:right}', first)
+        # el text-align de la fila sobra con la regla de la hoja
+        self.assertNotIn('style="text-align', first + second)
+        self.assertEqual(
+            second,
+            '<div><table border="1" class="dataframe"><thead><tr><th><th>a</thead>'
+            '<tbody><tr><th>0<td>2</tbody></table></div>')
+
+    def test_compiled_model_hoists_the_style_once(self):
+        items = [{'type': 'html', 'content': pandas_table(n)} for n in range(3)]
+        htmlmin.minify_items(items)
+        model = compiled.compile_items(items, 'nb', (1, 1))
+        _, styles = htmlmin.split_styles(items[0]['content'])
+        self.assertEqual(model['stylesheet'], styles[0])
+        self.assertFalse(any('<style' in it['html'] for it in model['items']))
+
+    def test_whitespace_that_renders_is_kept(self):
+        pre = '<div>\n<pre>  a\n   b  </pre>\n</div>'
+        self.assertEqual(htmlmin.minify(pre), '<div> <pre>  a\n   b  </pre> </div>')
+        styled = '<span style="white-space: pre">a   b</span>'
+        self.assertEqual(htmlmin.minify(styled), '<span style="white-space:pre">a   b</span>')
+        self.assertEqual(htmlmin.minify('<p>a  <b>b</b>\n c</p>'), '<p>a <b>b</b> c</p>')
+
+    def test_minify_css(self):
+        self.assertEqual(htmlmin.minify_css('a :hover { color: red ; } /* x */'), 'a :hover{color:red}')
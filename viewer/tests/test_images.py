@@ -0,0 +1,50 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from viewer import images, storage
+
+DIGEST = 'ab' * 32
+
+
+class PruneObjectsTests(SimpleTestCase):
+    """La poda del almacén compartido no borra lo que usa una conversión en curso."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.notes = os.path.join(self.tmp.name, 'notebooks')
+        self.static = os.path.join(self.tmp.name, 'static')
+        os.makedirs(self.notes)
+        self.object = os.path.join(self.static, images.object_relpath(DIGEST, 'png'))
+        os.makedirs(os.path.dirname(self.object))
+        with open(self.object, 'wb') as f:
+            f.write(b'png')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_unreferenced_object_is_removed(self):
+        self.assertEqual(images.prune_objects({DIGEST}, self.notes, self.static), 1)
+        self.assertFalse(os.path.exists(self.object))
+
+    def test_prune_waits_for_conversion_reusing_the_object(self):
+        done = threading.Event()
+
+        def prune():
+            images.prune_objects({DIGEST}, self.notes, self.static)
+            done.set()
+
+        with images.store_lock(self.static, shared=True):
+            # otra conversión reutiliza el objeto; su artefacto aún no existe
+            worker = threading.Thread(target=prune)
+            worker.start()
+            time.sleep(0.2)
+            self.assertFalse(done.is_set())
+            storage.write_items(self.notes, 'otra', [
+                {'type': 'image', 'content': images.object_url(DIGEST, 'png')}])
+        worker.join(5)
+        self.assertTrue(done.is_set())
+        self.assertTrue(os.path.exists(self.object))
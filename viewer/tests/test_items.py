@@ -0,0 +1,40 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from viewer import storage, views
+
+
+class NotebookItemsTests(SimpleTestCase):
+    """``/api/notebook/<slug>/items/`` valida la petición antes de cargar la notebook."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(views, 'TEMPLATES_NOTES_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(views.notebook_cache.clear)
+        items = [{'type': 'text', 'content': f'salida {i}'} for i in range(3)]
+        storage.write_items(self.tmp.name, 'nb', items)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bad_window_is_400_without_loading_or_validators(self):
+        with mock.patch.object(views, '_get_notebook', wraps=views._get_notebook) as load:
+            response = self.client.get('/api/notebook/nb/items/', {'offset': 'x'})
+        self.assertEqual(response.status_code, 400)
+        load.assert_not_called()
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_window_keeps_validators(self):
+        response = self.client.get('/api/notebook/nb/items/', {'offset': '1', 'limit': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 3)
+        self.assertEqual(response.json()['items'][0]['content'], 'salida 1')
+        again = self.client.get('/api/notebook/nb/items/', {'offset': '1', 'limit': '1'},
+                                HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from viewer import jobs
+
+
+class JobPoolTests(unittest.TestCase):
+    """Una conversión por notebook entre procesos y presupuesto de bytes compartido."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.release = threading.Event()
+        self.pool = jobs.JobPool(self.tmp.name, max_workers=2, max_bytes=100, retry_after=7)
+
+    def tearDown(self):
+        self.release.set()
+        if self.pool._executor is not None:
+            self.pool._executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    def blocked(self, job):
+        self.release.wait(5)
+        return {'url': '/notebook/x/'}
+
+    def wait(self, job_id):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            state = self.pool.status(job_id)
+            if state['status'] in (jobs.DONE, jobs.ERROR):
+                return state
+            time.sleep(0.01)
+        self.fail('el trabajo no terminó')
+
+    def write_foreign_job(self, key, size, host='otra-maquina', pid=1):
+        """Trabajo en curso de otro proceso, como lo dejaría en la carpeta de estado."""
+        job_id = 'f' * 32
+        with open(os.path.join(self.tmp.name, f'{job_id}.json'), 'w', encoding='utf-8') as f:
+            json.dump({'id': job_id, 'status': jobs.RUNNING, 'pid': pid, 'host': host, 'progress': {}}, f)
+        with open(os.path.join(self.tmp.name, f'{key}.active'), 'w', encoding='utf-8') as f:
+            f.write(job_id)
+        with open(os.path.join(self.tmp.name, 'admission.json'), 'w', encoding='utf-8') as f:
+            json.dump({job_id: {'bytes': size, 'pid': pid, 'host': host}}, f)
+        return job_id
+
+    def test_same_key_shares_the_job(self):
+        first = self.pool.submit('nb', 10, self.blocked)
+        self.assertEqual(self.pool.submit('nb', 10, self.blocked), first)
+        self.release.set()
+        self.assertEqual(self.wait(first)['progress']['url'], '/notebook/x/')
+        # terminado, la siguiente petición lanza otro
+        self.assertNotEqual(self.pool.submit('nb', 10, self.blocked), first)
+
+    def test_job_of_another_process_is_shared(self):
+        foreign = self.write_foreign_job('nb', 10)
+        self.assertEqual(self.pool.submit('nb', 10, self.blocked), foreign)
+
+    def test_job_of_a_dead_process_is_replaced(self):
+        # pid por encima de pid_max: ese proceso no existe
+        foreign = self.write_foreign_job('nb', 10, host=jobs.HOSTNAME, pid=2 ** 31 - 1)
+        self.assertNotEqual(self.pool.submit('nb', 10, self.blocked), foreign)
+
+    def test_budget_is_shared_between_processes(self):
+        self.write_foreign_job('otra', 80)
+        with self.assertRaises(jobs.AdmissionError) as ctx:
+            self.pool.submit('nb', 50, self.blocked)
+        self.assertEqual((ctx.exception.retry_after, ctx.exception.in_flight), (7, 80))
+        self.pool.submit('nb', 20, self.blocked)
+
+    def test_budget_frees_when_a_job_ends(self):
+        first = self.pool.submit('a', 80, self.blocked)
+        with self.assertRaises(jobs.AdmissionError):
+            self.pool.submit('b', 50, self.blocked)
+        self.release.set()
+        self.wait(first)
+        self.pool.submit('b', 50, self.blocked)
+
+    def test_a_single_notebook_over_budget_is_admitted(self):
+        job_id = self.pool.submit('grande', 500, self.blocked)
+        self.release.set()
+        self.assertEqual(self.wait(job_id)['status'], jobs.DONE)
+
+    def test_failed_job_reports_its_error(self):
+        def broken(job):
+            raise ValueError('notebook rota')
+        state = self.wait(self.pool.submit('nb', 10, broken))
+        self.assertEqual((state['status'], state['error']), (jobs.ERROR, 'notebook rota'))
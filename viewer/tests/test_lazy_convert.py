@@ -0,0 +1,90 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from viewer import jobs, views
+
+
+class LazyConvertTests(SimpleTestCase):
+    """La primera visita a una notebook sin convertir no bloquea al worker."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.datasets = datasets = os.path.join(self.tmp.name, 'datasets')
+        notes = os.path.join(self.tmp.name, 'notebooks')
+        os.makedirs(datasets)
+        with open(os.path.join(datasets, 'lenta.ipynb'), 'w', encoding='utf-8') as f:
+            f.write('{"cells": []}')
+        self.release = threading.Event()
+        self.pool = jobs.JobPool(os.path.join(notes, jobs.STATUS_DIRNAME), max_workers=1)
+        for patcher in (mock.patch.object(views, 'DATASETS_DIR', datasets),
+                        mock.patch.object(views, 'TEMPLATES_NOTES_DIR', notes),
+                        mock.patch.object(views, 'job_pool', self.pool),
+                        mock.patch.object(views, '_convert_notebook', self.slow_convert)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.release.set()
+        # que el trabajo termine de escribir su estado antes de borrar la carpeta
+        if self.pool._executor is not None:
+            self.pool._executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    def slow_convert(self, job, full_path, base):
+        self.release.wait(10)
+
+    def test_missing_artifact_answers_202_at_once(self):
+        response = self.client.get('/notebook/lenta/')
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn('ETag', response)
+        self.assertIn('no-store', response['Cache-Control'])
+        body = response.content.decode()
+        self.assertIn('/api/jobs/', body)
+
+        status_url = body.split("const statusUrl = '")[1].split("'")[0]
+        self.assertIn(self.client.get(status_url).json()['status'], (jobs.QUEUED, jobs.RUNNING))
+
+        # una segunda visita comparte el trabajo en curso
+        again = self.client.get('/notebook/lenta/')
+        self.assertEqual(again.status_code, 202)
+        self.assertIn(status_url, again.content.decode())
+
+    def wait_for(self, status_url):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            state = self.client.get(status_url).json()
+            if state['status'] in (jobs.DONE, jobs.ERROR):
+                return state
+            time.sleep(0.02)
+        self.fail('la conversión no terminó')
+
+    def test_failed_conversion_is_remembered_until_the_source_changes(self):
+        with mock.patch.object(views, '_convert_notebook', side_effect=ValueError('notebook rota')) as convert:
+            first = self.client.get('/notebook/lenta/')
+            self.assertEqual(first.status_code, 202)
+            status_url = first.content.decode().split("const statusUrl = '")[1].split("'")[0]
+            self.assertEqual(self.wait_for(status_url)['status'], jobs.ERROR)
+
+            # ni un trabajo nuevo ni otra página que espera
+            for _ in range(2):
+                with self.assertLogs('django.request', 'ERROR'):
+                    failed = self.client.get('/notebook/lenta/')
+                self.assertEqual(failed.status_code, 500)
+                self.assertIn('notebook rota', failed.content.decode())
+                self.assertNotIn('statusUrl', failed.content.decode())
+            self.assertEqual(convert.call_count, 1)
+
+            with open(os.path.join(self.datasets, 'lenta.ipynb'), 'w', encoding='utf-8') as f:
+                f.write('{"cells": [], "metadata": {}}')
+            retry = self.client.get('/notebook/lenta/')
+            self.assertEqual(retry.status_code, 202)
+            self.wait_for(retry.content.decode().split("const statusUrl = '")[1].split("'")[0])
+            self.assertEqual(convert.call_count, 2)
+
+    def test_unknown_notebook_is_404(self):
+        self.assertEqual(self.client.get('/notebook/otra/').status_code, 404)
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from viewer import views
+from viewer.listing import FolderListing
+
+
+def write_notebook(path, cells, mtime_ns):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'cells': [{'cell_type': 'code', 'outputs': []}] * cells}, f)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class ListFilesConditionalTests(SimpleTestCase):
+    """El ETag de /api/list-files/ sigue a los archivos, no solo a la carpeta."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+        self.nb = os.path.join(self.folder, 'a.ipynb')
+        write_notebook(self.nb, 1, 1_000_000_000_000_000_000)
+        self.dir_mtime = os.stat(self.folder).st_mtime_ns
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def get(self, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get('/api/list-files/', {'folder_path': self.folder, **params}, **headers)
+
+    def rewrite_in_place(self, cells):
+        write_notebook(self.nb, cells, 1_000_000_002_000_000_000)
+        # como un guardado en el sitio: la carpeta conserva su mtime
+        os.utime(self.folder, ns=(self.dir_mtime, self.dir_mtime))
+
+    def test_rewritten_file_changes_etag(self):
+        # como si ya hubiera pasado verify_interval desde la última comprobación
+        patcher = mock.patch.object(views.folder_listing, 'verify_interval', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get(first['ETag']).status_code, 304)
+
+        self.rewrite_in_place(cells=3)
+        second = self.get(first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        [entry] = second.json()['files']
+        self.assertEqual(entry['size'], os.path.getsize(self.nb))
+        self.assertEqual(entry['cells'], 3)
+
+    def test_refresh_applies_with_if_none_match(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(etag, refresh='1').status_code, 304)
+        self.rewrite_in_place(cells=2)
+        response = self.get(etag, refresh='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['files'][0]['cells'], 2)
+
+    def test_converted_only_for_the_same_source(self):
+        other = os.path.join(self.folder, 'otra')
+        os.makedirs(other)
+        elsewhere = os.path.join(other, 'a.ipynb')
+        write_notebook(elsewhere, 1, 1_000_000_000_000_000_000)
+        catalog = [{'slug': 'a', 'source': elsewhere}]
+        with mock.patch.object(views, '_catalog_entries', lambda: catalog):
+            files = self.get(recursive='1').json()['files']
+            self.assertEqual({f['relpath']: f['converted'] for f in files},
+                             {'a.ipynb': False, 'otra/a.ipynb': True})
+            # abrirla pisaría las salidas de la otra notebook
+            response = self.client.post('/api/open-notebook/', {'file_path': self.nb})
+            self.assertEqual(response.status_code, 409)
+            self.assertFalse(response.json()['success'])
+
+    def test_errors_have_no_etag(self):
+        response = self.get(cursor='!!')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('ETag'))
+
+
+class FolderListingTests(SimpleTestCase):
+
+    def test_cached_listing_is_reused_while_files_are_unchanged(self):
+        with tempfile.TemporaryDirectory() as folder:
+            write_notebook(os.path.join(folder, 'a.ipynb'), 1, 1_000_000_000_000_000_000)
+            listing = FolderListing()
+            first = listing.signature(folder)
+            self.assertEqual(listing.signature(folder), first)
+            self.assertEqual((listing.hits, listing.misses), (1, 1))
+
+    def test_signature_stats_only_folders_between_checks(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for i in range(5):
+                write_notebook(os.path.join(folder, f'{i}.ipynb'), 1, 1_000_000_000_000_000_000)
+            listing = FolderListing(verify_interval=60)
+            listing.signature(folder)
+            with mock.patch('viewer.listing.os.stat', wraps=os.stat) as stat:
+                listing.signature(folder)
+            self.assertEqual(stat.call_count, 1)
@@ -0,0 +1,87 @@
+import re
+import tempfile
+
+from django.test import SimpleTestCase
+
+from viewer import metrics
+
+# <nombre>{<etiquetas>} <valor>, según el formato de texto de Prometheus 0.0.4
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? '
+                       r'([-+]?(?:[0-9.]+(?:[eE][-+]?[0-9]+)?|Inf|NaN))$')
+TYPE_RE = re.compile(r'^# TYPE ([a-zA-Z_:][a-zA-Z0-9_:]*) (counter|gauge|histogram|summary|untyped)$')
+HISTOGRAM_SUFFIXES = ('_bucket', '_sum', '_count')
+
+
+def parse(text):
+    """``{familia: tipo}`` y muestras ``(nombre, etiquetas, valor)``; falla si
+    alguna línea no es del formato o una muestra no tiene su ``# TYPE`` antes."""
+    types = {}
+    samples = []
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            continue
+        m = TYPE_RE.match(line)
+        if m:
+            if m.group(1) in types:
+                raise AssertionError(f'TYPE repetido: {line}')
+            types[m.group(1)] = m.group(2)
+            continue
+        m = SAMPLE_RE.match(line)
+        if not m:
+            raise AssertionError(f'línea inválida: {line!r}')
+        name, labels, value = m.groups()
+        family = name
+        for suffix in HISTOGRAM_SUFFIXES:
+            if name.endswith(suffix) and types.get(name[:-len(suffix)]) == 'histogram':
+                family = name[:-len(suffix)]
+        if family not in types:
+            raise AssertionError(f'muestra sin TYPE: {line}')
+        samples.append((name, labels or '', float(value.replace('Inf', 'inf'))))
+    return types, samples
+
+
+class MetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        metrics.reset()
+        # una vista con fases que no escribe nada en el proyecto
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def list_files(self):
+        return self.client.get('/api/list-files/', {'folder_path': self.tmp.name})
+
+    def test_responses_carry_server_timing(self):
+        response = self.list_files()
+        timing = response['Server-Timing']
+        entries = [part.strip() for part in timing.split(',')]
+        self.assertIn('listing', [entry.split(';')[0] for entry in entries])
+        self.assertTrue(entries[-1].startswith('total;dur='))
+        for entry in entries:
+            self.assertRegex(entry, r'^[a-z_]+;dur=\d+\.\d{3}$')
+
+    def test_metrics_is_valid_prometheus_text(self):
+        self.list_files()
+        for url in ('/metrics', '/metrics/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+            types, samples = parse(response.content.decode('utf-8'))
+        self.assertEqual(types['http_request_duration_seconds'], 'histogram')
+        self.assertEqual(types['http_requests_total'], 'counter')
+
+        # buckets acumulados y +Inf igual a _count, por serie
+        buckets = {}
+        counts = {}
+        for name, labels, value in samples:
+            if name == 'http_request_duration_seconds_bucket':
+                series = re.sub(r',?le="[^"]*"', '', labels)
+                buckets.setdefault(series, []).append((labels, value))
+            elif name == 'http_request_duration_seconds_count':
+                counts[labels] = value
+        self.assertIn('{view="list_files",', ''.join(buckets))
+        for series, values in buckets.items():
+            cumulative = [v for _, v in values]
+            self.assertEqual(cumulative, sorted(cumulative))
+            self.assertIn('le="+Inf"', values[-1][0])
+            self.assertEqual(values[-1][1], counts[series])
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from benchmarks.synthetic import make_notebook
+from viewer import nbstream
+
+# Salida de texto más grande de la notebook generada (caracteres)
+TEXT_SIZE = 256 * 1024
+# Cota del pico: texto crudo + decodificado + lista de líneas, más una holgura
+# fija (buffers de lectura, objetos del intérprete)
+PEAK_LIMIT = 4 * TEXT_SIZE + 1024 * 1024
+
+
+class StreamingMemoryTests(unittest.TestCase):
+    """El pico de memoria depende de la salida no-imagen más grande, no del archivo."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'big.ipynb')
+        nb = make_notebook(cells=12, text_size=1000, images=12, image_size=(600, 600))
+        nb['cells'][1]['outputs'][0]['text'] = ['y' * 99 + '\n'] * (TEXT_SIZE // 100)
+        with open(cls.path, 'w', encoding='utf-8') as f:
+            json.dump(nb, f)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_peak_is_bounded_by_largest_output(self):
+        out_dir = os.path.join(self.tmp.name, 'out')
+        file_size = os.path.getsize(self.path)
+        # la cota solo demuestra algo si el archivo es bastante mayor
+        self.assertGreater(file_size, 4 * PEAK_LIMIT)
+
+        images = 0
+        tracemalloc.start()
+        try:
+            for _, kind, value in nbstream.iter_notebook(self.path, spool_dir=out_dir):
+                if kind == 'output':
+                    for image in value.get('data', {}).values():
+                        if isinstance(image, nbstream.StreamedImage):
+                            images += 1
+                            image.save(os.path.join(out_dir, f'img_{images}.png'))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(images, 12)
+        self.assertLess(peak, PEAK_LIMIT,
+                        f'pico {peak / 1e6:.2f} MB con un archivo de {file_size / 1e6:.1f} MB')
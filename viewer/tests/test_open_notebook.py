@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from viewer import jobs, views
+
+
+def notebook(text):
+    return {
+        'nbformat': 4, 'nbformat_minor': 5, 'metadata': {},
+        'cells': [
+            {'cell_type': 'markdown', 'metadata': {}, 'source': '# Ventas\n\nResumen'},
+            {'cell_type': 'code', 'metadata': {}, 'execution_count': 1, 'source': 'print(x)', 'outputs': [
+                {'output_type': 'stream', 'name': 'stdout', 'text': text},
+            ]},
+        ],
+    }
+
+
+class ReconvertTests(SimpleTestCase):
+    """Convertir, servir, reconvertir: la caché en memoria no sirve la versión vieja."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        datasets = os.path.join(self.tmp.name, 'datasets')
+        notes = os.path.join(self.tmp.name, 'notebooks')
+        os.makedirs(datasets)
+        self.source = os.path.join(datasets, 'ventas.ipynb')
+        self.pool = jobs.JobPool(os.path.join(notes, jobs.STATUS_DIRNAME), max_workers=1)
+        for name, value in (('DATASETS_DIR', datasets), ('TEMPLATES_NOTES_DIR', notes),
+                            ('STATIC_NOTES_DIR', os.path.join(self.tmp.name, 'static')),
+                            ('job_pool', self.pool)):
+            patcher = mock.patch.object(views, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(views.notebook_cache.clear)
+        self.addCleanup(views.page_cache.clear)
+
+    def tearDown(self):
+        if self.pool._executor is not None:
+            self.pool._executor.shutdown(wait=True)
+        self.tmp.cleanup()
+
+    def convert(self, text):
+        with open(self.source, 'w', encoding='utf-8') as f:
+            json.dump(notebook(text), f)
+        response = self.client.post('/api/open-notebook/', {'file_path': self.source})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            state = self.client.get(status_url).json()
+            if state['status'] in (jobs.DONE, jobs.ERROR):
+                break
+            time.sleep(0.02)
+        self.assertEqual(state['status'], jobs.DONE, state.get('error'))
+        self.assertEqual(state['progress']['url'], '/notebook/ventas/')
+
+    def outputs(self):
+        response = self.client.get('/api/notebook/ventas/items/')
+        self.assertEqual(response.status_code, 200)
+        return response, [it['content'] for it in response.json()['items'] if it['type'] == 'text']
+
+    def test_reconverted_notebook_is_served(self):
+        self.convert('primera versión\n')
+        first, texts = self.outputs()
+        self.assertEqual(texts, ['primera versión\n'])
+        self.assertIn('primera versión', self.client.get('/notebook/ventas/').content.decode())
+
+        self.convert('segunda versión, más larga\n')
+        second, texts = self.outputs()
+        self.assertEqual(texts, ['segunda versión, más larga\n'])
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        page = self.client.get('/notebook/ventas/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(page.status_code, 200)
+        self.assertIn('segunda versión', page.content.decode())
+        self.assertNotIn('primera versión', page.content.decode())
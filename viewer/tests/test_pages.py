@@ -0,0 +1,83 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from viewer import pages, storage, views
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class ChooseEncodingTests(unittest.TestCase):
+    """Negociación de ``Accept-Encoding`` entre las variantes guardadas."""
+
+    ALL = {'identity': b'', 'gzip': b'', 'br': b''}
+
+    def test_prefers_brotli_then_gzip(self):
+        self.assertEqual(pages.choose_encoding('gzip, deflate, br', self.ALL), 'br')
+        self.assertEqual(pages.choose_encoding('gzip', self.ALL), 'gzip')
+        self.assertEqual(pages.choose_encoding('gzip, br', {'identity': b'', 'gzip': b''}), 'gzip')
+
+    def test_q_values(self):
+        self.assertEqual(pages.choose_encoding('br;q=0, gzip;q=0.5', self.ALL), 'gzip')
+        self.assertEqual(pages.choose_encoding('br;q=0, gzip;q=0', self.ALL), 'identity')
+        self.assertEqual(pages.choose_encoding('*', self.ALL), 'br')
+        self.assertEqual(pages.choose_encoding('*;q=0, gzip', self.ALL), 'gzip')
+        self.assertEqual(pages.choose_encoding('br;q=0, *', self.ALL), 'gzip')
+
+    def test_missing_or_unknown_header_is_identity(self):
+        self.assertEqual(pages.choose_encoding(None, self.ALL), 'identity')
+        self.assertEqual(pages.choose_encoding('', self.ALL), 'identity')
+        self.assertEqual(pages.choose_encoding('deflate, compress', self.ALL), 'identity')
+        self.assertEqual(pages.choose_encoding('gzip;q=x, br;;', self.ALL), 'identity')
+
+
+class PrecompressedPageTests(SimpleTestCase):
+    """La página se guarda comprimida una vez y se envía tal cual."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(views, 'TEMPLATES_NOTES_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(views.notebook_cache.clear)
+        self.addCleanup(views.page_cache.clear)
+        storage.write_items(self.tmp.name, 'nb', [{'type': 'text', 'content': 'hola ' * 2000}])
+
+    def get(self, accept):
+        return self.client.get('/notebook/nb/', HTTP_ACCEPT_ENCODING=accept)
+
+    def test_round_trip(self):
+        directory = os.path.join(self.tmp.name, 'pagina')
+        pages.write_page(directory, '<p>ñ</p>', (1, 2), 'v1')
+        page = pages.load_page(pages.meta_path(directory))
+        self.assertEqual((page['source'], page['render']), ((1, 2), 'v1'))
+        self.assertEqual(page['bodies']['identity'], '<p>ñ</p>'.encode('utf-8'))
+        self.assertEqual(gzip.decompress(page['bodies']['gzip']), page['bodies']['identity'])
+
+    def test_variants_decode_to_the_same_page(self):
+        plain = self.get('')
+        self.assertEqual(plain.status_code, 200)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        gz = self.get('gzip')
+        self.assertEqual(gz['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gz.content), plain.content)
+        self.assertLess(len(gz.content), len(plain.content))
+        if brotli is not None:
+            br = self.get('gzip, br')
+            self.assertEqual(br['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(br.content), plain.content)
+
+    def test_page_is_baked_once(self):
+        self.get('gzip')
+        with mock.patch.object(views, '_render_notebook_page', side_effect=AssertionError('no debe renderizar')):
+            self.assertEqual(self.get('gzip').status_code, 200)
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from viewer import compiled, search
+
+
+class SearchPositionTests(unittest.TestCase):
+    """Los resultados se numeran como los items que sirve el visor."""
+
+    ITEMS = [
+        {'type': 'markdown', 'content': '# Título\n\nResumen con la palabra iris.'},
+        {'type': 'text', 'content': 'accuracy 0.95'},
+        {'type': 'markdown', 'content': '## Modelo\n\nRegresión logística sobre iris.'},
+    ]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        directory = os.path.join(self.tmp.name, 'nb')
+        os.makedirs(directory)
+        search.write_segment(directory, self.ITEMS)
+        self.index = search.SearchIndex(self.tmp.name)
+        self.index.refresh(['nb'])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_item_is_position_in_compiled_items(self):
+        shown = compiled.compile_items(self.ITEMS, 'nb', (0, 0))['items']
+        for query in ('accuracy', 'logistica'):
+            [result] = self.index.search(query)
+            self.assertIn(query, search.normalize(search.item_text(shown[result['item']])))
+
+    def test_summary_match_has_no_item(self):
+        results = {r['item'] for r in self.index.search('iris')}
+        self.assertEqual(results, {None, 1})
+
+    def test_old_segment_version_is_rebuilt(self):
+        directory = os.path.join(self.tmp.name, 'nb')
+        with open(os.path.join(directory, search.SEGMENT_NAME), 'w') as f:
+            f.write('{"version": 1, "lengths": [], "postings": {}}')
+        index = search.SearchIndex(self.tmp.name)
+        index.refresh(['nb'], build=lambda slug: search.write_segment(directory, self.ITEMS))
+        self.assertEqual(len(index.search('accuracy')), 1)
+
+
+class LazySegmentTests(unittest.TestCase):
+    """En memoria solo el vocabulario; las apariciones se leen al buscar."""
+
+    NOTEBOOKS = {
+        'iris': [{'type': 'text', 'content': 'regresión logística sobre iris'},
+                 {'type': 'text', 'content': 'accuracy 0.95 ' + 'iris ' * 200}],
+        'titanic': [{'type': 'text', 'content': 'supervivientes del titanic'},
+                    {'type': 'text', 'content': 'regresión lineal de la edad'}],
+    }
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for slug, items in self.NOTEBOOKS.items():
+            self.write(slug, items)
+        patcher = mock.patch.object(search, '_load_json', wraps=search._load_json)
+        self.load = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, slug, items):
+        directory = os.path.join(self.tmp.name, slug)
+        os.makedirs(directory, exist_ok=True)
+        search.write_segment(directory, items)
+
+    def index(self, **kwargs):
+        index = search.SearchIndex(self.tmp.name, **kwargs)
+        index.refresh(list(self.NOTEBOOKS))
+        return index
+
+    def read(self):
+        """Archivos leídos desde la última llamada, como ``slug/nombre``."""
+        paths = {os.path.relpath(call.args[0], self.tmp.name) for call in self.load.call_args_list}
+        self.load.reset_mock()
+        return paths
+
+    def test_only_notebooks_with_every_term_are_read(self):
+        index = self.index()
+        self.assertEqual(self.read(), {'iris/search.json', 'titanic/search.json'})
+        self.assertEqual(index.cache.stats()['entries'], 0)
+
+        [result] = index.search('titanic')
+        self.assertEqual(result['slug'], 'titanic')
+        self.assertEqual(self.read(), {'titanic/postings.json', 'titanic/snippets.json'})
+        self.assertEqual(index.search('titanic'), [result])
+        self.assertEqual(self.read(), set())
+
+        self.assertEqual(index.search('titanic iris'), [])
+        self.assertEqual(self.read(), set())
+        self.assertEqual(index.search('nada'), [])
+
+    def test_prefix_reads_only_the_notebooks_that_have_it(self):
+        index = self.index()
+        self.read()
+        self.assertEqual({r['slug'] for r in index.search('logis*')}, {'iris'})
+        self.assertEqual(self.read(), {'iris/postings.json', 'iris/snippets.json'})
+        self.assertEqual({(r['slug'], r['item']) for r in index.search('regres*')}, {('iris', 0), ('titanic', 1)})
+
+    def test_memory_is_bounded_by_the_cache(self):
+        unbounded = self.index()
+        expected = {q: unbounded.search(q) for q in ('iris', 'titanic', 'regresion', 'accuracy')}
+        small = self.index(max_bytes=unbounded.cache.stats()['bytes'] // 2)
+        for _ in range(2):
+            for query, results in expected.items():
+                self.assertEqual(small.search(query), results)
+        st = small.cache.stats()
+        self.assertLessEqual(st['bytes'], st['max_bytes'])
+        self.assertGreater(st['evictions'], 0)
+
+    def test_reconverted_notebook(self):
+        index = self.index()
+        self.assertEqual(len(index.search('titanic')), 1)
+        self.write('titanic', [{'type': 'text', 'content': 'pasajeros del barco'}])
+        # apariciones nuevas con el vocabulario viejo: la notebook no cuenta todavía
+        self.assertEqual(index.search('titanic'), [])
+        index.refresh(list(self.NOTEBOOKS), source=object())
+        self.assertEqual(index.search('titanic'), [])
+        self.assertEqual([r['snippet'] for r in index.search('barco')], ['pasajeros del barco'])
+        index.refresh(['iris'], source=object())
+        self.assertEqual(index.search('barco'), [])
+        self.assertEqual(index.stats()['notebooks'], 1)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from viewer import storage
+
+ITEMS = [
+    {'type': 'markdown', 'content': '# Título con ñ'},
+    {'type': 'text', 'content': 'x' * 5000},
+    {'type': 'image', 'content': '/static/notebooks/objects/ab/ab.png', 'width': 10, 'height': 5},
+]
+
+
+class ContainerTests(unittest.TestCase):
+    """El contenedor ``.nbc`` guarda lo mismo que el JSON y se lee por índice."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.notes = self.tmp.name
+
+    def test_round_trip_matches_json(self):
+        json_path = storage.write_items(self.notes, 'a', ITEMS, 'json')
+        nbc_path = storage.write_items(self.notes, 'b', ITEMS, 'nbc')
+        self.assertEqual(storage.load_items(json_path), ITEMS)
+        self.assertEqual(storage.load_items(nbc_path), ITEMS)
+        self.assertEqual(storage.count_items(nbc_path), 3)
+        # sin comprimir también se lee igual
+        storage.write_items(self.notes, 'c', ITEMS, 'nbc', compress=False)
+        self.assertEqual(storage.load_items(os.path.join(self.notes, 'c.nbc')), ITEMS)
+        self.assertLess(os.path.getsize(nbc_path), os.path.getsize(os.path.join(self.notes, 'c.nbc')))
+
+    def test_indexed_access_decodes_only_that_item(self):
+        path = storage.write_items(self.notes, 'nb', ITEMS, 'nbc')
+        with storage.open_items(path) as items:
+            self.assertEqual(len(items), 3)
+            with mock.patch.object(storage.json, 'loads', wraps=storage.json.loads) as loads:
+                self.assertEqual(items[2], ITEMS[2])
+                self.assertEqual(items[-1], ITEMS[2])
+                self.assertEqual(items[0:2], ITEMS[:2])
+            self.assertEqual(loads.call_count, 4)
+            with self.assertRaises(IndexError):
+                items[3]
+
+    def test_writing_one_format_removes_the_other(self):
+        storage.write_items(self.notes, 'nb', ITEMS, 'json')
+        storage.write_items(self.notes, 'nb', ITEMS[:1], 'nbc')
+        self.assertEqual(os.listdir(self.notes), ['nb.nbc'])
+        self.assertEqual(storage.artifact_path(self.notes, 'nb'), os.path.join(self.notes, 'nb.nbc'))
+        self.assertEqual(storage.load_items(storage.artifact_path(self.notes, 'nb')), ITEMS[:1])
+        storage.write_items(self.notes, 'nb', ITEMS, 'json')
+        self.assertEqual(os.listdir(self.notes), ['nb.json'])
+
+    def test_invalid_container_is_value_error(self):
+        path = os.path.join(self.notes, 'roto.nbc')
+        with open(path, 'wb') as f:
+            f.write(b'NBC1' + b'\x01\x00\x00\x00' + b'\xff\xff\x00\x00')
+        with self.assertRaises(ValueError):
+            storage.open_items(path)
+        with open(path, 'wb') as f:
+            f.write(b'XXXX' + b'\x00' * 20)
+        with self.assertRaises(ValueError):
+            storage.open_items(path)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from viewer import previews, tables, views
+
+HTML = """<table border="1" class="dataframe">
+  <thead>
+    <tr style="text-align: right;"><th></th><th>nombre</th><th>edad</th></tr>
+  </thead>
+  <tbody>
+    <tr><th>0</th><td>ana</td><td>30</td></tr>
+    <tr><th>1</th><td>Beto</td><td>NaN</td></tr>
+    <tr><th>2</th><td>carla</td><td>7</td></tr>
+  </tbody>
+</table>
+<p>3 rows × 2 columns</p>"""
+
+
+class TableItemTests(unittest.TestCase):
+    """Las tablas grandes de pandas se guardan por columnas."""
+
+    def test_large_table_becomes_a_table_item(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(tables.table_item(HTML, tmp, 1, threshold=len(HTML.encode()) + 1))
+            item = tables.table_item(HTML, tmp, 1, threshold=10)
+            self.assertEqual(item['blob'], 'table_1.json')
+            self.assertEqual(item['columns'], ['', 'nombre', 'edad'])
+            # NaN es un ausente: la columna sigue siendo entera
+            self.assertEqual(item['dtypes'], ['int', 'str', 'int'])
+            self.assertEqual((item['rows'], item['index_columns']), (3, 1))
+            self.assertEqual(item['caption'], '3 rows × 2 columns')
+            table = tables.load_table(os.path.join(tmp, 'table_1.json'))
+            self.assertEqual(tables.rows(table, 1, 1), [['1', 'Beto', 'NaN']])
+
+    def test_html_that_is_not_a_plain_table_is_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(tables.table_item('<div>' + 'x' * 100 + '</div>', tmp, 1, threshold=10))
+            self.assertEqual(os.listdir(tmp), [])
+
+
+class NotebookTableTests(SimpleTestCase):
+    """``/api/notebook/<slug>/table/<archivo>/`` pagina y ordena en el servidor."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(views, 'TEMPLATES_NOTES_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(views.table_cache.clear)
+        directory = previews.blob_dir(self.tmp.name, 'nb')
+        os.makedirs(directory)
+        tables.write_table(directory, 'table_1.json', ['', 'nombre', 'edad'], ['int', 'str', 'float'], [
+            [str(i) for i in range(5)],
+            ['ana', 'Beto', 'carla', 'dora', 'Eva'],
+            ['30', 'NaN', '7', '12.5', '30'],
+        ])
+        self.url = '/api/notebook/nb/table/table_1.json/'
+
+    def get(self, **params):
+        return self.client.get(self.url, params)
+
+    def test_pages(self):
+        data = self.get(offset=0, limit=2).json()
+        self.assertEqual((data['count'], data['total'], data['next_offset']), (2, 5, 2))
+        self.assertEqual(data['rows'], [['0', 'ana', '30'], ['1', 'Beto', 'NaN']])
+        last = self.get(offset=4, limit=2).json()
+        self.assertEqual((last['rows'], last['next_offset']), ([['4', 'Eva', '30']], None))
+        self.assertEqual(self.get(offset=10).json()['rows'], [])
+        # limit se acota a [1, 500]
+        self.assertEqual(self.get(limit=0).json()['count'], 1)
+
+    def test_sorts_numbers_and_text_with_missing_last(self):
+        asc = self.get(sort=2).json()
+        self.assertEqual([r[2] for r in asc['rows']], ['7', '12.5', '30', '30', 'NaN'])
+        self.assertEqual(asc['order'], 'asc')
+        desc = self.get(sort=2, order='desc').json()
+        self.assertEqual([r[2] for r in desc['rows']], ['30', '30', '12.5', '7', 'NaN'])
+        names = self.get(sort=1, order='desc', limit=2).json()
+        self.assertEqual([r[1] for r in names['rows']], ['Eva', 'dora'])
+        page = self.get(sort=1, offset=1, limit=2).json()
+        self.assertEqual([r[1] for r in page['rows']], ['Beto', 'carla'])
+
+    def test_bad_parameters_are_400(self):
+        for params in ({'offset': 'x'}, {'sort': 'a'}, {'sort': 3}, {'sort': -1}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.has_header('ETag'))
+
+    def test_unknown_table_is_404(self):
+        self.assertEqual(self.client.get('/api/notebook/nb/table/table_2.json/').status_code, 404)
+        self.assertEqual(self.client.get('/api/notebook/otra/table/table_1.json/').status_code, 404)
+        self.assertEqual(self.client.get('/api/notebook/nb/table/datos.json/').status_code, 404)
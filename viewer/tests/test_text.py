@@ -0,0 +1,70 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from viewer import previews, views
+
+TEXT = ''.join(f'línea {i:05d}\n' for i in range(3000))
+
+
+class TextPreviewTests(SimpleTestCase):
+    """Salidas largas: principio y final en el item y el texto completo aparte."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(views, 'TEMPLATES_NOTES_DIR', self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.directory = previews.blob_dir(self.tmp.name, 'nb')
+        self.item = previews.text_item(TEXT, self.directory, 1, threshold=1000)
+        self.data = TEXT.encode('utf-8')
+        self.url = f'/api/notebook/nb/text/{self.item["blob"]}/'
+
+    def test_short_text_stays_inline(self):
+        self.assertEqual(previews.text_item('corto', self.directory, 2, threshold=1000),
+                         {'type': 'text', 'content': 'corto'})
+
+    def test_long_text_keeps_head_and_tail(self):
+        item = self.item
+        self.assertTrue(TEXT.startswith(item['content']))
+        self.assertTrue(TEXT.endswith(item['tail']))
+        self.assertEqual(item['size'], len(self.data))
+        self.assertEqual(len(item['content']) + item['omitted'] + len(item['tail']), len(TEXT))
+        # se corta en saltos de línea
+        self.assertTrue(item['content'].endswith('\n'))
+        self.assertTrue(item['tail'].startswith('línea'))
+
+    def test_full_text(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+
+    def test_byte_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(response.content, self.data[100:200])
+
+    def test_open_and_suffix_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.data) - 10}-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.data[-10:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-25')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.data[-25:])
+        # un final más allá del tamaño se recorta
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes=0-{len(self.data) * 2}')
+        self.assertEqual(response.content, self.data)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_unknown_blob_is_404(self):
+        self.assertEqual(self.client.get('/api/notebook/nb/text/text_9.txt/').status_code, 404)
+        self.assertEqual(self.client.get('/api/notebook/nb/text/..%2Fmodel.json/').status_code, 404)
@@ -0,0 +1,92 @@
+import base64
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import convert_notebooks as cn
+import transform_notebooks
+from benchmarks.synthetic import make_html_table, make_png
+from viewer import transforms
+
+SECRET = b'example.com'
+
+
+def emails(n):
+    return ''.join(f'user{i}@example.com\n' for i in range(n))
+
+
+def make_notebook():
+    table = make_html_table(400, 4).replace('<td>0.', '<td>owner@example.com 0.', 50)
+    png = base64.b64encode(make_png(64, 48)).decode('ascii')
+    return {
+        'nbformat': 4, 'nbformat_minor': 5, 'metadata': {},
+        'cells': [
+            {'cell_type': 'markdown', 'metadata': {}, 'source': '# Título\n\nContacto: ana@example.com'},
+            {'cell_type': 'code', 'metadata': {}, 'execution_count': 1, 'source': 'print(users)', 'outputs': [
+                {'output_type': 'stream', 'name': 'stdout', 'text': emails(2000)},
+                {'output_type': 'display_data', 'metadata': {}, 'data': {'text/html': table}},
+                {'output_type': 'display_data', 'metadata': {}, 'data': {'image/png': png}},
+            ]},
+        ],
+    }
+
+
+class PipelineOutputFilesTests(unittest.TestCase):
+    """Lo que quita o redacta el pipeline no queda en ningún archivo generado."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = Path(self.tmp.name) / 'datasets'
+        self.site = Path(self.tmp.name) / 'site'
+        self.source.mkdir()
+        with open(self.source / 'usuarios.ipynb', 'w', encoding='utf-8') as f:
+            json.dump(make_notebook(), f)
+
+    def tearDown(self):
+        cn.set_paths(cn.BASE_DIR / 'datasets', cn.BASE_DIR)
+        self.tmp.cleanup()
+
+    def convert(self, config=None):
+        if config is not None:
+            with open(self.source / transforms.CONFIG_NAME, 'w', encoding='utf-8') as f:
+                json.dump(config, f)
+        argv = ['--source', str(self.source), '--site', str(self.site), '--format', 'json']
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(cn.main(argv), 0)
+
+    def output_files(self):
+        # sin los bloqueos (.lock), que no son salidas
+        return [p for p in self.site.rglob('*') if p.is_file() and not p.name.endswith('.lock')]
+
+    def files_containing(self, needle):
+        return [p.relative_to(self.site).as_posix() for p in self.output_files() if needle in p.read_bytes()]
+
+    def test_conversion_without_pipeline_keeps_the_data(self):
+        self.convert()
+        found = self.files_containing(SECRET)
+        # sanidad: sin pipeline los datos sí están en los archivos aparte
+        self.assertIn('templates/notebooks/usuarios/text_1.txt', found)
+        self.assertIn('templates/notebooks/usuarios/table_1.json', found)
+
+    def test_redacted_text_is_in_no_output_file(self):
+        self.convert({'*': 'redact'})
+        self.assertTrue(os.path.exists(self.site / 'templates/notebooks/usuarios/text_1.txt'))
+        self.assertTrue(os.path.exists(self.site / 'templates/notebooks/usuarios/table_1.json'))
+        self.assertEqual(self.files_containing(SECRET), [])
+
+    def test_redact_after_conversion_rewrites_blobs(self):
+        self.convert()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(transform_notebooks.main(['redact', '--site', str(self.site), '--jobs', '1']), 0)
+        self.assertEqual(self.files_containing(SECRET), [])
+
+    def test_dropped_items_write_nothing(self):
+        self.convert({'*': 'drop:text,image'})
+        names = [p.name for p in self.output_files()]
+        self.assertFalse([n for n in names if n.startswith('text_')])
+        self.assertFalse([p for p in self.output_files() if 'objects' in p.parts])
+        self.assertFalse([p for p in (self.site / 'static').rglob('.img-*')])
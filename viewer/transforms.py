@@ -0,0 +1,248 @@
+"""Transformaciones de los items de una notebook, encadenadas en un pipeline.
+
+Cada transformación es un generador ``items -> items``: recibe el flujo de
+items y produce el flujo transformado, sin listas intermedias ni items
+guardados para después (la extracción cuenta con ello). Un pipeline encadena
+varias, así que cualquier combinación cuesta una sola pasada: la extracción
+(extraction.py) lo aplica al flujo de items según salen del extractor, y
+``transform_notebooks.py`` a notebooks ya convertidas con una lectura y una
+escritura por notebook.
+
+En los dos casos los items llegan *pendientes*, antes de escribir lo que va
+aparte: los textos con el texto completo en ``content`` y, en
+``transform_notebooks.py``, las tablas con sus celdas en ``_table``. Así lo
+que se redacta, recorta o quita tampoco queda en los textos completos, las
+tablas, las imágenes ni el índice de búsqueda.
+
+Un pipeline se escribe como ``paso|paso|...`` y cada paso como
+``nombre[:argumento]``::
+
+    drop:markdown,html      quita los items de esos tipos
+    keep:image,table        deja solo los items de esos tipos
+    truncate:2000           recorta las salidas de texto a 2000 caracteres
+                            (también el texto completo que va aparte)
+    minify                  minifica las salidas HTML (ver htmlmin.py)
+    redact[:regex]          sustituye correos, rutas de usuario y claves
+                            (o lo que case con ``regex``) por ``[redactado]``
+    head:50                 deja los 50 primeros items
+
+También se acepta una lista de pasos (útil si un argumento lleva ``|``).
+Para añadir una transformación basta con decorar su fábrica
+``(argumento) -> generador`` con ``transform``.
+
+El pipeline de cada notebook sale del ``transforms.json`` de su carpeta::
+
+    {"*": "drop:markdown", "05_*": "drop:markdown|truncate:4000"}
+
+Las claves son el nombre de la notebook sin ``.ipynb`` o un patrón
+(``fnmatch``); gana la clave exacta y, si no hay, el patrón más largo que case.
+Si ninguna casa se usa ``NOTEBOOK_TRANSFORMS`` (vacío por defecto).
+
+Este módulo no depende de Django.
+"""
+import fnmatch
+import json
+import os
+import re
+
+from . import htmlmin
+
+CONFIG_NAME = 'transforms.json'
+DEFAULT_SPEC = os.environ.get('NOTEBOOK_TRANSFORMS', '')
+
+# Fábricas por nombre: argumento (str o None) -> función generadora
+TRANSFORMS = {}
+
+REDACTED = '[redactado]'
+# Correos, carpetas de usuario y asignaciones de claves/tokens
+REDACT_RE = re.compile(
+    r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+'
+    r'|(?<=/home/)[^/\s]+|(?<=/Users/)[^/\s]+|(?<=\\Users\\)[^\\\s]+'
+    r'|(?i:(?<=api_key=)|(?<=api-key=)|(?<=token=)|(?<=secret=)|(?<=password=))[^\s&"\'<]+'
+)
+# Campos con texto de cada tipo de item
+TEXT_FIELDS = {'text': ('content', 'tail'), 'markdown': ('content',), 'html': ('content',),
+               'table': ('caption',)}
+
+
+def transform(name):
+    """Registra la fábrica de la transformación ``name``."""
+    def register(factory):
+        TRANSFORMS[name] = factory
+        return factory
+    return register
+
+
+def _types(arg, name):
+    kinds = {t.strip() for t in (arg or '').split(',') if t.strip()}
+    if not kinds:
+        raise ValueError(f'{name} necesita los tipos de item (p. ej. {name}:markdown)')
+    return kinds
+
+
+def _count(arg, name):
+    try:
+        n = int(arg)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} necesita un número (p. ej. {name}:100)') from None
+    if n < 0:
+        raise ValueError(f'{name} no admite números negativos')
+    return n
+
+
+@transform('drop')
+def drop(arg):
+    kinds = _types(arg, 'drop')
+
+    def step(items):
+        for it in items:
+            if it.get('type') not in kinds:
+                yield it
+    return step
+
+
+@transform('keep')
+def keep(arg):
+    kinds = _types(arg, 'keep')
+
+    def step(items):
+        for it in items:
+            if it.get('type') in kinds:
+                yield it
+    return step
+
+
+@transform('truncate')
+def truncate(arg):
+    limit = _count(arg, 'truncate')
+
+    def cut(text):
+        return text if len(text) <= limit else text[:limit] + '\n…'
+
+    def step(items):
+        for it in items:
+            if it.get('type') == 'text':
+                it = dict(it, content=cut(it.get('content') or ''))
+                if it.get('tail'):
+                    it['tail'] = cut(it['tail'])
+            yield it
+    return step
+
+
+@transform('minify')
+def minify(arg):
+    def step(items):
+        for it in items:
+            if it.get('type') == 'html' and it.get('content'):
+                it = dict(it)
+                # sin deduplicar <style>: eso lo hace la extracción, que ve
+                # qué salidas acaban siendo tablas
+                htmlmin.minify_item(it, set())
+            yield it
+    return step
+
+
+@transform('redact')
+def redact(arg):
+    try:
+        pattern = re.compile(arg) if arg else REDACT_RE
+    except re.error as e:
+        raise ValueError(f'redact: expresión regular no válida ({e})') from None
+
+    def sub(value):
+        return pattern.sub(REDACTED, value) if isinstance(value, str) else value
+
+    def step(items):
+        for it in items:
+            fields = [f for f in TEXT_FIELDS.get(it.get('type'), ()) if it.get(f)]
+            if fields:
+                it = dict(it)
+                for field in fields:
+                    it[field] = sub(it[field])
+            if it.get('_table'):
+                table = it['_table']
+                it = dict(it, columns=[sub(c) for c in it.get('columns') or ()], _table=dict(
+                    table, columns=[sub(c) for c in table['columns']],
+                    data=[[sub(v) for v in col] for col in table['data']]))
+            yield it
+    return step
+
+
+@transform('head')
+def head(arg):
+    limit = _count(arg, 'head')
+
+    def step(items):
+        for n, it in enumerate(items):
+            if n >= limit:
+                break
+            yield it
+    return step
+
+
+def parse(spec):
+    """Pasos normalizados (``['nombre:arg', ...]``) de un pipeline.
+
+    ``spec`` es ``'a|b:x'``, una lista de pasos o None. Lanza ValueError si
+    un paso no existe o su argumento no vale.
+    """
+    if not spec:
+        return []
+    parts = spec.split('|') if isinstance(spec, str) else list(spec)
+    steps = []
+    for part in parts:
+        name, sep, arg = str(part).strip().partition(':')
+        name = name.strip()
+        if not name:
+            continue
+        if name not in TRANSFORMS:
+            raise ValueError(f'transformación desconocida: {name!r} (hay {", ".join(sorted(TRANSFORMS))})')
+        TRANSFORMS[name](arg.strip() if sep else None)  # valida el argumento
+        steps.append(f'{name}:{arg.strip()}' if sep else name)
+    return steps
+
+
+def compose(spec):
+    """Función ``items -> items`` que encadena los pasos de ``spec``."""
+    funcs = []
+    for step in parse(spec):
+        name, sep, arg = step.partition(':')
+        funcs.append(TRANSFORMS[name](arg if sep else None))
+
+    def pipeline(items):
+        stream = iter(items)
+        for func in funcs:
+            stream = func(stream)
+        return stream
+    return pipeline
+
+
+def apply(spec, items):
+    """Items de ``items`` transformados por ``spec`` (un generador)."""
+    return compose(spec)(items)
+
+
+def load_config(directory):
+    """``{patrón: pipeline}`` del ``transforms.json`` de ``directory`` ({} si no hay)."""
+    try:
+        with open(os.path.join(directory, CONFIG_NAME), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if not isinstance(config, dict):
+        raise ValueError(f'{CONFIG_NAME} debe ser un objeto {{patrón: pipeline}}')
+    return config
+
+
+def spec_for(notebook_path):
+    """Pasos normalizados del pipeline que corresponde a ``notebook_path``."""
+    directory, fname = os.path.split(os.fspath(notebook_path))
+    stem = os.path.splitext(fname)[0]
+    config = load_config(directory or '.')
+    if stem in config:
+        return parse(config[stem])
+    matches = [pattern for pattern in config if fnmatch.fnmatch(stem, pattern)]
+    if matches:
+        # el patrón más largo es el más concreto: '05_*' antes que '*'
+        return parse(config[max(matches, key=len)])
+    return parse(DEFAULT_SPEC)
@@ -5,6 +5,15 @@ urlpatterns = [
     path('', views.dataset_loader, name='dataset_loader'),
     path('notebooks/', views.index, name='index'),
     path('notebook/<path:filename>/', views.notebook_view, name='notebook_view'),
+    path('api/notebook/<str:slug>/items/', views.notebook_items, name='notebook_items'),
+    path('api/notebook/<str:slug>/text/<str:name>/', views.notebook_text, name='notebook_text'),
+    path('api/notebook/<str:slug>/table/<str:name>/', views.notebook_table, name='notebook_table'),
+    path('static/notebooks/objects/<str:shard>/<str:name>', views.notebook_image, name='notebook_image'),
+    path('api/search/', views.search_notebooks, name='search_notebooks'),
     path('api/list-files/', views.list_files, name='list_files'),
     path('api/open-notebook/', views.open_notebook, name='open_notebook'),
+    path('api/jobs/<str:job_id>/', views.job_status, name='job_status'),
+    # con y sin barra: /metrics es la ruta que Prometheus usa por defecto
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
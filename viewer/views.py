@@ -1,22 +1,26 @@
 import os
+import re
 import json
-import html as _html
-import base64
-from django.http import Http404, JsonResponse
+import hashlib
+import logging
+import shutil
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
-from django.views.decorators.http import require_http_methods
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 
-try:
-    from nbformat import read as nb_read
-except ImportError:
-    nb_read = None
+from . import (catalog, compiled, extraction, images, jobs, listing, metrics, pages, previews, search, storage,
+               tables, transforms, watch)
+from .atomic import atomic_open
+from .cache import NotebookCache
 
-# Intentar importar markdown; si no está instalado, usar un fallback seguro
-try:
-    import markdown as md
-except Exception:
-    md = None
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TEMPLATES_NOTES_DIR = os.path.join(BASE_DIR, 'templates', 'notebooks')
@@ -27,77 +31,535 @@ DATASETS_DIR = os.path.join(BASE_DIR, 'datasets')
 if not os.path.exists(DATASETS_DIR):
     os.makedirs(DATASETS_DIR)
 
+# Modelos de vista ya decodificados (ver compiled.py) compartidos entre peticiones
+notebook_cache = NotebookCache(
+    max_entries=getattr(settings, 'NOTEBOOK_CACHE_MAX_ENTRIES', 32),
+    max_bytes=getattr(settings, 'NOTEBOOK_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+)
 
+# Páginas de detalle ya renderizadas y comprimidas (ver pages.py)
+page_cache = NotebookCache(max_entries=getattr(settings, 'NOTEBOOK_PAGE_CACHE_ENTRIES', 64))
+
+# Tablas grandes servidas por páginas de filas, con sus órdenes ya calculados
+# (ver tables.py)
+table_cache = NotebookCache(max_entries=getattr(settings, 'NOTEBOOK_TABLE_CACHE_ENTRIES', 16))
+
+# Carpetas listadas por /api/list-files/ (ver listing.py)
+folder_listing = listing.FolderListing()
+
+# Índice de búsqueda de todas las notebooks (ver search.py): el vocabulario
+# en memoria y las apariciones de las notebooks consultadas en esta caché
+search_cache = NotebookCache(max_entries=256,
+                             max_bytes=getattr(settings, 'NOTEBOOK_SEARCH_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+search_index = search.SearchIndex(TEMPLATES_NOTES_DIR, cache=search_cache)
+
+# Conversiones lanzadas desde /api/open-notebook/ (ver jobs.py)
+job_pool = jobs.JobPool(
+    os.path.join(TEMPLATES_NOTES_DIR, jobs.STATUS_DIRNAME),
+    max_workers=getattr(settings, 'NOTEBOOK_JOB_WORKERS', 2),
+    max_bytes=getattr(settings, 'NOTEBOOK_CONVERT_MAX_BYTES', 256 * 1024 * 1024),
+    retry_after=getattr(settings, 'NOTEBOOK_CONVERT_RETRY_AFTER', 5),
+)
+
+
+def _render_version():
+    """Huella de las plantillas y ajustes que intervienen en el render.
+
+    Entra en los ETag para que un despliegue con plantillas nuevas no sirva
+    304 de páginas generadas con las anteriores. Se calcula una vez por
+    proceso y es igual en todos los procesos de gunicorn.
+    """
+    h = hashlib.sha1()
+    templates_dir = os.path.join(BASE_DIR, 'templates')
+    for name in sorted(os.listdir(templates_dir)):
+        if name.endswith('.html'):
+            st = os.stat(os.path.join(templates_dir, name))
+            h.update(f'{name}:{st.st_mtime_ns}:{st.st_size};'.encode())
+    for key in ('NOTEBOOK_PAGE_SIZE', 'NOTEBOOK_PAGE_MAX_BYTES'):
+        h.update(f'{key}={getattr(settings, key, None)};'.encode())
+    h.update(f'compiled={compiled.COMPILED_VERSION};'.encode())
+    h.update(b'markdown' if compiled.md is not None else b'plain')
+    return h.hexdigest()[:12]
+
+
+RENDER_VERSION = _render_version()
+
+
+def _artifact_stat(request, path):
+    # Un único stat por petición, compartido por el ETag y Last-Modified
+    cache = request.__dict__.setdefault('_artifact_stats', {})
+    if path not in cache:
+        try:
+            cache[path] = os.stat(path)
+        except OSError:
+            cache[path] = None
+    return cache[path]
+
+
+def artifact_condition(path_func):
+    """GET condicional con validadores del archivo ``path_func(*args)``.
+
+    El ETag sale de ``(mtime_ns, size)`` del artefacto convertido más
+    ``RENDER_VERSION``; si coincide con If-None-Match (o no cambió desde
+    If-Modified-Since) se responde 304 sin leer la notebook ni renderizar.
+    Las respuestas llevan ``Cache-Control: no-cache`` para que el navegador
+    revalide siempre en lugar de usar una copia caducada; los errores van sin
+    validadores, para que no se guarden como la versión del artefacto.
+    """
+    def etag(request, *args, **kwargs):
+        st = _artifact_stat(request, path_func(*args, **kwargs))
+        if st is None:
+            return None
+        # Débil: el mismo validador cubre las versiones gzip/br/sin comprimir
+        return f'W/"{st.st_mtime_ns:x}-{st.st_size:x}-{RENDER_VERSION}"'
+
+    def last_modified(request, *args, **kwargs):
+        st = _artifact_stat(request, path_func(*args, **kwargs))
+        return datetime.fromtimestamp(st.st_mtime, timezone.utc) if st else None
+
+    def decorator(view):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            _strip_validators(response)
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _strip_validators(response):
+    """Quita ``ETag`` y ``Last-Modified`` de una respuesta de error."""
+    if response.status_code >= 400:
+        for header in ('ETag', 'Last-Modified'):
+            if response.has_header(header):
+                del response[header]
+    return response
+
+
+def _artifact_path(slug):
+    # <slug>.json o <slug>.nbc (ver storage.py)
+    return storage.artifact_path(TEMPLATES_NOTES_DIR, slug)
+
+
+# Respaldo cuando aún no hay .catalog.json: (firma del directorio, entradas)
+_scanned_catalog = (None, [])
+
+
+def _catalog_entries():
+    """Entradas del catálogo; en el caso normal cuesta un único ``stat``."""
+    global _scanned_catalog
+    try:
+        return notebook_cache.get(catalog.catalog_path(TEMPLATES_NOTES_DIR), catalog.load)
+    except (OSError, ValueError):
+        pass
+    # Sin catálogo (p. ej. antes de la primera conversión): recorrer el
+    # directorio, solo cuando cambia su contenido
+    try:
+        sig = NotebookCache.signature(TEMPLATES_NOTES_DIR)
+    except OSError:
+        return []
+    if _scanned_catalog[0] != sig:
+        _scanned_catalog = (sig, catalog.scan(TEMPLATES_NOTES_DIR, STATIC_NOTES_DIR))
+    return _scanned_catalog[1]
+
+
+@artifact_condition(lambda: catalog.catalog_path(TEMPLATES_NOTES_DIR))
 def index(request):
-    files = []
-    if os.path.isdir(TEMPLATES_NOTES_DIR):
-        for fname in sorted(os.listdir(TEMPLATES_NOTES_DIR)):
-            if fname.lower().endswith('.json'):
-                base = os.path.splitext(fname)[0]
-                if any(base.startswith(prefix) for prefix in ('05_', '06_', '07_', '08_', '09_', '10_')):
-                    thumb = None
-                    static_dir = os.path.join(STATIC_NOTES_DIR, base)
-                    if os.path.isdir(static_dir):
-                        for f in sorted(os.listdir(static_dir)):
-                            if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.svg')):
-                                thumb = f'/static/notebooks/{base}/{f}'
-                                break
-                    title = base.replace('_', ' ')
-                    files.append({'base': base, 'title': title, 'thumb': thumb})
-    return render(request, 'index.html', {'files': files})
+    with metrics.phase('catalog'):
+        files = _catalog_entries()
+    with metrics.phase('render'):
+        return render(request, 'index.html', {'files': files})
+
+
+def _load_notebook(path):
+    """Modelo compilado de una notebook convertida (cargador de la caché).
+
+    Lo normal es que la conversión ya lo haya generado (ver compiled.py); si
+    falta o es de otra versión se compila ahora y se guarda para los demás
+    procesos.
+    """
+    st = os.stat(path)
+    source = (st.st_mtime_ns, st.st_size)
+    slug = storage.slug_of(path)
+    directory = previews.blob_dir(os.path.dirname(path), slug)
+    try:
+        with metrics.phase('read'):
+            with open(compiled.model_path(directory), 'r', encoding='utf-8') as f:
+                data = f.read()
+        with metrics.phase('parse'):
+            model = json.loads(data)
+    except (OSError, ValueError):
+        model = None
+    if model is None or not compiled.is_current(model, source):
+        with metrics.phase('read'):
+            items = storage.load_items(path)
+        with metrics.phase('compile'):
+            try:
+                model, _ = compiled.write_model(directory, items, slug, source)
+            except OSError:
+                model = compiled.compile_items(items, slug, source)
+    items = model['items']
+    # peso aproximado de cada item, para cortar ventanas por bytes
+    weights = [len(it.get('html') or '') for it in items]
+    return {'items': items, 'summary': model['summary'], 'sections': model['sections'],
+            'stylesheet': model.get('stylesheet', ''), 'weights': weights}
+
 
+def _item_window(nb, offset, limit):
+    """Ventana ``[offset, offset+limit)`` de items, acotada también por bytes.
 
+    Siempre incluye al menos un item; devuelve ``(items, next_offset)`` con
+    ``next_offset`` a None cuando ya no quedan más.
+    """
+    items = nb['items']
+    weights = nb['weights']
+    max_bytes = getattr(settings, 'NOTEBOOK_PAGE_MAX_BYTES', 128 * 1024)
+    end = min(len(items), offset + limit)
+    total = 0
+    for i in range(offset, end):
+        total += weights[i]
+        if total > max_bytes and i > offset:
+            end = i
+            break
+    next_offset = end if end < len(items) else None
+    return items[offset:end], next_offset
+
+
+def _get_notebook(slug):
+    """Notebook convertida desde la caché; Http404 si no existe el artefacto."""
+    try:
+        return notebook_cache.get(_artifact_path(slug), _load_notebook)
+    except FileNotFoundError:
+        raise Http404('Notebook no encontrada')
+
+
+def _render_notebook_page(base, nb):
+    title = base.replace('_', ' ')
+    # solo la primera pantalla; el resto se pide a notebook_items al hacer scroll
+    items, next_offset = _item_window(nb, 0, getattr(settings, 'NOTEBOOK_PAGE_SIZE', 10))
+    # Sin request: la página no depende de quién la pide y se puede guardar
+    return render_to_string('notebook_detail.html', {
+        'slug': base,
+        'items': items,
+        'next_offset': next_offset,
+        'title': title,
+        'summary': nb['summary'],
+        'sections': nb['sections'],
+        'stylesheet': nb['stylesheet'],
+    })
+
+
+def _stored_page(notes_dir, slug, source):
+    """Página guardada de ``slug`` si corresponde al artefacto ``source``; si no, None."""
+    path = pages.meta_path(previews.blob_dir(notes_dir, slug))
+    try:
+        page = page_cache.get(path, pages.load_page)
+    except (OSError, ValueError, KeyError):
+        return None
+    if page['source'] != tuple(source) or page['render'] != RENDER_VERSION:
+        return None
+    return page
+
+
+def bake_page(slug, notes_dir=None):
+    """Renderiza y guarda la página comprimida de ``slug`` si falta o caducó.
+
+    Devuelve las rutas de la página guardada (escrita ahora o antes).
+    """
+    notes_dir = notes_dir or TEMPLATES_NOTES_DIR
+    path = storage.artifact_path(notes_dir, slug)
+    st = os.stat(path)
+    source = (st.st_mtime_ns, st.st_size)
+    directory = previews.blob_dir(notes_dir, slug)
+    if _stored_page(notes_dir, slug, source) is None:
+        nb = notebook_cache.get(path, _load_notebook)
+        with metrics.phase('render'):
+            html = _render_notebook_page(slug, nb)
+        with metrics.phase('compress'):
+            pages.write_page(directory, html, source, RENDER_VERSION)
+    return pages.page_files(directory)
+
+
+def page_is_current(slug, notes_dir=None):
+    """True si la página guardada de ``slug`` corresponde a su artefacto y a
+    las plantillas actuales (``bake_notebooks --check``)."""
+    notes_dir = notes_dir or TEMPLATES_NOTES_DIR
+    try:
+        st = os.stat(storage.artifact_path(notes_dir, slug))
+    except OSError:
+        return False
+    return _stored_page(notes_dir, slug, (st.st_mtime_ns, st.st_size)) is not None
+
+
+def _convert_on_request(request, slug):
+    """Lanza la conversión de la notebook de datasets/ cuyo artefacto falta
+    (p. ej. un despliegue que no pasó por ``bake_notebooks``).
+
+    Devuelve None si ya hay artefacto (o no hay notebook fuente, y entonces
+    toca 404). Si no, responde al momento: 202 con una página que consulta
+    ``/api/jobs/<id>/`` y recarga al terminar, o 503 si no hay presupuesto.
+    Las peticiones simultáneas comparten la conversión. Si la última
+    conversión de esta misma versión de la notebook falló, responde 500 con
+    el error sin volver a intentarlo.
+    """
+    source = os.path.join(DATASETS_DIR, slug + '.ipynb')
+    if not getattr(settings, 'NOTEBOOK_LAZY_CONVERT', True):
+        return None
+    try:
+        st = os.stat(source)
+    except OSError:
+        return None
+    error = _lazy_failure(slug, st)
+    if error is not None:
+        return _conversion_failed(request, slug, error)
+    try:
+        with metrics.phase('submit'):
+            job_id = job_pool.submit(slug, st.st_size, _lazy_convert, source, slug,
+                                     slug=slug, source=source)
+    except jobs.AdmissionError as e:
+        response = HttpResponse('Hay demasiadas conversiones en curso; vuelve a intentarlo en unos segundos.',
+                                status=503, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(e.retry_after)
+        return response
+    state = job_pool.status(job_id)
+    if state is not None and state['status'] == jobs.ERROR:
+        return _conversion_failed(request, slug, state.get('error'))
+    if state is not None and state['status'] == jobs.DONE:
+        # el stat de la petición (ETag) era de antes de convertir
+        request.__dict__.pop('_artifact_stats', None)
+        return None
+    response = render(request, 'notebook_converting.html', {
+        'slug': slug,
+        'status_url': f'/api/jobs/{job_id}/',
+    }, status=202)
+    response['Retry-After'] = '1'
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def _lazy_failure_path(slug):
+    return os.path.join(job_pool.status_dir, f'{slug}.failed.json')
+
+
+def _lazy_failure(slug, st):
+    """Error de la última conversión fallida de ``slug`` si fue de esta misma
+    versión (``mtime``, tamaño) de la notebook; si no, None."""
+    try:
+        with open(_lazy_failure_path(slug), 'r', encoding='utf-8') as f:
+            failure = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if failure.get('source') != [st.st_mtime_ns, st.st_size]:
+        return None
+    return failure.get('error') or 'error desconocido'
+
+
+def _lazy_convert(job, source, slug):
+    """``_convert_notebook`` que recuerda el fallo hasta que cambie la fuente:
+    una notebook rota no se reconvierte en cada visita."""
+    st = os.stat(source)
+    try:
+        result = _convert_notebook(job, source, slug)
+    except Exception as e:
+        with atomic_open(_lazy_failure_path(slug)) as f:
+            json.dump({'source': [st.st_mtime_ns, st.st_size], 'error': str(e)}, f)
+        raise
+    try:
+        os.remove(_lazy_failure_path(slug))
+    except FileNotFoundError:
+        pass
+    return result
+
+
+def _conversion_failed(request, slug, error):
+    response = render(request, 'notebook_converting.html', {'slug': slug, 'error': error}, status=500)
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+@artifact_condition(lambda filename: _artifact_path(filename))
 def notebook_view(request, filename):
     base = os.path.basename(filename)
-    json_path = os.path.join(TEMPLATES_NOTES_DIR, f'{base}.json')
-    if not os.path.exists(json_path):
+    st = _artifact_stat(request, _artifact_path(base))
+    if st is None:
+        # Sin convertir: si está en datasets/ se lanza la conversión, una sola vez
+        busy = _convert_on_request(request, base)
+        if busy is not None:
+            return busy
+        st = _artifact_stat(request, _artifact_path(base))
+    if st is None:
         raise Http404('Notebook no encontrada')
-    with open(json_path, 'r', encoding='utf-8') as f:
-        items = json.load(f)
-    title = base.replace('_', ' ')
-    # extraer primer markdown como resumen completo (convertir a HTML)
-    summary = None
-    sections = []  # recoger encabezados '##' / '###' como secciones
-    # Buscar el primer markdown que usaremos como resumen y quitarlo de la lista
-    for idx, it in enumerate(items):
-        if it.get('type') == 'markdown' and it.get('content'):
-            raw = it.get('content')
-            # extraer encabezados secundarios (##, ###) para mostrar como secciones
-            for ln in raw.splitlines():
-                s = ln.strip()
-                if s.startswith('##') or s.startswith('###'):
-                    heading = s.lstrip('#').strip()
-                    # filtrar encabezados demasiado genéricos o repetitivos
-                    if not heading:
-                        continue
-                    bad = {'dataset', 'data set', 'datafiles', 'data files', 'data', 'descripcion', 'descripción', 'datos', 'data files', 'datafile'}
-                    norm = heading.lower().replace(':', '').strip()
-                    if any(norm == b or norm.startswith(b + ' ') for b in bad):
-                        continue
-                    if heading and heading not in sections:
-                        sections.append(heading)
-
-            # quitar encabezados markdown de primer nivel para evitar duplicados en el resumen
-            lines = [ln for ln in raw.splitlines() if not ln.strip().startswith('#')]
-            txt = '\n'.join(lines).strip()
-            if txt:
-                if md:
-                    # convertir Markdown a HTML completo
-                    try:
-                        summary = md.markdown(txt, extensions=['extra', 'sane_lists'])
-                    except Exception:
-                        summary = '<p>' + _html.escape(txt).replace('\n\n', '</p><p>').replace('\n', '<br>') + '</p>'
-                else:
-                    # Fallback: escapar y convertir saltos de línea a <br>
-                    summary = '<p>' + _html.escape(txt).replace('\n\n', '</p><p>').replace('\n', '<br>') + '</p>'
-                # Eliminar el item markdown para que no se muestre otra vez en el bucle de outputs
-                try:
-                    items.pop(idx)
-                except Exception:
-                    pass
-                break
-
-    return render(request, 'notebook_detail.html', {'items': items, 'title': title, 'summary': summary, 'sections': sections})
+    source = (st.st_mtime_ns, st.st_size)
+    with metrics.phase('page'):
+        page = _stored_page(TEMPLATES_NOTES_DIR, base, source)
+    if page is None:
+        # Primera visita tras convertir: se guarda para las siguientes
+        try:
+            bake_page(base)
+            page = _stored_page(TEMPLATES_NOTES_DIR, base, source)
+        except OSError:
+            page = None
+    if page is None:
+        nb = _get_notebook(base)
+        with metrics.phase('render'):
+            return HttpResponse(_render_notebook_page(base, nb))
+
+    encoding = pages.choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'), page['bodies'])
+    response = HttpResponse(page['bodies'][encoding], content_type='text/html; charset=utf-8')
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+@require_http_methods(["GET"])
+@artifact_condition(lambda slug: _artifact_path(slug))
+def notebook_items(request, slug):
+    """API paginada de items: ``?offset=&limit=`` y ``format=html`` opcional."""
+    base = os.path.basename(slug)
+    page_size = getattr(settings, 'NOTEBOOK_PAGE_SIZE', 10)
+    # antes de cargar la notebook: una petición mal formada no la lee
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+        limit = min(max(1, int(request.GET.get('limit', page_size))), 100)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'offset y limit deben ser enteros'
+        }, status=400)
+    nb = _get_notebook(base)
+
+    with metrics.phase('window'):
+        items, next_offset = _item_window(nb, offset, limit)
+    data = {
+        'success': True,
+        'slug': base,
+        'offset': offset,
+        'count': len(items),
+        'total': len(nb['items']),
+        'next_offset': next_offset,
+    }
+    if request.GET.get('format') == 'html':
+        # Los mismos fragmentos que la página de detalle, ya renderizados
+        with metrics.phase('render'):
+            data['html'] = '\n'.join(it['html'] for it in items)
+    else:
+        data['items'] = [{k: v for k, v in it.items() if k != 'html'} for it in items]
+    return JsonResponse(data)
+
+
+def _table_path(slug, name):
+    return os.path.join(previews.blob_dir(TEMPLATES_NOTES_DIR, os.path.basename(slug)), name)
+
+
+@require_http_methods(["GET"])
+@artifact_condition(_table_path)
+def notebook_table(request, slug, name):
+    """Filas de una tabla grande: ``?offset=&limit=`` y ``sort=<columna>&order=desc``."""
+    if not tables.BLOB_RE.match(name):
+        raise Http404('Tabla no encontrada')
+    try:
+        offset = max(0, int(request.GET.get('offset', 0)))
+        limit = min(max(1, int(request.GET.get('limit', 100))), 500)
+        sort = request.GET.get('sort')
+        sort = int(sort) if sort not in (None, '') else None
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'offset, limit y sort deben ser enteros'
+        }, status=400)
+    try:
+        with metrics.phase('read'):
+            table = table_cache.get(_table_path(slug, name), tables.load_table)
+    except (OSError, ValueError):
+        raise Http404('Tabla no encontrada')
+    if sort is not None and not 0 <= sort < len(table['columns']):
+        return JsonResponse({
+            'success': False,
+            'error': 'sort fuera de rango'
+        }, status=400)
+    descending = request.GET.get('order') == 'desc'
+
+    with metrics.phase('rows'):
+        rows = tables.rows(table, offset, limit, sort, descending)
+    end = offset + len(rows)
+    return JsonResponse({
+        'success': True,
+        'offset': offset,
+        'count': len(rows),
+        'total': table['total'],
+        'next_offset': end if end < table['total'] else None,
+        'sort': sort,
+        'order': 'desc' if descending else 'asc',
+        'rows': rows,
+    })
+
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@require_http_methods(["GET"])
+def notebook_text(request, slug, name):
+    """Texto completo de una salida recortada, con soporte de ``Range: bytes=``."""
+    base = os.path.basename(slug)
+    if not previews.BLOB_RE.match(name):
+        raise Http404('Texto no encontrado')
+    blob_path = os.path.join(previews.blob_dir(TEMPLATES_NOTES_DIR, base), name)
+    try:
+        size = os.path.getsize(blob_path)
+    except OSError:
+        raise Http404('Texto no encontrado')
+
+    m = _RANGE_RE.match(request.headers.get('Range', '').strip())
+    if not m or not (m.group(1) or m.group(2)):
+        response = FileResponse(open(blob_path, 'rb'), content_type='text/plain; charset=utf-8')
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        # sufijo: los últimos N bytes
+        start = max(0, size - int(m.group(2)))
+        end = size - 1
+    if start >= size or start > end:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    with open(blob_path, 'rb') as f:
+        f.seek(start)
+        chunk = f.read(end - start + 1)
+    response = HttpResponse(chunk, status=206, content_type='text/plain; charset=utf-8')
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def notebook_image(request, shard, name):
+    """Imagen del almacén por hash (cuando WhiteNoise no la conoce, p. ej. si
+    se generó después de collectstatic). El contenido nunca cambia para una URL
+    dada, así que se puede cachear para siempre."""
+    m = images.OBJECT_NAME_RE.match(name)
+    if not m or shard != name[:2]:
+        raise Http404('Imagen no encontrada')
+    key, ext = m.groups()
+    if request.headers.get('If-None-Match') == f'"{key}"':
+        response = HttpResponse(status=304)
+    else:
+        path = os.path.join(STATIC_NOTES_DIR, images.object_relpath(key, ext))
+        try:
+            response = FileResponse(open(path, 'rb'), content_type=images.CONTENT_TYPES[ext])
+        except FileNotFoundError:
+            raise Http404('Imagen no encontrada')
+    response['ETag'] = f'"{key}"'
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
 def dataset_loader(request):
@@ -110,27 +572,92 @@ def dataset_loader(request):
     })
 
 
-@require_http_methods(["POST"])
+def _listing_folder(request):
+    """Carpeta que lista list_files: datasets/ en producción o la indicada."""
+    params = request.POST if request.method == 'POST' else request.GET
+    folder_path = params.get('folder_path', '')
+    # En producción, usar el directorio datasets del servidor
+    if os.environ.get('PORT') or os.environ.get('RAILWAY_ENVIRONMENT'):
+        return DATASETS_DIR
+    # En desarrollo, usar la ruta proporcionada
+    return os.path.normpath(folder_path) if folder_path else None
+
+
+def _listing_params(request):
+    params = request.POST if request.method == 'POST' else request.GET
+    return {
+        'cursor': params.get('cursor') or None,
+        'limit': params.get('limit', '200'),
+        'recursive': params.get('recursive', '') in ('1', 'true', 'on'),
+        'refresh': params.get('refresh', '') in ('1', 'true', 'on'),
+    }
+
+
+def _converted_slugs():
+    """``({slug: notebook fuente}, huella)`` del catálogo; se recalcula solo
+    cuando cambia.
+
+    Las entradas anteriores a guardar la fuente vienen de datasets/.
+    """
+    global _converted
+    entries = _catalog_entries()
+    if _converted[0] is not entries:
+        sources = {e['slug']: e.get('source') or os.path.join(DATASETS_DIR, e['slug'] + '.ipynb')
+                   for e in entries}
+        lines = sorted(f'{slug}\t{source}' for slug, source in sources.items())
+        digest = hashlib.sha1('\n'.join(lines).encode('utf-8')).hexdigest()[:8]
+        _converted = (entries, sources, digest)
+    return _converted[1], _converted[2]
+
+
+_converted = (None, {}, '')
+
+
+def _listing_etag(request):
+    # Sale de las carpetas cacheadas (un stat por carpeta; las notebooks se
+    # comprueban cada verify_interval, ver listing.py) y del catálogo, que
+    # decide la marca de "convertida"
+    folder = _listing_folder(request)
+    if folder is None:
+        return None
+    params = _listing_params(request)
+    try:
+        signature = folder_listing.signature(folder, params['recursive'], params['refresh'])
+    except OSError:
+        return None
+    # con refresh=1 la carpeta ya se acaba de leer: list_files no repite
+    request._listing_refreshed = params['refresh']
+    return f'"{signature}-{_converted_slugs()[1]}"'
+
+
+def listing_condition(view):
+    """``condition`` con el ETag del listado, que no se pone en los errores."""
+    conditional = condition(etag_func=_listing_etag)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return _strip_validators(conditional(request, *args, **kwargs))
+    return wrapper
+
+
+@require_http_methods(["GET", "POST"])
 @csrf_exempt
+@listing_condition
 def list_files(request):
-    """API endpoint para listar archivos de una carpeta"""
+    """API endpoint para listar archivos de una carpeta (GET admite If-None-Match)
+
+    Paginado con ``cursor`` y ``limit`` (por defecto 200, máximo 1000);
+    ``recursive=1`` incluye subcarpetas y ``refresh=1`` ignora la caché.
+    """
     try:
-        folder_path = request.POST.get('folder_path', '')
-        
         # Detectar si estamos en producción
         is_production = os.environ.get('PORT') or os.environ.get('RAILWAY_ENVIRONMENT')
-        
-        # En producción, usar el directorio datasets del servidor
-        if is_production:
-            full_path = DATASETS_DIR
-        else:
-            # En desarrollo, usar la ruta proporcionada
-            if not folder_path:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Ruta de carpeta requerida'
-                })
-            full_path = os.path.normpath(folder_path)
+        full_path = _listing_folder(request)
+        if full_path is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'Ruta de carpeta requerida'
+            })
         
         # Verificar que la carpeta existe
         if not os.path.isdir(full_path):
@@ -139,30 +666,49 @@ def list_files(request):
                 'error': 'Carpeta no encontrada'
             })
         
-        files = []
+        params = _listing_params(request)
         try:
-            for item in sorted(os.listdir(full_path)):
-                item_path = os.path.join(full_path, item)
-                if os.path.isfile(item_path) and item.lower().endswith('.ipynb'):
-                    size = os.path.getsize(item_path)
-                    base, _ = os.path.splitext(item)
-                    files.append({
-                        'name': item,
-                        'path': item_path,
-                        'size': size,
-                        'type': 'notebook',
-                        'slug': base,
-                    })
+            limit = min(max(1, int(params['limit'])), 1000)
+            with metrics.phase('listing'):
+                refresh = params['refresh'] and not getattr(request, '_listing_refreshed', False)
+                page, next_cursor, total = folder_listing.page(
+                    full_path, params['cursor'], limit, params['recursive'], refresh)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e) if params['cursor'] else 'limit debe ser un entero'
+            }, status=400)
         except PermissionError:
             return JsonResponse({
                 'success': False,
                 'error': 'Permiso denegado para acceder a la carpeta'
             })
         
+        converted, _ = _converted_slugs()
+        files = []
+        with metrics.phase('metadata'):
+            for relpath, size, mtime in page:
+                item_path = os.path.join(full_path, relpath)
+                name = os.path.basename(relpath)
+                base, _ = os.path.splitext(name)
+                files.append({
+                    'name': name,
+                    'path': item_path,
+                    'relpath': relpath,
+                    'size': size,
+                    'type': 'notebook',
+                    'slug': base,
+                    # solo si la conversión es de este archivo y no de otro con su nombre
+                    'converted': converted.get(base) == os.path.abspath(item_path),
+                    **folder_listing.metadata(item_path, size, mtime),
+                })
+        
         return JsonResponse({
             'success': True,
             'folder': str(full_path),
             'files': files,
+            'total': total,
+            'next_cursor': next_cursor,
             'is_production': is_production
         })
     
@@ -173,6 +719,62 @@ def list_files(request):
         })
 
 
+def _convert_notebook(job, full_path, base):
+    """Convierte ``full_path`` informando del progreso en ``job``."""
+    try:
+        result = _convert_phases(job, full_path, base)
+    except Exception:
+        metrics.inc('notebook_conversions_total', status='error')
+        raise
+    metrics.inc('notebook_conversions_total', status='done')
+    return result
+
+
+def _convert_phases(job, full_path, base):
+    def phase(name):
+        return metrics.phase(name, metric='notebook_conversion_seconds')
+
+    text_dir = previews.blob_dir(TEMPLATES_NOTES_DIR, base)
+    text_threshold = getattr(settings, 'NOTEBOOK_TEXT_THRESHOLD', previews.TEXT_THRESHOLD)
+    table_threshold = getattr(settings, 'NOTEBOOK_TABLE_THRESHOLD', tables.TABLE_THRESHOLD)
+
+    def progress(cell_idx, extractor):
+        job.update(cells=cell_idx + 1, images=extractor.images, items=len(extractor.items))
+
+    # Misma extracción que convert_notebooks.py (ver extraction.py), con el
+    # pipeline del transforms.json de la carpeta de la notebook
+    html_stats = {}
+    previous_images = _image_digests(base)
+    # hasta que el artefacto use sus imágenes, que ninguna poda las borre
+    with images.store_lock(STATIC_NOTES_DIR, shared=True):
+        with phase('extract'):
+            items, _ = extraction.extract(full_path, STATIC_NOTES_DIR, text_dir, text_threshold,
+                                          progress=progress, stats=html_stats, table_threshold=table_threshold,
+                                          pipeline=transforms.spec_for(full_path))
+
+        # Guardar los items (JSON o contenedor .nbc, ver storage.py)
+        job.update(phase='writing', force=True)
+        with phase('write'):
+            out_path = storage.write_items(TEMPLATES_NOTES_DIR, base, items)
+    image_count = sum(1 for it in items if it['type'] == 'image')
+    notebook_cache.invalidate(out_path)
+    # imágenes de la conversión anterior que ya no usa ninguna notebook
+    images.prune_objects(previous_images - images.item_digests(items), TEMPLATES_NOTES_DIR,
+                         STATIC_NOTES_DIR)
+    with phase('compile'):
+        st = os.stat(out_path)
+        compiled.write_model(text_dir, items, base, (st.st_mtime_ns, st.st_size))
+    with phase('search'):
+        search.write_segment(text_dir, items, text_dir)
+    with phase('catalog'):
+        entry, _ = catalog.make_entry(base, items, out_path, STATIC_NOTES_DIR, source=full_path)
+        catalog.upsert(TEMPLATES_NOTES_DIR, entry)
+    with phase('bake'):
+        bake_page(base)
+    return {'phase': 'done', 'images': image_count, 'items': len(items), 'url': f'/notebook/{base}/',
+            'html_saved': html_stats['html_bytes'] - html_stats['html_min_bytes']}
+
+
 @require_http_methods(["POST"])
 @csrf_exempt
 def open_notebook(request):
@@ -201,76 +803,194 @@ def open_notebook(request):
                 'error': 'Solo se aceptan archivos .ipynb'
             })
         
-        # Procesar el notebook
-        try:
-            base = os.path.splitext(os.path.basename(full_path))[0]
-            
-            # Crear carpetas de salida si no existen
-            json_out_path = os.path.join(TEMPLATES_NOTES_DIR, f'{base}.json')
-            static_out_dir = os.path.join(STATIC_NOTES_DIR, base)
-            os.makedirs(static_out_dir, exist_ok=True)
-            
-            # Leer notebook
-            with open(full_path, 'r', encoding='utf-8') as f:
-                nb = nb_read(f, as_version=4)
-            
-            # Extraer outputs
-            items = []
-            img_counter = 0
-            
-            for cell in nb.cells:
-                if cell.cell_type == 'markdown':
-                    content = ''.join(cell.source)
-                    if content.strip():
-                        items.append({'type': 'markdown', 'content': content})
-                
-                elif cell.cell_type == 'code' and hasattr(cell, 'outputs'):
-                    for output in cell.outputs:
-                        # Imágenes
-                        if hasattr(output, 'data') and 'image/png' in output.data:
-                            img_counter += 1
-                            img_filename = f'output_{img_counter}.png'
-                            img_path = os.path.join(static_out_dir, img_filename)
-                            
-                            # Guardar imagen
-                            img_data = base64.b64decode(output.data['image/png'])
-                            with open(img_path, 'wb') as img_file:
-                                img_file.write(img_data)
-                            
-                            items.append({
-                                'type': 'image',
-                                'path': f'/static/notebooks/{base}/{img_filename}'
-                            })
-                        
-                        # HTML/tablas
-                        elif hasattr(output, 'data') and 'text/html' in output.data:
-                            html_content = ''.join(output.data['text/html'])
-                            items.append({'type': 'html', 'content': html_content})
-                        
-                        # Texto plano
-                        elif hasattr(output, 'text'):
-                            text_content = ''.join(output.text)
-                            if text_content.strip():
-                                items.append({'type': 'text', 'content': text_content})
-            
-            # Guardar JSON
-            with open(json_out_path, 'w', encoding='utf-8') as f:
-                json.dump(items, f, ensure_ascii=False, indent=2)
-            
-            return JsonResponse({
-                'success': True,
-                'slug': base,
-                'message': f'Notebook procesado: {base}'
-            })
-            
-        except Exception as e:
+        # Convertir en segundo plano; el cliente consulta el estado en status_url
+        base = os.path.splitext(os.path.basename(full_path))[0]
+        owner = _converted_slugs()[0].get(base)
+        if owner and owner != os.path.abspath(full_path) and os.path.isfile(owner):
+            # el slug es de otra notebook que sigue existiendo: no se pisa
             return JsonResponse({
                 'success': False,
-                'error': f'Error procesando notebook: {str(e)}'
-            })
+                'error': f'Ya hay otra notebook convertida con el nombre {base}; renombra esta para abrirla',
+            }, status=409)
+        try:
+            with metrics.phase('submit'):
+                job_id = job_pool.submit(base, os.path.getsize(full_path), _convert_notebook,
+                                         full_path, base, slug=base, source=full_path)
+        except jobs.AdmissionError as e:
+            response = JsonResponse({
+                'success': False,
+                'error': 'Hay demasiadas conversiones en curso; inténtalo de nuevo en unos segundos',
+                'retry_after': e.retry_after,
+            }, status=503)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        return JsonResponse({
+            'success': True,
+            'job': job_id,
+            'slug': base,
+            'status_url': f'/api/jobs/{job_id}/',
+            'message': f'Notebook en cola: {base}'
+        }, status=202)
     
     except Exception as e:
         return JsonResponse({
             'success': False,
             'error': str(e)
         })
+
+
+@require_http_methods(["GET"])
+def job_status(request, job_id):
+    """Estado de un trabajo de conversión lanzado con open_notebook."""
+    state = job_pool.status(job_id) if jobs.JOB_ID_RE.match(job_id) else None
+    if state is None:
+        return JsonResponse({'success': False, 'error': 'Trabajo no encontrado'}, status=404)
+    response = JsonResponse({'success': True, **state})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _image_digests(slug):
+    """Hashes de las imágenes del artefacto actual de ``slug`` (vacío si no hay)."""
+    try:
+        return images.item_digests(storage.load_items(_artifact_path(slug)))
+    except (OSError, ValueError):
+        return set()
+
+
+def _forget_notebook(slug):
+    """Borra las salidas de una notebook que ya no está en datasets/ (como
+    hace convert_notebooks.py al podar el manifest)."""
+    with jobs.conversion_lock(job_pool.status_dir, slug):
+        digests = _image_digests(slug)
+        for ext in storage.FORMATS.values():
+            path = os.path.join(TEMPLATES_NOTES_DIR, slug + ext)
+            notebook_cache.invalidate(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        shutil.rmtree(previews.blob_dir(TEMPLATES_NOTES_DIR, slug), ignore_errors=True)
+        try:
+            os.remove(_lazy_failure_path(slug))
+        except FileNotFoundError:
+            pass
+        catalog.remove(TEMPLATES_NOTES_DIR, slug)
+        images.prune_objects(digests, TEMPLATES_NOTES_DIR, STATIC_NOTES_DIR)
+
+
+def datasets_changed(changes):
+    """Reconvierte o borra las notebooks de datasets/ que cambiaron (ver watch.py).
+
+    Se llama desde el hilo de vigilancia y convierte ahí mismo, una notebook
+    tras otra: lo que se guarde mientras tanto llega en el siguiente aviso.
+    Las cachés en memoria se validan con ``stat`` (y la conversión invalida
+    su modelo); aquí solo se descarta el listado de la carpeta, porque
+    modificar un archivo no cambia el ``mtime`` de la carpeta.
+    """
+    folder_listing.invalidate(DATASETS_DIR)
+    for path, kind in sorted(changes.items()):
+        slug = storage.slug_of(path)
+        started = time.perf_counter()
+        if kind == 'deleted':
+            _forget_notebook(slug)
+            logger.info('%s: borrada, salidas eliminadas', slug)
+            continue
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        state = job_pool.run(slug, _convert_notebook, path, slug, slug=slug, source=path, size=size)
+        if state['status'] == jobs.DONE:
+            logger.info('%s: %s, %d items (%.2fs)', slug, 'creada' if kind == 'created' else 'modificada',
+                        state['progress']['items'], time.perf_counter() - started)
+        else:
+            logger.error('%s: error al convertir (%s)', slug, state.get('error'))
+
+
+_watcher = None
+
+
+def start_watcher():
+    """Arranca (una vez por proceso) la vigilancia de datasets/ en segundo plano."""
+    global _watcher
+    if _watcher is None:
+        _watcher = watch.Watcher(DATASETS_DIR, datasets_changed).start()
+        logger.info('vigilando %s (%s)', DATASETS_DIR, _watcher.backend)
+    return _watcher
+
+
+def _build_search_segment(slug):
+    # Notebooks convertidas antes de que existiera la búsqueda
+    items = storage.load_items(_artifact_path(slug))
+    directory = previews.blob_dir(TEMPLATES_NOTES_DIR, slug)
+    search.write_segment(directory, items, directory)
+
+
+@require_http_methods(["GET"])
+def search_notebooks(request):
+    """Búsqueda de texto en las salidas: ``?q=`` (``palabra*`` = prefijo) y ``limit``."""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(1, int(request.GET.get('limit', 10))), 50)
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'limit debe ser un entero'
+        }, status=400)
+    if not query:
+        return JsonResponse({
+            'success': False,
+            'error': 'Parámetro q requerido'
+        }, status=400)
+
+    entries = _catalog_entries()
+    with metrics.phase('index'):
+        search_index.refresh([e['slug'] for e in entries], source=entries, build=_build_search_segment)
+    started = time.perf_counter()
+    with metrics.phase('search'):
+        results = search_index.search(query, limit)
+    took = time.perf_counter() - started
+    for r in results:
+        r['title'] = r['slug'].replace('_', ' ')
+        # el ancla lleva al item en la página (que carga las ventanas que falten)
+        r['url'] = f"/notebook/{r['slug']}/" + (f"#item-{r['item']}" if r['item'] is not None else '')
+    return JsonResponse({
+        'success': True,
+        'query': query,
+        'count': len(results),
+        'results': results,
+        'took_ms': round(took * 1000, 3),
+    })
+
+
+def _cache_metrics():
+    """Contadores de las cachés y del pool de conversiones para ``/metrics``."""
+    caches = {'notebooks': notebook_cache.stats(), 'pages': page_cache.stats(), 'tables': table_cache.stats(),
+              'search': search_cache.stats()}
+    out = []
+    for key, kind, help_text in (('hits', 'counter', 'Aciertos de la caché'),
+                                 ('misses', 'counter', 'Fallos de la caché'),
+                                 ('evictions', 'counter', 'Entradas expulsadas de la caché'),
+                                 ('entries', 'gauge', 'Entradas en la caché'),
+                                 ('bytes', 'gauge', 'Bytes en la caché')):
+        suffix = '_total' if kind == 'counter' else ''
+        out.append((f'notebook_cache_{key}{suffix}', kind, help_text,
+                    [({'cache': name}, st[key]) for name, st in caches.items()]))
+    out.append(('notebook_listing_cache_hits_total', 'counter', 'Carpetas servidas desde la caché del listado',
+                [({}, folder_listing.hits)]))
+    out.append(('notebook_listing_cache_misses_total', 'counter', 'Carpetas leídas de disco por el listado',
+                [({}, folder_listing.misses)]))
+    out.append(('notebook_jobs_active', 'gauge', 'Conversiones en cola o en curso en este proceso',
+                [({}, job_pool.active())]))
+    return out
+
+
+@require_http_methods(["GET"])
+def metrics_view(request):
+    """Histogramas y contadores en formato de texto de Prometheus."""
+    if not metrics.ENABLED:
+        raise Http404('Métricas desactivadas')
+    response = HttpResponse(metrics.render(_cache_metrics()), content_type=metrics.CONTENT_TYPE)
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,241 @@
+"""Vigilancia de la carpeta de notebooks fuente (``--watch`` y ``runserver``).
+
+``Watcher`` detecta las notebooks creadas, modificadas y borradas en una
+carpeta y llama a ``on_change({ruta: 'created' | 'modified' | 'deleted'})``
+cuando los cambios se calman durante ``debounce`` segundos: guardar desde
+Jupyter escribe un temporal, lo renombra y a veces vuelve a escribir, y todo
+eso es un solo cambio. Los cambios salen de comparar ``(mtime_ns, size)`` de
+cada ``.ipynb`` con la pasada anterior, así que un archivo que se escribe
+varias veces cuenta una vez y uno que vuelve a quedar igual no cuenta.
+
+En Linux se usa inotify a través de ctypes (sin dependencias): el hilo duerme
+en ``select`` hasta que el núcleo avisa de un cambio en la carpeta. Si
+inotify no está disponible (otro sistema, límite de watches agotado, la
+carpeta aún no existe) se recorre la carpeta cada ``interval`` segundos: un
+``scandir`` y un ``stat`` por notebook.
+
+Este módulo no depende de Django.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Segundos sin cambios antes de avisar, y entre pasadas sin inotify
+DEBOUNCE = float(os.environ.get('NOTEBOOK_WATCH_DEBOUNCE', '0.2'))
+POLL_INTERVAL = float(os.environ.get('NOTEBOOK_WATCH_INTERVAL', '0.25'))
+SUFFIX = '.ipynb'
+
+# <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT = struct.Struct('iIII')   # wd, mask, cookie, len (+ nombre)
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        name = ctypes.util.find_library('c')
+        if name is None:
+            raise OSError('libc no encontrada')
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify no disponible')
+        _libc = libc
+    return _libc
+
+
+class Inotify:
+    """Descriptor de inotify sobre una carpeta (sin subcarpetas)."""
+
+    def __init__(self, directory):
+        libc = _load_libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f'inotify_init1: {os.strerror(err)}')
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(err, f'inotify_add_watch: {os.strerror(err)}')
+        self.fd = fd
+
+    def read(self, timeout):
+        """Nombres con eventos en los próximos ``timeout`` s; None si se
+        perdieron eventos (cola llena). Lanza OSError si la carpeta desaparece."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        pos = 0
+        while pos + EVENT.size <= len(data):
+            _, mask, _, length = EVENT.unpack_from(data, pos)
+            name = data[pos + EVENT.size:pos + EVENT.size + length].rstrip(b'\0')
+            pos += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                raise OSError('la carpeta vigilada ya no existe')
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def snapshot(directory, suffix=SUFFIX):
+    """``{nombre: (mtime_ns, size)}`` de las notebooks de ``directory``."""
+    found = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith('.') or not entry.name.lower().endswith(suffix):
+                    continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        found[entry.name] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return found
+
+
+def diff(before, after, directory):
+    """``{ruta: tipo de cambio}`` entre dos ``snapshot``."""
+    changes = {}
+    for name, sig in after.items():
+        if name not in before:
+            changes[os.path.join(directory, name)] = 'created'
+        elif before[name] != sig:
+            changes[os.path.join(directory, name)] = 'modified'
+    for name in before.keys() - after.keys():
+        changes[os.path.join(directory, name)] = 'deleted'
+    return changes
+
+
+class Watcher:
+    """Vigila ``directory`` y avisa de los cambios con ``on_change``.
+
+    ``run()`` bloquea hasta ``stop()``; ``start()`` lo lanza en un hilo
+    daemon. ``backend`` es ``'inotify'`` o ``'polling'``. El estado de partida
+    es el de la carpeta al crear el objeto: lo que cambie desde entonces se
+    avisa aunque ocurra antes de ``run()``.
+    """
+
+    def __init__(self, directory, on_change, debounce=None, interval=None, suffix=SUFFIX,
+                 use_inotify=True):
+        self.directory = os.fspath(directory)
+        self.on_change = on_change
+        self.debounce = DEBOUNCE if debounce is None else debounce
+        self.interval = POLL_INTERVAL if interval is None else interval
+        self.suffix = suffix
+        self._stop = threading.Event()
+        self._thread = None
+        self._known = snapshot(self.directory, suffix)
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = Inotify(self.directory)
+            except OSError:
+                pass
+
+    @property
+    def backend(self):
+        return 'inotify' if self._inotify is not None else 'polling'
+
+    def _relevant(self, names):
+        # None = se perdieron eventos: mirar la carpeta entera
+        return names is None or any(not n.startswith('.') and n.lower().endswith(self.suffix)
+                                    for n in names)
+
+    def _wait(self, timeout):
+        """True si hubo actividad en las notebooks durante ``timeout`` s."""
+        if self._inotify is not None:
+            try:
+                return self._relevant(self._inotify.read(timeout))
+            except OSError:
+                # carpeta borrada o movida: seguir por sondeo
+                self._inotify.close()
+                self._inotify = None
+                return True
+        self._stop.wait(timeout)
+        current = snapshot(self.directory, self.suffix)
+        if current != self._seen:
+            self._seen = current
+            return True
+        return False
+
+    def poll(self):
+        """Cambios desde la última llamada (o desde que se creó el objeto)."""
+        current = snapshot(self.directory, self.suffix)
+        changes = diff(self._known, current, self.directory)
+        self._known = current
+        return changes
+
+    def run(self):
+        self._seen = self._known
+        # actividad pendiente de avisar (p. ej. cambios antes de run())
+        last = time.monotonic() if snapshot(self.directory, self.suffix) != self._known else None
+        while not self._stop.is_set():
+            if last is None:
+                timeout = 0.5 if self._inotify is not None else self.interval
+            else:
+                timeout = max(0.0, last + self.debounce - time.monotonic())
+                if self._inotify is None:
+                    timeout = max(timeout, self.interval)
+            if self._wait(timeout):
+                last = time.monotonic()
+            if last is not None and time.monotonic() - last >= self.debounce:
+                last = None
+                changes = self.poll()
+                if changes:
+                    try:
+                        self.on_change(changes)
+                    except Exception:
+                        # un fallo al reconvertir no para la vigilancia
+                        logger.exception('error al procesar cambios en %s', self.directory)
+        self.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='notebook-watch', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None